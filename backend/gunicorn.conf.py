@@ -0,0 +1,67 @@
+"""
+Gunicorn configuration for production serving
+
+Run from backend/:
+    gunicorn -c gunicorn.conf.py main:app
+
+Uvicorn workers (uvloop + httptools) behind a gunicorn master that preloads
+the app, restarts crashed workers and shuts down gracefully on SIGTERM.
+Workers share the SQLite cache in CACHE_DIR (geocodes, LLM responses,
+images, places, guides, job state).
+"""
+import os
+import glob
+import multiprocessing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8001')}")
+# The app is async: one worker per core saturates the CPU
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the app once in the master so workers fork with modules loaded.
+# Connections, locks and clients are created lazily, after the fork.
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+
+# Seconds in-flight requests (streams, guide generation) get to finish on SIGTERM
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "60"))
+# Guide generation can take over a minute; workers are async, so this only
+# catches a blocked event loop
+timeout = int(os.getenv("WORKER_TIMEOUT", "180"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+# Worker recycling is opt-in: set MAX_REQUESTS to restart a worker after that
+# many requests (plus up to MAX_REQUESTS_JITTER) if memory grows; 0 never recycles
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+
+accesslog = "-" if os.getenv("ACCESS_LOG", "false").lower() == "true" else None
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+# Prometheus: each worker writes its metrics to files in this directory and
+# /metrics aggregates them. Set before the app (and prometheus_client) loads.
+_PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(_PROJECT_DIR, ".tmp", "prometheus")
+_metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+os.makedirs(_metrics_dir, exist_ok=True)
+# Files from a previous run would be summed into the new one
+for _path in glob.glob(os.path.join(_metrics_dir, "*.db")):
+    os.remove(_path)
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges (in-flight calls, circuit states)"""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_starting(server):
+    """Import the provider SDKs once in the master, so workers fork with them loaded"""
+    if preload_app:
+        from services.warmup import preload_sdks
+        preload_sdks()
@@ -2,19 +2,42 @@
 FastAPI application entry point
 """
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from routes.guide import router as guide_router
 
-# Load environment variables
+# Load environment variables before the services read their configuration
 load_dotenv()
 
+from routes.guide import router as guide_router  # noqa: E402
+from routes.metrics import router as metrics_router  # noqa: E402
+from services.metrics import MetricsMiddleware  # noqa: E402
+from services.http_client import close_http_clients  # noqa: E402
+from services.jobs import start_job_workers, stop_job_workers  # noqa: E402
+from services.warmup import start_warm_up  # noqa: E402
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown"""
+    start_job_workers()
+    # Load provider SDKs and clients (lazy by default, see WARMUP_MODE)
+    warm_up = await start_warm_up()
+    yield
+    if warm_up is not None:
+        warm_up.cancel()
+    await stop_job_workers()
+    # Close pooled upstream connections
+    await close_http_clients()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Travel Guide Generator API",
     description="AI-powered travel guide generation with itinerary optimization",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -27,8 +50,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency metrics and Server-Timing headers
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(guide_router)
+app.include_router(metrics_router)
 
 
 @app.get("/")
@@ -42,6 +69,8 @@ async def root():
 
 
 if __name__ == "__main__":
+    # Development server. For several workers run gunicorn -c gunicorn.conf.py
+    # main:app, which also sets up the shared Prometheus metrics directory.
     import uvicorn
     uvicorn.run(
         "main:app",
@@ -72,3 +72,14 @@ class TravelGuide(BaseModel):
     )  # {"sleep": [...], "eat": [...], "curiosities": [...]}
     route_info: Optional[dict] = None  # Distance, travel times between locations
     total_days: int
+
+
+class GuideJob(BaseModel):
+    """Status of a background guide generation job"""
+    job_id: str
+    status: str  # 'queued', 'running', 'completed', 'failed'
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[TravelGuide] = None  # Set once completed
+    error: Optional[str] = None  # Set if failed
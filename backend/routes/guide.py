@@ -1,126 +1,55 @@
 """
 API routes for travel guide generation
 """
-from fastapi import APIRouter, HTTPException
-from models.schemas import GuideRequest, TravelGuide, LocationDetail, DayItinerary, DayActivity, ImageInfo
-from services.ai_service import (
-    generate_location_details,
-    generate_itinerary as ai_generate_itinerary
-)
-from services.image_service import get_location_images
-from services.itinerary_service import (
-    optimize_route,
-    calculate_route_info,
-    calculate_days_per_destination,
-    get_coordinates
-)
-from services.recommendations_service import generate_all_recommendations
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from models.schemas import GuideRequest, TravelGuide, GuideJob
+from services.guide_service import build_travel_guide, stream_travel_guide, canonical_request_key, is_degraded_guide
+from services.guide_cache import get_cached_guide, cache_guide, etag_matches, get_guide_cache_stats
+from services.serialization import GuideResponse, guide_response, representation_etag, wants_msgpack, dumps_json_str
+from services.jobs import Job, JobQueueFull, submit_job, get_job
+from services.http_client import get_http_pool_stats
+from services.resilience import get_provider_health
+from services.provider_routing import get_routing_stats
+from services.warmup import get_warm_up_status
 
 router = APIRouter()
 
 
-@router.post("/api/generate-guide", response_model=TravelGuide)
-async def generate_travel_guide(request: GuideRequest):
+@router.post("/api/generate-guide", response_model=TravelGuide, response_class=GuideResponse)
+async def generate_travel_guide(
+    request: GuideRequest,
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Generate a complete travel guide with itinerary, images, and recommendations
     
+    Guides are cached by canonical request; responses carry an ETag, and a
+    repeat request with a matching If-None-Match gets 304 Not Modified.
+    Send "Accept: application/msgpack" for a msgpack body instead of JSON.
+    
     Args:
         request: GuideRequest with destinations, days, and preferences
         
     Returns:
         Complete TravelGuide object
     """
+    key = canonical_request_key(request)
+    cached = await get_cached_guide(key)
+    if cached is not None:
+        etag = representation_etag(cached.etag, wants_msgpack(accept))
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
+        return guide_response(cached.data, accept, cached.etag)
+
     try:
-        destinations = request.destinations
-        total_days = request.days or (len(destinations) * 3)  # Default 3 days per destination
-        preferences = request.preferences or ""
-        
-        # Step 1: Optimize route if multiple destinations
-        if len(destinations) > 1:
-            destinations = await optimize_route(destinations)
-        
-        # Step 2: Generate location details for each destination
-        location_details = []
-        for dest in destinations:
-            # Get AI-generated details
-            details = await generate_location_details(dest)
-            
-            # Get images
-            images = await get_location_images(dest, count=4)
-            main_image = None
-            additional_images = []
-            
-            if images:
-                main_image_data = images[0]
-                main_image = ImageInfo(
-                    url=main_image_data["url"],
-                    alt_text=main_image_data["alt_text"],
-                    photographer=main_image_data.get("photographer")
-                )
-                
-                # Additional images
-                for img_data in images[1:]:
-                    additional_images.append(ImageInfo(
-                        url=img_data["url"],
-                        alt_text=img_data["alt_text"],
-                        photographer=img_data.get("photographer")
-                    ))
-            
-            # Get coordinates
-            coords = await get_coordinates(dest)
-            
-            location = LocationDetail(
-                name=details.get("name", dest),
-                description=details.get("description", ""),
-                highlights=details.get("highlights", []),
-                main_image=main_image,
-                additional_images=additional_images,
-                coordinates=coords
-            )
-            location_details.append(location)
-        
-        # Step 3: Generate itinerary
-        itinerary_data = await ai_generate_itinerary(destinations, total_days, preferences)
-        
-        # Convert to DayItinerary objects
-        itinerary = []
-        for day_data in itinerary_data:
-            activities = [
-                DayActivity(
-                    time=act.get("time", ""),
-                    activity=act.get("activity", ""),
-                    description=act.get("description", ""),
-                    location=act.get("location", day_data.get("location", "")),
-                    duration=act.get("duration")
-                )
-                for act in day_data.get("activities", [])
-            ]
-            
-            day = DayItinerary(
-                day_number=day_data.get("day_number", 1),
-                date=day_data.get("date"),
-                title=day_data.get("title", ""),
-                activities=activities,
-                location=day_data.get("location", "")
-            )
-            itinerary.append(day)
-        
-        # Step 4: Generate recommendations
-        recommendations = await generate_all_recommendations(destinations)
-        
-        # Step 5: Calculate route information
-        route_info = await calculate_route_info(destinations)
-        
-        # Create the complete guide
-        guide = TravelGuide(
-            destinations=location_details,
-            itinerary=itinerary,
-            recommendations=recommendations,
-            route_info=route_info,
-            total_days=total_days
-        )
-        
-        return guide
+        guide = await build_travel_guide(request)
+        # The guide is built from validated models: dump it once, skip re-validation
+        data = guide.model_dump(mode="json")
+        etag = None if await is_degraded_guide(request, data) else await cache_guide(key, data)
+        return guide_response(data, accept, etag)
         
     except Exception as e:
         print(f"Error generating travel guide: {e}")
@@ -130,7 +59,110 @@ async def generate_travel_guide(request: GuideRequest):
         )
 
 
+@router.post("/api/generate-guide/stream")
+async def stream_travel_guide_events(request: GuideRequest):
+    """
+    Generate a travel guide as a stream of Server-Sent Events
+    
+    Each destination, itinerary day, recommendation category and the route
+    info are sent as soon as they are ready, followed by a "complete" event
+    with the full TravelGuide (or an "error" event). A cached guide is sent
+    as a single "complete" event.
+    
+    Args:
+        request: GuideRequest with destinations, days, and preferences
+        
+    Returns:
+        text/event-stream response
+    """
+    key = canonical_request_key(request)
+
+    async def event_stream():
+        cached = await get_cached_guide(key)
+        if cached is not None:
+            yield f"event: complete\ndata: {dumps_json_str(cached.data)}\n\n"
+            return
+        async for event, data in stream_travel_guide(request):
+            if event == "complete" and not await is_degraded_guide(request, data):
+                await cache_guide(key, data)
+            yield f"event: {event}\ndata: {dumps_json_str(data)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Disable proxy buffering so events are delivered immediately
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+def _job_response(job: Job) -> GuideJob:
+    return GuideJob(
+        job_id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=job.result,
+        error=job.error
+    )
+
+
+@router.post("/api/jobs", response_model=GuideJob, response_class=GuideResponse, status_code=202)
+async def create_guide_job(request: GuideRequest):
+    """
+    Queue a travel guide for background generation
+    
+    Returns immediately; poll GET /api/jobs/{job_id} for the result.
+    An identical request that is already queued or running returns
+    that job instead of starting a new one.
+    
+    Args:
+        request: GuideRequest with destinations, days, and preferences
+        
+    Returns:
+        GuideJob with the job id and status
+    """
+    try:
+        job, _ = await submit_job(request)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return GuideResponse(
+        _job_response(job),
+        status_code=202,
+        headers={"Location": f"/api/jobs/{job.id}"}
+    )
+
+
+@router.get("/api/jobs/{job_id}", response_model=GuideJob, response_class=GuideResponse)
+async def get_guide_job(job_id: str):
+    """
+    Get the status of a guide job, with the TravelGuide once completed
+    
+    Args:
+        job_id: Id returned by POST /api/jobs
+        
+    Returns:
+        GuideJob
+    """
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return GuideResponse(_job_response(job))
+
+
 @router.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "travel-guide-api"}
+    return {
+        "status": "healthy",
+        "service": "travel-guide-api",
+        "http_pools": get_http_pool_stats(),
+        "guide_cache": get_guide_cache_stats(),
+        "llm_providers": get_provider_health(),
+        "llm_routing": get_routing_stats(),
+        "warm_up": get_warm_up_status()
+    }
@@ -0,0 +1,15 @@
+"""
+Prometheus metrics endpoint
+"""
+from fastapi import APIRouter, Response
+from services.metrics import PROMETHEUS_AVAILABLE, CONTENT_TYPE_LATEST, export_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Metrics in the Prometheus text format"""
+    if not PROMETHEUS_AVAILABLE:
+        return Response("prometheus-client is not installed\n", status_code=503, media_type="text/plain")
+    return Response(export_metrics(), media_type=CONTENT_TYPE_LATEST)
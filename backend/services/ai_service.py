@@ -3,29 +3,52 @@ AI service using OpenRouter or Google Gemini for content generation
 """
 import os
 import json
-from typing import List, Dict, Any
-from dotenv import load_dotenv
-import google.generativeai as genai
-from openai import OpenAI
-
-load_dotenv()
-
-# Configuration
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "anthropic/claude-3.5-sonnet")
-
-# Initialize Clients
-openai_client = None
-if OPENROUTER_API_KEY:
-    openai_client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=OPENROUTER_API_KEY,
-    )
+import time
+import asyncio
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
+from services.llm_providers import (
+    call_openrouter,
+    call_gemini,
+    stream_openrouter,
+    stream_gemini,
+    openrouter_available,
+    gemini_available,
+    OPENROUTER_MODEL,
+    GEMINI_MODEL,
+    OPENROUTER_TIMEOUT,
+    GEMINI_TIMEOUT
+)
+from services.llm_cache import (
+    get_cached_response,
+    store_response,
+    single_flight,
+    single_flight_stream,
+    shared_flight,
+    prompt_key
+)
+from services.cache_store import LRUCache, MISSING, normalize_key
+from services.json_stream import JSONArrayStreamParser
+from services.metrics import track
+from services.resilience import Attempt, CircuitOpenError, get_guard, hedged_call
+from services.provider_routing import get_stats, order_providers
+from services.itinerary_service import ItinerarySegment, plan_itinerary_segments
+
+# Bundled mode: one prompt per destination returns details and all
+# recommendation categories instead of four separate calls
+AI_BUNDLED_MODE = os.getenv("AI_BUNDLED_MODE", "false").lower() == "true"
+
+# Long itineraries are generated as concurrent per-destination/per-week segments
+ITINERARY_CHUNKING = os.getenv("ITINERARY_CHUNKING", "true").lower() == "true"
+ITINERARY_CHUNK_MIN_DAYS = int(os.getenv("ITINERARY_CHUNK_MIN_DAYS", "4"))
 
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
-    gemini_model = genai.GenerativeModel('gemini-pro')
+# Parsed bundles, so details and recommendation stages of one guide share a call
+_bundle_cache = LRUCache(max_entries=256, ttl=600)
+
+CATEGORY_PROMPTS = {
+    "sleep": "accommodations (hotels, hostels, unique stays)",
+    "eat": "restaurants, cafes, and food experiences",
+    "curiosity": "hidden gems, local curiosities, and unique attractions"
+}
 
 
 def _clean_json_response(text: str) -> str:
@@ -40,41 +63,332 @@ def _clean_json_response(text: str) -> str:
     return text.strip()
 
 
-async def generate_content(prompt: str) -> str:
+def _is_valid_json(text: str) -> bool:
+    """Whether a response parses as JSON once code fences are removed"""
+    try:
+        json.loads(_clean_json_response(text))
+        return True
+    except Exception:
+        return False
+
+
+def _llm_providers() -> List[Tuple[str, str, Callable, Callable, float]]:
+    """Configured providers in default order: (name, model, call, stream, deadline)"""
+    providers = []
+    if openrouter_available():
+        providers.append(("openrouter", OPENROUTER_MODEL, call_openrouter, stream_openrouter, OPENROUTER_TIMEOUT))
+    if gemini_available():
+        providers.append(("gemini", GEMINI_MODEL, call_gemini, stream_gemini, GEMINI_TIMEOUT))
+    return providers
+
+
+def _lease_ttl() -> float:
+    """Longest a hedged call can take: every provider in turn, up to its deadline"""
+    return sum(deadline for *_, deadline in _llm_providers()) or OPENROUTER_TIMEOUT
+
+
+async def _cached_response(prompt: str, count: bool = True) -> Optional[str]:
+    """Cached response from any configured provider, or None"""
+    for provider, model, *_ in _llm_providers():
+        cached = await get_cached_response(provider, model, prompt, count)
+        if cached is not None:
+            return cached
+    return None
+
+
+def _attempt(
+    provider: str,
+    model: str,
+    route_key: str,
+    func: Callable[[], Awaitable[Any]],
+    deadline: float
+) -> Attempt:
     """
-    Generate content using available AI provider (OpenRouter preferred)
+    One provider call for hedged_call: guarded by the provider's deadline and
+    circuit breaker, with its outcome fed into the routing statistics
+
+    Args:
+        route_key: Prompt type, plus ':stream' when timing the first chunk
     """
-    if openai_client:
+    async def run() -> Any:
+        stats = get_stats(provider, model, route_key)
+        start = time.monotonic()
         try:
-            response = openai_client.chat.completions.create(
-                model=OPENROUTER_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a helpful travel assistant that outputs valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.choices[0].message.content
+            result = await get_guard(provider).run(route_key, func, deadline)
+        except asyncio.CancelledError:
+            stats.record_abandoned(time.monotonic() - start)
+            raise
+        except CircuitOpenError:
+            raise
+        except asyncio.TimeoutError:
+            print(f"{provider} timed out after {deadline}s")
+            stats.record_failure(max(time.monotonic() - start, deadline))
+            raise
         except Exception as e:
-            print(f"OpenRouter Error: {e}")
-            # Fallback to Gemini if available
-            if not GOOGLE_API_KEY:
-                raise e
-    
-    if GOOGLE_API_KEY:
+            print(f"{provider} error: {e}")
+            stats.record_failure(time.monotonic() - start)
+            raise
+        stats.record_success(time.monotonic() - start)
+        return result
+    return Attempt(provider, run)
+
+
+async def _generate_uncached(prompt: str, prompt_type: str) -> str:
+    """
+    Call the providers, expected fastest first, caching valid responses
+
+    Each call is bounded by its provider's deadline and skipped while the
+    provider's circuit is open. The next provider starts when the current
+    one fails, or as a hedge once it runs past its usual latency.
+    """
+    providers = order_providers(_llm_providers(), prompt_type)
+    if not providers:
+        return "{}" # No provider available
+
+    def complete(provider: str, call: Callable, deadline: float) -> Callable[[], Awaitable[str]]:
+        async def tracked_call() -> str:
+            async with track(provider, "complete"):
+                return await call(prompt, timeout=deadline)
+        return tracked_call
+
+    provider, text = await hedged_call(
+        [
+            _attempt(name, model, prompt_type, complete(name, call, deadline), deadline)
+            for name, model, call, _, deadline in providers
+        ],
+        get_guard(providers[0][0]).hedge_delay(prompt_type)
+    )
+    if _is_valid_json(text):
+        model = next(model for name, model, *_ in providers if name == provider)
+        await store_response(provider, model, prompt, text)
+    return text
+
+
+async def generate_content(prompt: str, prompt_type: str = "default") -> str:
+    """
+    Generate content using the AI provider expected to answer fastest
+
+    Responses are cached per (provider, model, normalized prompt), and
+    concurrent calls with the same prompt share a single upstream call.
+
+    Args:
+        prompt: The prompt
+        prompt_type: Routing statistics key ('details', 'itinerary', ...)
+    """
+    cached = await _cached_response(prompt)
+    if cached is not None:
+        return cached
+
+    key = prompt_key(prompt)
+    return await single_flight(key, lambda: shared_flight(
+        key,
+        lambda: _cached_response(prompt, count=False),
+        lambda: _generate_uncached(prompt, prompt_type),
+        _lease_ttl()
+    ))
+
+
+async def _open_stream(stream: AsyncIterator[str]) -> Tuple[AsyncIterator[str], str]:
+    """Start a stream and wait for its first chunk ('' if it is empty)"""
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = ""
+    except BaseException:
+        await stream.aclose()
+        raise
+    return stream, first
+
+
+async def stream_content(prompt: str, prompt_type: str = "default") -> AsyncIterator[str]:
+    """
+    Stream generated content using the AI provider expected to start fastest
+
+    A cached response is replayed as a single chunk. Concurrent streams of
+    the same prompt share one upstream stream: later callers get the chunks
+    received so far, then follow it live.
+    """
+    cached = await _cached_response(prompt)
+    if cached is not None:
+        yield cached
+        return
+
+    async for chunk in single_flight_stream(
+        prompt_key(prompt),
+        lambda: _stream_uncached(prompt, prompt_type)
+    ):
+        yield chunk
+
+
+async def _stream_uncached(prompt: str, prompt_type: str) -> AsyncIterator[str]:
+    """
+    Stream from the providers, caching a valid complete response
+
+    Providers race for the first chunk the same way generate_content races
+    for a response (deadline, circuit breaker, hedging); once a chunk has
+    been sent, the stream is committed to that provider.
+    """
+    route_key = f"{prompt_type}:stream"
+    providers = order_providers(_llm_providers(), route_key)
+    if not providers:
+        yield "{}" # No provider available
+        return
+
+    def first_chunk(provider: str, stream: Callable, deadline: float) -> Callable[[], Awaitable[Tuple[AsyncIterator[str], str]]]:
+        async def tracked_open() -> Tuple[AsyncIterator[str], str]:
+            async with track(provider, "first_chunk"):
+                return await _open_stream(stream(prompt, timeout=deadline))
+        return tracked_open
+
+    async def discard(opened: Tuple[AsyncIterator[str], str]) -> None:
+        await opened[0].aclose()
+
+    provider, (stream, first) = await hedged_call(
+        [
+            _attempt(name, model, route_key, first_chunk(name, stream, deadline), deadline)
+            for name, model, _, stream, deadline in providers
+        ],
+        get_guard(providers[0][0]).hedge_delay(route_key),
+        discard=discard
+    )
+
+    chunks = [first]
+    try:
+        if first:
+            yield first
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+    except Exception as e:
+        print(f"{provider} streaming error: {e}")
+        get_guard(provider).breaker.record_failure()
+        raise
+    finally:
+        await stream.aclose()
+
+    text = "".join(chunks)
+    if _is_valid_json(text):
+        model = next(model for name, model, *_ in providers if name == provider)
+        await store_response(provider, model, prompt, text)
+
+
+async def stream_json_array(prompt: str, prompt_type: str = "default") -> AsyncIterator[Any]:
+    """
+    Stream a JSON array response, yielding each element once it is complete
+    """
+    parser = JSONArrayStreamParser()
+    async for chunk in stream_content(prompt, prompt_type):
+        for element in parser.feed(chunk):
+            yield element
+
+
+def _fallback_location_details(destination: str) -> Dict[str, Any]:
+    """Generic location details used when the AI response is unusable"""
+    return {
+        "name": destination,
+        "description": f"A beautiful destination: {destination}",
+        "highlights": ["Explore the local culture", "Visit historic sites", "Enjoy local cuisine"],
+        "best_time_to_visit": "Spring and Fall",
+        "local_tip": "Learn a few phrases in the local language"
+    }
+
+
+def _fallback_recommendations(destination: str, category: str) -> List[Dict[str, Any]]:
+    """Generic recommendation used when the AI response is unusable"""
+    return [{
+        "name": f"Great {category} option in {destination}",
+        "description": "A wonderful choice for travelers",
+        "category": category,
+        "price_level": "$$",
+        "why_recommended": "Highly rated by locals and tourists alike"
+    }]
+
+
+def is_fallback_location_details(destination: str, details: Dict[str, Any]) -> bool:
+    """
+    Whether details are empty or the generic fallback (no usable AI response, nothing cached)
+
+    Only the fields shared with the fallback are compared, so a built
+    LocationDetail (as a dict) can be checked too.
+    """
+    if not details:
+        return True
+    fallback = _fallback_location_details(destination)
+    shared = [key for key in fallback if key in details]
+    return bool(shared) and all(details[key] == fallback[key] for key in shared)
+
+
+def is_fallback_recommendations(destination: str, category: str, recommendations: List[Dict[str, Any]]) -> bool:
+    """Whether recommendations are empty or the generic fallback (no usable AI response, nothing cached)"""
+    if not recommendations:
+        return True
+    fallback = _fallback_recommendations(destination, category)
+    return [rec.get("name") for rec in recommendations] == [rec["name"] for rec in fallback]
+
+
+async def generate_destination_bundle(destination: str) -> Dict[str, Any]:
+    """
+    Generate details and all recommendation categories in a single prompt
+
+    Returns:
+        Location details dict with an extra 'recommendations' key mapping
+        'sleep', 'eat' and 'curiosity' to recommendation lists, or an empty
+        dict if the response could not be parsed
+    """
+    key = normalize_key(destination)
+    cached = _bundle_cache.get(key)
+    if cached is not MISSING:
+        return cached
+
+    async def fetch() -> Dict[str, Any]:
+        categories = "\n".join(
+            f'  - {category}: Array of 5 {text}' for category, text in CATEGORY_PROMPTS.items()
+        )
+        prompt = f"""Generate travel information about {destination} as a single JSON object.
+
+Include:
+- name: The destination name
+- description: A compelling 2-3 sentence description
+- highlights: Array of 5 must-see attractions or experiences
+- best_time_to_visit: Brief note on best season
+- local_tip: One insider tip for visitors
+- recommendations: Object with these keys:
+{categories}
+  Each recommendation has:
+  - name: Name of the place
+  - description: 1-2 sentence description
+  - price_level: "$" (budget), "$$" (mid-range), or "$$$" (luxury)
+  - why_recommended: One sentence explaining why it's recommended
+
+Format as valid JSON only, no additional text."""
+
+        response_text = await generate_content(prompt, "bundle")
         try:
-            response = gemini_model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            print(f"Gemini Error: {e}")
-            raise e
-            
-    return "{}" # No provider available
+            result = json.loads(_clean_json_response(response_text))
+            if not isinstance(result, dict):
+                result = {}
+        except Exception:
+            result = {}
+        # Only successes are kept: concurrent stages already share this call
+        # through single_flight, and a cached failure would serve fallbacks
+        # for the destination until it expired
+        if result:
+            _bundle_cache.set(key, result)
+        return result
+
+    return await single_flight(f"bundle:{key}", fetch)
 
 
 async def generate_location_details(destination: str) -> Dict[str, Any]:
     """
     Generate detailed information about a destination
     """
+    if AI_BUNDLED_MODE:
+        bundle = await generate_destination_bundle(destination)
+        if not bundle.get("description"):
+            return _fallback_location_details(destination)
+        return {k: v for k, v in bundle.items() if k != "recommendations"}
+
     prompt = f"""Generate detailed travel information about {destination} in JSON format.
 
 Include:
@@ -86,7 +400,7 @@ Include:
 
 Format as valid JSON only, no additional text."""
 
-    response_text = await generate_content(prompt)
+    response_text = await generate_content(prompt, "details")
     
     try:
         # Parse the JSON response
@@ -94,27 +408,16 @@ Format as valid JSON only, no additional text."""
         return result
     except Exception:
         # Fallback
-        return {
-            "name": destination,
-            "description": f"A beautiful destination: {destination}",
-            "highlights": ["Explore the local culture", "Visit historic sites", "Enjoy local cuisine"],
-            "best_time_to_visit": "Spring and Fall",
-            "local_tip": "Learn a few phrases in the local language"
-        }
+        return _fallback_location_details(destination)
 
 
-async def generate_itinerary(
-    destinations: List[str], 
-    days: int,
-    preferences: str = ""
-) -> List[Dict[str, Any]]:
-    """
-    Generate day-by-day itinerary for the trip
-    """
+def _itinerary_prompt(destinations: List[str], days: int, preferences: str, context: str = "") -> str:
+    """Prompt for a day-by-day itinerary"""
     destinations_str = ", ".join(destinations)
     pref_str = f" with preferences: {preferences}" if preferences else ""
+    context_str = f" {context}" if context else ""
     
-    prompt = f"""Create a {days}-day travel itinerary for {destinations_str}{pref_str}.
+    return f"""Create a {days}-day travel itinerary for {destinations_str}{pref_str}.{context_str}
 
 For each day, provide:
 - day_number: Integer (1 to {days})
@@ -128,26 +431,135 @@ For each day, provide:
 
 Optimize the route to minimize travel time. Return as a JSON array of days, no additional text."""
 
-    response_text = await generate_content(prompt)
-    
+
+def _fallback_itinerary(destinations: List[str], days: int) -> List[Dict[str, Any]]:
+    """One generic activity per day, used when the AI response is unusable"""
+    return [{
+        "day_number": i + 1,
+        "title": f"Exploring {destinations[min(i, len(destinations)-1)]}",
+        "location": destinations[min(i, len(destinations)-1)],
+        "activities": [
+            {
+                "time": "Morning",
+                "activity": "City exploration",
+                "description": "Discover the main attractions",
+                "duration": "3 hours"
+            }
+        ]
+    } for i in range(days)]
+
+
+def is_fallback_itinerary_day(day: Dict[str, Any]) -> bool:
+    """Whether an itinerary day (raw or built DayItinerary dict) is the generic fallback"""
+    fallback = _fallback_itinerary([day.get("location", "")], 1)[0]["activities"]
+    activities = day.get("activities") or []
+    return not activities or [
+        (act.get("activity"), act.get("description")) for act in activities
+    ] == [(act["activity"], act["description"]) for act in fallback]
+
+
+def _segment_prompt(segment: ItinerarySegment, preferences: str) -> str:
+    """Itinerary prompt for one segment of a longer trip"""
+    context = ""
+    if segment.parts > 1:
+        focus = "the main sights" if segment.part == 1 else "different sights, lesser-known neighbourhoods and day trips"
+        context = (
+            f"This is part {segment.part} of {segment.parts} of a {segment.stay_days}-day stay, "
+            f"planned separately: focus on {focus}."
+        )
+    return _itinerary_prompt(segment.destinations, segment.days, preferences, context)
+
+
+async def _stream_segment(segment: ItinerarySegment, preferences: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Days of one itinerary segment, numbered within the whole trip
+
+    Days the response does not cover (or all of them, if the provider
+    fails) are filled from the fallback itinerary.
+    """
+    count = 0
     try:
-        result = json.loads(_clean_json_response(response_text))
-        return result if isinstance(result, list) else []
-    except Exception:
-        # Fallback itinerary
-        return [{
-            "day_number": i + 1,
-            "title": f"Exploring {destinations[min(i, len(destinations)-1)]}",
-            "location": destinations[min(i, len(destinations)-1)],
-            "activities": [
-                {
-                    "time": "Morning",
-                    "activity": "City exploration",
-                    "description": "Discover the main attractions",
-                    "duration": "3 hours"
-                }
-            ]
-        } for i in range(days)]
+        async for day in stream_json_array(_segment_prompt(segment, preferences), "itinerary"):
+            if isinstance(day, dict) and count < segment.days:
+                yield {**day, "day_number": segment.start_day + count}
+                count += 1
+    except Exception as e:
+        print(f"Itinerary streaming error (days {segment.start_day}-{segment.end_day}): {e}")
+
+    for day in _fallback_itinerary(segment.destinations, segment.days)[count:]:
+        yield {**day, "day_number": segment.start_day + day["day_number"] - 1}
+
+
+async def stream_itinerary(
+    destinations: List[str], 
+    days: int,
+    preferences: str = ""
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate the itinerary, yielding each day as soon as it has been generated
+
+    Trips of at least ITINERARY_CHUNK_MIN_DAYS days are split into segments
+    (see plan_itinerary_segments) that are generated concurrently and
+    yielded in day order, so the slowest call covers at most one stay or
+    week instead of the whole trip.
+
+    Days the response does not cover (or all of them, if the provider
+    fails) are filled from the fallback itinerary, so `days` days are
+    always yielded.
+    """
+    segments = []
+    if ITINERARY_CHUNKING and days >= ITINERARY_CHUNK_MIN_DAYS:
+        segments = plan_itinerary_segments(destinations, days)
+
+    if len(segments) > 1:
+        queues: List[asyncio.Queue] = [asyncio.Queue() for _ in segments]
+
+        async def produce(segment: ItinerarySegment, queue: asyncio.Queue) -> None:
+            try:
+                async for day in _stream_segment(segment, preferences):
+                    queue.put_nowait(day)
+            finally:
+                queue.put_nowait(None)
+
+        tasks = [asyncio.ensure_future(produce(seg, queue)) for seg, queue in zip(segments, queues)]
+        try:
+            for queue in queues:
+                while True:
+                    day = await queue.get()
+                    if day is None:
+                        break
+                    yield day
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Wait for the cancelled producers, so none is destroyed pending
+            # or leaves its exception unretrieved
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return
+
+    yielded = 0
+    try:
+        async for day in stream_json_array(_itinerary_prompt(destinations, days, preferences), "itinerary"):
+            if isinstance(day, dict) and yielded < days:
+                yielded += 1
+                yield day
+    except Exception as e:
+        print(f"Itinerary streaming error: {e}")
+
+    # Days the response did not cover (all of them if it failed) come from the fallback
+    for day in _fallback_itinerary(destinations, days)[yielded:]:
+        yield day
+
+
+async def generate_itinerary(
+    destinations: List[str], 
+    days: int,
+    preferences: str = ""
+) -> List[Dict[str, Any]]:
+    """
+    Generate day-by-day itinerary for the trip
+    """
+    return [day async for day in stream_itinerary(destinations, days, preferences)]
 
 
 async def generate_recommendations(
@@ -157,13 +569,15 @@ async def generate_recommendations(
     """
     Generate recommendations for sleep, eat, or curiosities
     """
-    category_prompts = {
-        "sleep": "accommodations (hotels, hostels, unique stays)",
-        "eat": "restaurants, cafes, and food experiences",
-        "curiosity": "hidden gems, local curiosities, and unique attractions"
-    }
-    
-    category_text = category_prompts.get(category, "places of interest")
+    if AI_BUNDLED_MODE and category in CATEGORY_PROMPTS:
+        bundle = await generate_destination_bundle(destination)
+        by_category = bundle.get("recommendations")
+        recs = by_category.get(category) if isinstance(by_category, dict) else None
+        if not isinstance(recs, list) or not recs:
+            return _fallback_recommendations(destination, category)
+        return [{**rec, "category": category} for rec in recs if isinstance(rec, dict)]
+
+    category_text = CATEGORY_PROMPTS.get(category, "places of interest")
     
     prompt = f"""Recommend 5 great {category_text} in {destination}.
 
@@ -176,20 +590,14 @@ For each recommendation, provide:
 
 Return as a JSON array, no additional text."""
 
-    response_text = await generate_content(prompt)
+    response_text = await generate_content(prompt, "recommendations")
     
     try:
         result = json.loads(_clean_json_response(response_text))
         return result if isinstance(result, list) else []
     except Exception:
         # Fallback recommendations
-        return [{
-            "name": f"Great {category} option in {destination}",
-            "description": "A wonderful choice for travelers",
-            "category": category,
-            "price_level": "$$",
-            "why_recommended": "Highly rated by locals and tourists alike"
-        }]
+        return _fallback_recommendations(destination, category)
 
 
 async def generate_curiosities(destination: str) -> List[str]:
@@ -200,7 +608,7 @@ async def generate_curiosities(destination: str) -> List[str]:
 
 Return as a JSON array of strings, each being a complete sentence. No additional text."""
 
-    response_text = await generate_content(prompt)
+    response_text = await generate_content(prompt, "curiosities")
     
     try:
         result = json.loads(_clean_json_response(response_text))
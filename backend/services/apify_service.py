@@ -3,43 +3,81 @@ Apify service for fetching real data from Google Maps
 Uses the compass/crawler-google-places scraper
 """
 import os
-from typing import List, Dict, Optional
-from apify_client import ApifyClient
-from dotenv import load_dotenv
+import asyncio
+from typing import TYPE_CHECKING, List, Dict, Optional, Set, Tuple
+from services.places_store import lookup_places, save_places
+from services.metrics import track
 
-load_dotenv()
+if TYPE_CHECKING:
+    from apify_client import ApifyClientAsync
 
 APIFY_API_TOKEN = os.getenv("APIFY_API_TOKEN")
 APIFY_ENABLED = bool(APIFY_API_TOKEN)
+APIFY_ACTOR_ID = "compass/crawler-google-places"
 
-# Initialize Apify client
-client = ApifyClient(APIFY_API_TOKEN) if APIFY_ENABLED else None
+# Apify client, created on first use (the SDK is slow to import)
+_client: Optional["ApifyClientAsync"] = None
 
 
-async def search_google_places(
-    query: str,
-    max_results: int = 10,
-    min_rating: float = 4.0
-) -> List[Dict]:
+def _get_client() -> "ApifyClientAsync":
+    global _client
+    if _client is None:
+        from apify_client import ApifyClientAsync
+        _client = ApifyClientAsync(APIFY_API_TOKEN)
+    return _client
+
+
+def warm_up() -> None:
+    """Import the Apify SDK and build the client, if Apify is enabled"""
+    if APIFY_ENABLED:
+        _get_client()
+
+# Search query and minimum rating per recommendation category
+CATEGORY_QUERIES = {
+    "sleep": "hotels in {destination}",
+    "eat": "best restaurants in {destination}",
+    "curiosity": "tourist attractions in {destination}"
+}
+CATEGORY_MIN_RATING = {
+    "sleep": 4.0,
+    "eat": 4.0,
+    "curiosity": 4.2
+}
+
+
+def _dataset_id(run) -> str:
+    """Default dataset of an actor run (dict in older clients, model in newer ones)"""
+    if isinstance(run, dict):
+        return run["defaultDatasetId"]
+    return run.default_dataset_id
+
+
+async def run_places_search(
+    queries: List[str],
+    max_results: int = 10
+) -> Dict[str, List[Dict]]:
     """
-    Search Google Places using Apify scraper
-    
+    Run several Google Maps searches in a single Apify actor run
+
     Args:
-        query: Search query (e.g., "restaurants in Paris")
-        max_results: Maximum number of results to return
-        min_rating: Minimum rating filter (0-5)
-        
+        queries: Search queries (e.g., ["restaurants in Paris", "hotels in Rome"])
+        max_results: Maximum places crawled per query
+
     Returns:
-        List of place dictionaries with details
+        Dict mapping each query to its raw place items (empty on errors)
     """
+    results: Dict[str, List[Dict]] = {query: [] for query in queries}
     if not APIFY_ENABLED:
         print("Apify not enabled - token not found")
-        return []
-    
+        return results
+    if not queries:
+        return results
+
     try:
+        client = _get_client()
         # Prepare the Actor input
         run_input = {
-            "searchStringsArray": [query],
+            "searchStringsArray": queries,
             "maxCrawledPlacesPerSearch": max_results,
             "language": "en",
             "skipClosedPlaces": True,
@@ -51,143 +89,271 @@ async def search_google_places(
             # Skip additional info to save time
             "additionalInfo": False,
         }
-        
-        # Run the Actor and wait for it to finish
-        print(f"Running Apify scraper for: {query}")
-        run = client.actor("compass/crawler-google-places").call(run_input=run_input)
-        
-        # Fetch results from the dataset
-        results = []
-        for item in client.dataset(run["defaultDatasetId"]).iterate_items():
-            # Filter by rating
-            rating = item.get("totalScore", 0)
-            if rating >= min_rating:
-                results.append(item)
-        
-        print(f"Found {len(results)} places with rating >= {min_rating}")
-        return results[:max_results]
-        
+
+        # Run the Actor and wait for it to finish without blocking the event loop
+        print(f"Running Apify scraper for {len(queries)} queries")
+        async with track("apify", "places_search"):
+            run = await client.actor(APIFY_ACTOR_ID).call(run_input=run_input)
+
+            # Split the dataset by the search string that produced each place
+            lookup = {query.casefold(): query for query in queries}
+            async for item in client.dataset(_dataset_id(run)).iterate_items():
+                query = lookup.get((item.get("searchString") or "").casefold())
+                if query is None and len(queries) == 1:
+                    query = queries[0]
+                if query is not None:
+                    results[query].append(item)
+
+        return results
+
     except Exception as e:
         print(f"Error fetching from Apify: {e}")
-        return []
+        return results
+
+
+async def search_google_places(
+    query: str,
+    max_results: int = 10,
+    min_rating: float = 4.0
+) -> List[Dict]:
+    """
+    Search Google Places using Apify scraper
+
+    Args:
+        query: Search query (e.g., "restaurants in Paris")
+        max_results: Maximum number of results to return
+        min_rating: Minimum rating filter (0-5)
+
+    Returns:
+        List of place dictionaries with details
+    """
+    places = (await run_places_search([query], max_results))[query]
+    results = _filter_by_rating(places, min_rating)
+    print(f"Found {len(results)} places with rating >= {min_rating}")
+    return results[:max_results]
+
+
+def _filter_by_rating(places: List[Dict], min_rating: float) -> List[Dict]:
+    """Keep places rated at least `min_rating`"""
+    return [place for place in places if (place.get("totalScore") or 0) >= min_rating]
+
+
+def _image_url(place: Dict):
+    return place.get("imageUrl") or (place.get("images", [{}])[0].get("url") if place.get("images") else None)
+
+
+def _coordinates(place: Dict):
+    return {
+        "lat": place.get("location", {}).get("lat"),
+        "lng": place.get("location", {}).get("lng")
+    } if place.get("location") else None
+
+
+def _price_level(place: Dict, default: str) -> str:
+    """Determine price level"""
+    if place.get("priceLevel"):
+        return "$" * len(place.get("priceLevel"))
+    return default
+
+
+def _transform_attraction(place: Dict) -> Dict:
+    return {
+        "name": place.get("title", ""),
+        "description": place.get("description", ""),
+        "rating": place.get("totalScore", 0),
+        "reviews_count": place.get("reviewsCount", 0),
+        "address": place.get("address", ""),
+        "website": place.get("website"),
+        "phone": place.get("phone"),
+        "image_url": _image_url(place),
+        "coordinates": _coordinates(place),
+        "price_level": place.get("priceLevel"),
+        "category": place.get("categoryName", "Attraction")
+    }
+
+
+def _transform_restaurant(place: Dict) -> Dict:
+    return {
+        "name": place.get("title", ""),
+        "description": place.get("description", ""),
+        "rating": place.get("totalScore", 0),
+        "reviews_count": place.get("reviewsCount", 0),
+        "address": place.get("address", ""),
+        "website": place.get("website"),
+        "phone": place.get("phone"),
+        "image_url": _image_url(place),
+        "price_level": _price_level(place, "$$$"),
+        "cuisine": place.get("categoryName", "Restaurant"),
+        "coordinates": _coordinates(place),
+    }
+
+
+def _transform_accommodation(place: Dict) -> Dict:
+    return {
+        "name": place.get("title", ""),
+        "description": place.get("description", ""),
+        "rating": place.get("totalScore", 0),
+        "reviews_count": place.get("reviewsCount", 0),
+        "address": place.get("address", ""),
+        "website": place.get("website"),
+        "phone": place.get("phone"),
+        "image_url": _image_url(place),
+        "price_level": _price_level(place, "$$"),
+        "type": place.get("categoryName", "Hotel"),
+        "coordinates": _coordinates(place),
+    }
+
+
+CATEGORY_TRANSFORMS = {
+    "sleep": _transform_accommodation,
+    "eat": _transform_restaurant,
+    "curiosity": _transform_attraction
+}
+
+
+async def _scrape_places(
+    pairs: List[Tuple[str, str]],
+    max_results: int
+) -> Dict[Tuple[str, str], List[Dict]]:
+    """
+    Scrape (destination, category) pairs in a single Apify actor run
+    and save the results to the local places store
+
+    Returns:
+        Dict mapping each pair to its transformed place details
+    """
+    queries = {
+        (destination, category): CATEGORY_QUERIES[category].format(destination=destination)
+        for destination, category in pairs
+    }
+    raw = await run_places_search(list(queries.values()), max_results=max_results)
+
+    scraped = {}
+    for (destination, category), query in queries.items():
+        filtered = _filter_by_rating(raw[query], CATEGORY_MIN_RATING[category])[:max_results]
+        scraped[(destination, category)] = [CATEGORY_TRANSFORMS[category](place) for place in filtered]
+        # Empty results are indistinguishable from a failed run, so only store hits
+        if scraped[(destination, category)]:
+            await save_places(destination, category, scraped[(destination, category)], max_results)
+    return scraped
+
+
+# Pairs with a background refresh in flight, and the tasks themselves
+# (kept referenced so they aren't garbage collected mid-run)
+_refreshing: Set[Tuple[str, str]] = set()
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
+def _schedule_refresh(pairs: List[Tuple[str, str]], max_results: int) -> None:
+    """Re-scrape stale pairs in the background without blocking the request"""
+    pairs = [pair for pair in pairs if pair not in _refreshing]
+    if not pairs:
+        return
+    _refreshing.update(pairs)
+
+    async def refresh():
+        try:
+            await _scrape_places(pairs, max_results)
+        finally:
+            _refreshing.difference_update(pairs)
+
+    print(f"Refreshing {len(pairs)} stale place lists in the background")
+    task = asyncio.create_task(refresh())
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def get_places_for_trip(
+    destinations: List[str],
+    max_results: int = 3,
+    categories: Optional[List[str]] = None
+) -> Dict[str, Dict[str, List[Dict]]]:
+    """
+    Fetch hotels, restaurants and attractions for every destination
+
+    Places already in the local store are served from it (stale ones are
+    refreshed in the background); everything else is scraped in a single
+    Apify actor run.
+
+    Args:
+        destinations: Destination names
+        max_results: Maximum places per destination and category
+        categories: Categories to fetch (defaults to all)
+
+    Returns:
+        Dict mapping destination -> category ('sleep', 'eat', 'curiosity')
+        -> list of transformed place details
+    """
+    pairs = [
+        (destination, category)
+        for destination in dict.fromkeys(destinations)
+        for category in CATEGORY_QUERIES
+        if categories is None or category in categories
+    ]
+
+    found: Dict[Tuple[str, str], List[Dict]] = {}
+    missing, stale = [], []
+    for pair in pairs:
+        stored = await lookup_places(*pair)
+        # Entries scraped with a smaller limit can't satisfy this request
+        if stored is None or stored["max_results"] < max_results:
+            missing.append(pair)
+            continue
+        found[pair] = stored["places"][:max_results]
+        if stored["stale"]:
+            stale.append(pair)
+
+    if missing:
+        found.update(await _scrape_places(missing, max_results))
+    if stale and APIFY_ENABLED:
+        _schedule_refresh(stale, max_results)
+
+    places: Dict[str, Dict[str, List[Dict]]] = {}
+    for destination, category in pairs:
+        places.setdefault(destination, {})[category] = found[(destination, category)]
+    return places
 
 
 async def get_attractions(destination: str, max_results: int = 5) -> List[Dict]:
     """
-    Get top attractions for a destination
-    
+    Get top attractions for a destination (through the places store)
+
     Args:
         destination: Destination name
         max_results: Maximum results
-        
+
     Returns:
         List of attraction details
     """
-    query = f"tourist attractions in {destination}"
-    places = await search_google_places(query, max_results=max_results, min_rating=4.2)
-    
-    # Transform to our format
-    attractions = []
-    for place in places:
-        attractions.append({
-            "name": place.get("title", ""),
-            "description": place.get("description", ""),
-            "rating": place.get("totalScore", 0),
-            "reviews_count": place.get("reviewsCount", 0),
-            "address": place.get("address", ""),
-            "website": place.get("website"),
-            "phone": place.get("phone"),
-            "image_url": place.get("imageUrl") or (place.get("images", [{}])[0].get("url") if place.get("images") else None),
-            "coordinates": {
-                "lat": place.get("location", {}).get("lat"),
-                "lng": place.get("location", {}).get("lng")
-            } if place.get("location") else None,
-            "price_level": place.get("priceLevel"),
-            "category": place.get("categoryName", "Attraction")
-        })
-    
-    return attractions
+    places = await get_places_for_trip([destination], max_results=max_results, categories=["curiosity"])
+    return places[destination]["curiosity"]
 
 
 async def get_restaurants(destination: str, max_results: int = 5) -> List[Dict]:
     """
-    Get top restaurants for a destination
-    
+    Get top restaurants for a destination (through the places store)
+
     Args:
         destination: Destination name
         max_results: Maximum results
-        
+
     Returns:
         List of restaurant details
     """
-    query = f"best restaurants in {destination}"
-    places = await search_google_places(query, max_results=max_results, min_rating=4.0)
-    
-    # Transform to our format
-    restaurants = []
-    for place in places:
-        # Determine price level
-        price_level = "$$$"  # default
-        if place.get("priceLevel"):
-            price_level = "$" * len(place.get("priceLevel"))
-        
-        restaurants.append({
-            "name": place.get("title", ""),
-            "description": place.get("description", ""),
-            "rating": place.get("totalScore", 0),
-            "reviews_count": place.get("reviewsCount", 0),
-            "address": place.get("address", ""),
-            "website": place.get("website"),
-            "phone": place.get("phone"),
-            "image_url": place.get("imageUrl") or (place.get("images", [{}])[0].get("url") if place.get("images") else None),
-            "price_level": price_level,
-            "cuisine": place.get("categoryName", "Restaurant"),
-            "coordinates": {
-                "lat": place.get("location", {}).get("lat"),
-                "lng": place.get("location", {}).get("lng")
-            } if place.get("location") else None,
-        })
-    
-    return restaurants
+    places = await get_places_for_trip([destination], max_results=max_results, categories=["eat"])
+    return places[destination]["eat"]
 
 
 async def get_accommodations(destination: str, max_results: int = 5) -> List[Dict]:
     """
-    Get top accommodations for a destination
-    
+    Get top accommodations for a destination (through the places store)
+
     Args:
         destination: Destination name
         max_results: Maximum results
-        
+
     Returns:
         List of accommodation details
     """
-    query = f"hotels in {destination}"
-    places = await search_google_places(query, max_results=max_results, min_rating=4.0)
-    
-    # Transform to our format
-    accommodations = []
-    for place in places:
-        # Determine price level
-        price_level = "$$"  # default
-        if place.get("priceLevel"):
-            price_level = "$" * len(place.get("priceLevel"))
-        
-        accommodations.append({
-            "name": place.get("title", ""),
-            "description": place.get("description", ""),
-            "rating": place.get("totalScore", 0),
-            "reviews_count": place.get("reviewsCount", 0),
-            "address": place.get("address", ""),
-            "website": place.get("website"),
-            "phone": place.get("phone"),
-            "image_url": place.get("imageUrl") or (place.get("images", [{}])[0].get("url") if place.get("images") else None),
-            "price_level": price_level,
-            "type": place.get("categoryName", "Hotel"),
-            "coordinates": {
-                "lat": place.get("location", {}).get("lat"),
-                "lng": place.get("location", {}).get("lng")
-            } if place.get("location") else None,
-        })
-    
-    return accommodations
+    places = await get_places_for_trip([destination], max_results=max_results, categories=["sleep"])
+    return places[destination]["sleep"]
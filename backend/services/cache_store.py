@@ -0,0 +1,349 @@
+"""
+Cache primitives: an in-memory LRU tier and a persistent SQLite tier
+"""
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+# Cache files live in the project's .tmp/ directory unless CACHE_DIR is set
+CACHE_DIR = os.getenv(
+    "CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".tmp")
+)
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(CACHE_DIR, "cache.sqlite3"))
+# Seconds a write waits for another process's lock on the database
+CACHE_BUSY_TIMEOUT = float(os.getenv("CACHE_BUSY_TIMEOUT", "10"))
+# Threads running SQLite calls for async callers
+CACHE_THREADS = int(os.getenv("CACHE_THREADS", "4"))
+
+# Sentinel returned on a cache miss, so that None can be cached as a value
+MISSING = object()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Thread pool for SQLite calls, created lazily (and again after a fork)"""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=CACHE_THREADS, thread_name_prefix="cache")
+        _executor_pid = os.getpid()
+    return _executor
+
+
+class LRUCache:
+    """
+    Size-bounded in-memory cache with per-entry expiry
+
+    Least recently used entries are evicted once `max_entries` is exceeded,
+    or, if `max_bytes` is set, once the total len() of the (bytes) values
+    exceeds it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Return the cached value, or MISSING if absent or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                self._bytes -= size
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if needed"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        size = len(value) if self.max_bytes is not None else 0
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the stored values (0 unless max_bytes is set)"""
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Persistent key/value cache with per-entry expiry, stored in SQLite
+
+    Values are JSON-encoded. Each namespace gets its own table in the
+    shared cache database.
+
+    SQLite calls block (a write can wait up to CACHE_BUSY_TIMEOUT for
+    another process), so code running on the event loop uses the *_async
+    methods, which run them on the cache thread pool.
+    """
+
+    def __init__(self, namespace: str, path: Optional[str] = None):
+        self.namespace = namespace
+        self.path = path or CACHE_DB_PATH
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database lazily (and again after a fork)"""
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=CACHE_BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Cache data can be recomputed, so skip the fsync on every commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{self.namespace}" ('
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, expires_at REAL)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Any:
+        """Return the cached value, or MISSING if absent or expired"""
+        entry = self.get_entry(key)
+        if entry is MISSING:
+            return MISSING
+        return entry[0]
+
+    def get_entry(self, key: str) -> Any:
+        """
+        Return (value, stored_at) for a key, or MISSING if absent or expired
+
+        `stored_at` is the Unix time the value was written, for callers
+        that need to know how fresh the value is.
+        """
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    f'SELECT value, stored_at, expires_at FROM "{self.namespace}" WHERE key = ?',
+                    (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache read error ({self.namespace}): {e}")
+            return MISSING
+
+        if row is None:
+            return MISSING
+        value, stored_at, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            return MISSING
+        return json.loads(value), stored_at
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value"""
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    f'INSERT OR REPLACE INTO "{self.namespace}" '
+                    "(key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, expires_at)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Cache write error ({self.namespace}): {e}")
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        Store a value only if the key is absent or expired
+
+        Atomic across threads and processes sharing the database, so it can
+        be used as a lease (e.g. one worker process computing a value).
+
+        Returns:
+            True if the value was stored
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        f'DELETE FROM "{self.namespace}" WHERE key = ? AND expires_at < ?',
+                        (key, now)
+                    )
+                    cursor = conn.execute(
+                        f'INSERT OR IGNORE INTO "{self.namespace}" '
+                        "(key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                        (key, json.dumps(value), now, expires_at)
+                    )
+                return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            print(f"Cache write error ({self.namespace}): {e}")
+            return False
+
+    def renew(self, key: str, value: Any, ttl: float) -> bool:
+        """
+        Extend an unexpired entry holding `value` by `ttl` seconds from now
+
+        Used to keep a lease taken with add while its holder is working.
+
+        Returns:
+            True if the entry was still held with that value
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    cursor = conn.execute(
+                        f'UPDATE "{self.namespace}" SET expires_at = ? '
+                        "WHERE key = ? AND value = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                        (now + ttl, key, json.dumps(value), now)
+                    )
+                return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            print(f"Cache write error ({self.namespace}): {e}")
+            return False
+
+    def reserve_slot(self, key: str, interval: float) -> Optional[float]:
+        """
+        Reserve the next start time for a rate-limited action
+
+        Slots are `interval` seconds apart and shared by every process using
+        the database, so a per-second limit holds across worker processes.
+
+        Returns:
+            Unix time at which the caller may start, or None on a database
+            error (the caller should fall back to local throttling)
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    row = conn.execute(
+                        f'SELECT value FROM "{self.namespace}" WHERE key = ?', (key,)
+                    ).fetchone()
+                    start = max(now, json.loads(row[0]) if row else now)
+                    conn.execute(
+                        f'INSERT OR REPLACE INTO "{self.namespace}" '
+                        "(key, value, stored_at, expires_at) VALUES (?, ?, ?, NULL)",
+                        (key, json.dumps(start + interval), now)
+                    )
+                return start
+        except sqlite3.Error as e:
+            print(f"Cache write error ({self.namespace}): {e}")
+            return None
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(f'DELETE FROM "{self.namespace}" WHERE key = ?', (key,))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Cache write error ({self.namespace}): {e}")
+
+    def purge_expired(self) -> int:
+        """Delete expired entries and return how many were removed"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                cursor = conn.execute(
+                    f'DELETE FROM "{self.namespace}" WHERE expires_at IS NOT NULL AND expires_at < ?',
+                    (time.time(),)
+                )
+                conn.commit()
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Cache write error ({self.namespace}): {e}")
+            return 0
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+
+    async def get_async(self, key: str) -> Any:
+        """get, without blocking the event loop"""
+        return await self._run(self.get, key)
+
+    async def get_entry_async(self, key: str) -> Any:
+        """get_entry, without blocking the event loop"""
+        return await self._run(self.get_entry, key)
+
+    async def set_async(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """set, without blocking the event loop"""
+        await self._run(self.set, key, value, ttl)
+
+    async def add_async(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """add, without blocking the event loop"""
+        return await self._run(self.add, key, value, ttl)
+
+    async def renew_async(self, key: str, value: Any, ttl: float) -> bool:
+        """renew, without blocking the event loop"""
+        return await self._run(self.renew, key, value, ttl)
+
+    async def reserve_slot_async(self, key: str, interval: float) -> Optional[float]:
+        """reserve_slot, without blocking the event loop"""
+        return await self._run(self.reserve_slot, key, interval)
+
+    async def delete_async(self, key: str) -> None:
+        """delete, without blocking the event loop"""
+        await self._run(self.delete, key)
+
+
+def normalize_key(text: str) -> str:
+    """Normalize free text (case and whitespace) for use as a cache key"""
+    return " ".join(text.split()).casefold()
+
@@ -0,0 +1,239 @@
+"""
+Offline gazetteer for resolving place names without a network round-trip
+
+The index is built once from a GeoNames dump (e.g. cities15000.txt) with
+execution/build_gazetteer.py and then memory-mapped, so lookups only touch
+the pages they need and the file is shared between worker processes.
+
+Index layout (little endian):
+    b"GZT1" | record count (uint32) | record offsets (uint32 each) | records
+Each record is "key\\tlat\\tlng\\tpopulation\\tcountry_code\\tcountry_name\\n",
+sorted by key and then by descending population.
+"""
+import os
+import mmap
+import struct
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+MAGIC = b"GZT1"
+HEADER = struct.Struct("<4sI")
+
+# GeoNames "geoname" table columns
+_COL_NAME = 1
+_COL_ASCIINAME = 2
+_COL_ALTERNATE_NAMES = 3
+_COL_LAT = 4
+_COL_LNG = 5
+_COL_COUNTRY = 8
+_COL_POPULATION = 14
+
+
+def normalize_name(text: str) -> str:
+    """
+    Normalize a place name for matching: strip accents and punctuation,
+    fold case and collapse whitespace ("São Paulo" -> "sao paulo")
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    cleaned = "".join(ch if ch.isalnum() else " " for ch in stripped.casefold())
+    return " ".join(cleaned.split())
+
+
+def _load_country_names(countries_path: str) -> Dict[str, str]:
+    """Read ISO code -> country name from a GeoNames countryInfo.txt"""
+    names = {}
+    with open(countries_path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) > 4:
+                names[cols[0]] = cols[4]
+    return names
+
+
+def build_index(
+    cities_path: str,
+    out_path: str,
+    countries_path: Optional[str] = None,
+    include_alternate_names: bool = False,
+    min_population: int = 0
+) -> int:
+    """
+    Build a gazetteer index from a GeoNames dump
+
+    Args:
+        cities_path: GeoNames places file (tab-separated "geoname" table)
+        out_path: Where to write the index
+        countries_path: Optional countryInfo.txt, enables "City, Country" matching
+        include_alternate_names: Also index alternate names (larger index)
+        min_population: Skip places below this population
+
+    Returns:
+        Number of records written
+    """
+    country_names = _load_country_names(countries_path) if countries_path else {}
+    records = []
+
+    with open(cities_path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) <= _COL_POPULATION:
+                continue
+            try:
+                lat = float(cols[_COL_LAT])
+                lng = float(cols[_COL_LNG])
+                population = int(cols[_COL_POPULATION] or 0)
+            except ValueError:
+                continue
+            if population < min_population:
+                continue
+
+            names = {cols[_COL_NAME], cols[_COL_ASCIINAME]}
+            if include_alternate_names and cols[_COL_ALTERNATE_NAMES]:
+                names.update(cols[_COL_ALTERNATE_NAMES].split(","))
+
+            country_code = cols[_COL_COUNTRY]
+            country_name = normalize_name(country_names.get(country_code, ""))
+            for key in {normalize_name(name) for name in names}:
+                if key:
+                    records.append((key, -population, lat, lng, country_code, country_name))
+
+    records.sort()
+
+    blob = bytearray()
+    offsets = []
+    for key, neg_population, lat, lng, country_code, country_name in records:
+        offsets.append(len(blob))
+        line = f"{key}\t{lat:.5f}\t{lng:.5f}\t{-neg_population}\t{country_code}\t{country_name}\n"
+        blob += line.encode("utf-8")
+
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(out_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, len(offsets)))
+        out.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        out.write(blob)
+
+    return len(offsets)
+
+
+class Gazetteer:
+    """Read-only, memory-mapped view of a gazetteer index"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a gazetteer index: {path}")
+        offsets_start = HEADER.size
+        self._data_start = offsets_start + 4 * self.count
+        self._offsets = memoryview(self._mm)[offsets_start:self._data_start].cast("I")
+
+    def _record(self, index: int) -> bytes:
+        start = self._data_start + self._offsets[index]
+        end = self._mm.find(b"\n", start)
+        return self._mm[start:end]
+
+    def _key(self, index: int) -> bytes:
+        start = self._data_start + self._offsets[index]
+        end = self._mm.find(b"\t", start)
+        return self._mm[start:end]
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @staticmethod
+    def _parse(record: bytes) -> Dict:
+        key, lat, lng, population, country_code, country_name = record.decode("utf-8").split("\t")
+        return {
+            "name": key,
+            "lat": float(lat),
+            "lng": float(lng),
+            "population": int(population),
+            "country_code": country_code,
+            "country_name": country_name
+        }
+
+    def find(self, name: str) -> List[Dict]:
+        """All places whose normalized name matches exactly, most populous first"""
+        key = normalize_name(name).encode("utf-8")
+        matches = []
+        i = self._lower_bound(key)
+        while i < self.count and self._key(i) == key:
+            matches.append(self._parse(self._record(i)))
+            i += 1
+        return matches
+
+    def prefix(self, text: str, limit: int = 10) -> List[Dict]:
+        """Places whose normalized name starts with `text`"""
+        key = normalize_name(text).encode("utf-8")
+        matches = []
+        i = self._lower_bound(key)
+        while i < self.count and len(matches) < limit and self._key(i).startswith(key):
+            matches.append(self._parse(self._record(i)))
+            i += 1
+        return matches
+
+    def lookup(self, query: str) -> Optional[Dict[str, float]]:
+        """
+        Resolve a destination such as "Rome" or "Rome, Italy"
+
+        Text after the first comma must match the country name or ISO code;
+        if nothing matches, the lookup is treated as a miss.
+
+        Returns:
+            Dict with 'lat' and 'lng' or None if not found
+        """
+        parts = [normalize_name(part) for part in query.split(",")]
+        name, qualifiers = parts[0], [q for q in parts[1:] if q]
+        if not name:
+            return None
+
+        candidates = self.find(name)
+        if qualifiers:
+            candidates = [
+                place for place in candidates
+                if any(q in (place["country_name"], place["country_code"].casefold()) for q in qualifiers)
+            ]
+        if not candidates:
+            return None
+
+        best = candidates[0]
+        return {"lat": best["lat"], "lng": best["lng"]}
+
+    def lookup_many(self, queries: Iterable[str]) -> Dict[str, Optional[Dict[str, float]]]:
+        """Resolve several destinations at once"""
+        return {query: self.lookup(query) for query in queries}
+
+    def close(self) -> None:
+        self._offsets.release()
+        self._mm.close()
+
+
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH")
+_gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """
+    Get the shared gazetteer, or None if GAZETTEER_PATH is not configured
+    """
+    global _gazetteer
+    if _gazetteer is None and GAZETTEER_PATH:
+        if not os.path.exists(GAZETTEER_PATH):
+            print(f"Gazetteer index not found at {GAZETTEER_PATH}")
+            return None
+        _gazetteer = Gazetteer(GAZETTEER_PATH)
+    return _gazetteer
@@ -0,0 +1,142 @@
+"""
+Cache of complete travel guides, keyed by canonical request
+
+Guides are stored compactly serialized (msgpack if installed, else JSON)
+and compressed (zstd if installed, else zlib) in a memory-bounded LRU, in
+front of a SQLite tier shared by all worker processes.
+"""
+import os
+import json
+import zlib
+import base64
+import hashlib
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+from services.cache_store import LRUCache, SQLiteCache, MISSING
+from services.metrics import record_cache
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GUIDE_CACHE_ENABLED = os.getenv("GUIDE_CACHE_ENABLED", "true").lower() == "true"
+GUIDE_CACHE_TTL = float(os.getenv("GUIDE_CACHE_TTL", str(24 * 3600)))
+GUIDE_CACHE_MAX_BYTES = int(os.getenv("GUIDE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+GUIDE_CACHE_MAX_ENTRIES = int(os.getenv("GUIDE_CACHE_MAX_ENTRIES", "10000"))
+GUIDE_CACHE_ZSTD_LEVEL = int(os.getenv("GUIDE_CACHE_ZSTD_LEVEL", "3"))
+# Share guides between worker processes through the cache database
+GUIDE_CACHE_SHARED = os.getenv("GUIDE_CACHE_SHARED", "true").lower() == "true"
+
+_cache = LRUCache(
+    max_entries=GUIDE_CACHE_MAX_ENTRIES,
+    ttl=GUIDE_CACHE_TTL,
+    max_bytes=GUIDE_CACHE_MAX_BYTES
+)
+_disk_cache = SQLiteCache("guides")
+
+if zstandard is not None:
+    _compressor = zstandard.ZstdCompressor(level=GUIDE_CACHE_ZSTD_LEVEL)
+    _decompressor = zstandard.ZstdDecompressor()
+
+
+def encode_guide(data: Dict[str, Any]) -> bytes:
+    """Serialize and compress a JSON-compatible guide"""
+    if msgpack is not None:
+        packed = msgpack.packb(data, use_bin_type=True)
+    else:
+        packed = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    if zstandard is not None:
+        return _compressor.compress(packed)
+    return zlib.compress(packed, 6)
+
+
+def decode_guide(blob: bytes) -> Dict[str, Any]:
+    """Inverse of encode_guide"""
+    packed = _decompressor.decompress(blob) if zstandard is not None else zlib.decompress(blob)
+    if msgpack is not None:
+        return msgpack.unpackb(packed, raw=False)
+    return json.loads(packed)
+
+
+class CachedGuide:
+    """A cache hit; the guide is only decoded when `data` is read"""
+
+    def __init__(self, blob: bytes):
+        self.blob = blob
+        self.etag = f'"{hashlib.blake2b(blob, digest_size=16).hexdigest()}"'
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """The guide as a JSON-compatible dict"""
+        return decode_guide(self.blob)
+
+
+async def get_cached_guide(key: str) -> Optional[CachedGuide]:
+    """
+    Look up a guide by canonical request key
+
+    Args:
+        key: canonical_request_key of the GuideRequest
+
+    Returns:
+        CachedGuide, or None on a miss
+    """
+    if not GUIDE_CACHE_ENABLED:
+        return None
+    blob = _cache.get(key)
+    if blob is MISSING and GUIDE_CACHE_SHARED:
+        encoded = await _disk_cache.get_async(key)
+        if encoded is not MISSING:
+            blob = base64.b64decode(encoded)
+            _cache.set(key, blob)
+    record_cache("guide", blob is not MISSING)
+    if blob is MISSING:
+        return None
+    return CachedGuide(blob)
+
+
+async def cache_guide(key: str, guide: Any) -> Optional[str]:
+    """
+    Store a guide under its canonical request key
+
+    Args:
+        key: canonical_request_key of the GuideRequest
+        guide: TravelGuide (or its JSON-compatible dict)
+
+    Returns:
+        The guide's ETag, or None if caching is disabled
+    """
+    if not GUIDE_CACHE_ENABLED:
+        return None
+    data = guide.model_dump(mode="json") if isinstance(guide, BaseModel) else guide
+    entry = CachedGuide(encode_guide(data))
+    _cache.set(key, entry.blob)
+    if GUIDE_CACHE_SHARED:
+        await _disk_cache.set_async(key, base64.b64encode(entry.blob).decode("ascii"), GUIDE_CACHE_TTL)
+    return entry.etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(
+        (tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates
+    )
+
+
+def get_guide_cache_stats() -> Dict[str, Any]:
+    """Entries and memory used by this process's guide cache"""
+    return {
+        "entries": len(_cache),
+        "bytes": _cache.size_bytes,
+        "max_bytes": GUIDE_CACHE_MAX_BYTES,
+        "format": f"{'msgpack' if msgpack else 'json'}+{'zstd' if zstandard else 'zlib'}"
+    }
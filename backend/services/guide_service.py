@@ -0,0 +1,372 @@
+"""
+Guide service - builds a complete travel guide from the individual services
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from models.schemas import GuideRequest, TravelGuide, LocationDetail, DayItinerary, DayActivity, ImageInfo
+from services.ai_service import (
+    generate_location_details,
+    stream_itinerary,
+    is_fallback_location_details,
+    is_fallback_itinerary_day,
+    is_fallback_recommendations
+)
+from services.apify_service import APIFY_ENABLED
+from services.image_service import get_location_images, is_placeholder_image
+from services.itinerary_service import (
+    plan_route,
+    calculate_route_info,
+    get_coordinates,
+    geocode_scope
+)
+from services.recommendations_service import (
+    generate_category_recommendations,
+    fetch_trip_places,
+    CATEGORY_KEYS
+)
+from services.cache_store import normalize_key
+from services.places_store import lookup_places
+from services.pipeline import Stage, run_pipeline
+from services.serialization import to_jsonable
+from services.route_engine import RoutePlan
+
+
+def build_location_detail(
+    destination: str,
+    details: Dict[str, Any],
+    images: List[Dict[str, str]],
+    coords: Optional[Dict[str, float]]
+) -> LocationDetail:
+    """
+    Combine AI details, images and coordinates into a LocationDetail
+    """
+    main_image = None
+    additional_images = []
+
+    if images:
+        main_image_data = images[0]
+        main_image = ImageInfo(
+            url=main_image_data["url"],
+            alt_text=main_image_data["alt_text"],
+            photographer=main_image_data.get("photographer")
+        )
+
+        # Additional images
+        for img_data in images[1:]:
+            additional_images.append(ImageInfo(
+                url=img_data["url"],
+                alt_text=img_data["alt_text"],
+                photographer=img_data.get("photographer")
+            ))
+
+    return LocationDetail(
+        name=details.get("name", destination),
+        description=details.get("description", ""),
+        highlights=details.get("highlights", []),
+        main_image=main_image,
+        additional_images=additional_images,
+        coordinates=coords
+    )
+
+
+def build_day_itinerary(day_data: Dict[str, Any]) -> DayItinerary:
+    """
+    Convert a raw AI itinerary day into a DayItinerary
+    """
+    activities = [
+        DayActivity(
+            time=act.get("time", ""),
+            activity=act.get("activity", ""),
+            description=act.get("description", ""),
+            location=act.get("location", day_data.get("location", "")),
+            duration=act.get("duration")
+        )
+        for act in day_data.get("activities", [])
+    ]
+
+    return DayItinerary(
+        day_number=day_data.get("day_number", 1),
+        date=day_data.get("date"),
+        title=day_data.get("title", ""),
+        activities=activities,
+        location=day_data.get("location", "")
+    )
+
+
+def _order_indices(destinations: List[str], ordered: List[str]) -> List[int]:
+    """
+    Map an ordered list of names back to indices of the original list,
+    so repeated destination names keep their own per-destination results
+    """
+    used = set()
+    indices = []
+    for name in ordered:
+        for i, dest in enumerate(destinations):
+            if dest == name and i not in used:
+                used.add(i)
+                indices.append(i)
+                break
+    return indices
+
+
+def canonical_request_key(request: GuideRequest) -> str:
+    """
+    Hash identifying requests that produce the same guide
+
+    Destination names and preferences are compared after collapsing
+    whitespace and case, and an omitted `days` equals its default.
+
+    Args:
+        request: GuideRequest with destinations, days, and preferences
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    canonical = {
+        "destinations": [normalize_key(dest) for dest in request.destinations],
+        "days": request.days or len(request.destinations) * 3,
+        "preferences": normalize_key(request.preferences or "")
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+async def is_degraded_guide(request: GuideRequest, guide: Dict[str, Any]) -> bool:
+    """
+    Whether any part of a guide was filled in because a provider failed
+
+    Fallback details, itinerary days or recommendations, placeholder images,
+    missing days, empty recommendation categories and places the Apify run
+    did not store all count. Such guides are not cached, so the next request
+    builds them again instead of serving the degraded one for GUIDE_CACHE_TTL.
+
+    Args:
+        request: GuideRequest the guide was built for
+        guide: The TravelGuide as a JSON-compatible dict
+    """
+    images = []
+    for location in guide["destinations"]:
+        if not location["description"] or is_fallback_location_details(location["name"], location):
+            return True
+        images += [location["main_image"], *location["additional_images"]]
+
+    itinerary = guide["itinerary"]
+    if len(itinerary) < guide["total_days"] or any(is_fallback_itinerary_day(day) for day in itinerary):
+        return True
+
+    for category, key in CATEGORY_KEYS.items():
+        recs = guide["recommendations"].get(key) or []
+        if not recs or any(
+            is_fallback_recommendations(destination, category, [rec])
+            for rec in recs
+            for destination in request.destinations
+        ):
+            return True
+        images += [rec["image"] for rec in recs if rec.get("image")]
+
+    if any(image is None or is_placeholder_image(image) for image in images):
+        return True
+
+    if APIFY_ENABLED:
+        # A failed scrape returns empty lists and stores nothing
+        for destination in request.destinations:
+            for category in CATEGORY_KEYS:
+                if await lookup_places(destination, category) is None:
+                    return True
+    return False
+
+
+def build_guide_stages(
+    request: GuideRequest,
+    on_partial: Optional[Callable[[str, Any], Awaitable[None]]] = None
+) -> List[Stage]:
+    """
+    Build the stage graph for a guide request
+
+    Per-destination details, images and coordinates do not depend on the
+    route order, so they start immediately. Itinerary, recommendations and
+    route info only need the optimized route.
+
+    Args:
+        request: GuideRequest with destinations, days, and preferences
+        on_partial: Optional callback awaited with ("itinerary_day", DayItinerary)
+            for each day as soon as it has been generated
+
+    Returns:
+        List of pipeline stages; the "guide" stage produces the TravelGuide
+    """
+    destinations = request.destinations
+    total_days = request.days or (len(destinations) * 3)  # Default 3 days per destination
+    preferences = request.preferences or ""
+
+    async def route_plan_stage() -> Optional[RoutePlan]:
+        if len(destinations) > 1:
+            return await plan_route(destinations)
+        return None
+
+    async def route_stage(plan: Optional[RoutePlan]) -> List[str]:
+        return plan.order if plan is not None else destinations
+
+    stages = [
+        Stage("route_plan", route_plan_stage),
+        Stage("route", route_stage, ["route_plan"])
+    ]
+
+    for i, dest in enumerate(destinations):
+        stages.append(Stage(f"details:{i}", lambda dest=dest: generate_location_details(dest)))
+        stages.append(Stage(f"images:{i}", lambda dest=dest: get_location_images(dest, count=4)))
+        stages.append(Stage(f"coords:{i}", lambda dest=dest: get_coordinates(dest)))
+
+        async def location_stage(details, images, coords, dest=dest) -> LocationDetail:
+            return build_location_detail(dest, details, images, coords)
+
+        stages.append(Stage(
+            f"location:{i}",
+            location_stage,
+            [f"details:{i}", f"images:{i}", f"coords:{i}"]
+        ))
+
+    async def locations_stage(route: List[str], *built: LocationDetail) -> List[LocationDetail]:
+        return [built[i] for i in _order_indices(destinations, route)]
+
+    stages.append(Stage(
+        "locations",
+        locations_stage,
+        ["route"] + [f"location:{i}" for i in range(len(destinations))]
+    ))
+
+    async def itinerary_stage(route: List[str]) -> List[DayItinerary]:
+        itinerary = []
+        async for day_data in stream_itinerary(route, total_days, preferences):
+            day = build_day_itinerary(day_data)
+            itinerary.append(day)
+            if on_partial is not None:
+                await on_partial("itinerary_day", day)
+        return itinerary
+
+    stages.append(Stage("itinerary", itinerary_stage, ["route"]))
+
+    # Google Maps places for every destination and category come from a
+    # single Apify run that starts right away (None when Apify is disabled)
+    stages.append(Stage("places", lambda: fetch_trip_places(destinations)))
+
+    for category in CATEGORY_KEYS:
+        stages.append(Stage(
+            f"recommendations:{category}",
+            lambda route, places, category=category: generate_category_recommendations(route, category, places),
+            ["route", "places"]
+        ))
+
+    async def recommendations_stage(*per_category: List) -> Dict[str, List]:
+        return {key: recs for key, recs in zip(CATEGORY_KEYS.values(), per_category)}
+
+    stages.append(Stage(
+        "recommendations",
+        recommendations_stage,
+        [f"recommendations:{category}" for category in CATEGORY_KEYS]
+    ))
+    # Reuses the distance matrix computed while optimizing the route
+    stages.append(Stage("route_info", calculate_route_info, ["route", "route_plan"]))
+
+    async def guide_stage(locations, itinerary, recommendations, route_info) -> TravelGuide:
+        return TravelGuide(
+            destinations=locations,
+            itinerary=itinerary,
+            recommendations=recommendations,
+            route_info=route_info,
+            total_days=total_days
+        )
+
+    stages.append(Stage(
+        "guide",
+        guide_stage,
+        ["locations", "itinerary", "recommendations", "route_info"]
+    ))
+    return stages
+
+
+async def build_travel_guide(
+    request: GuideRequest,
+    max_concurrency: Optional[int] = None
+) -> TravelGuide:
+    """
+    Generate a complete travel guide, running independent stages concurrently
+
+    Args:
+        request: GuideRequest with destinations, days, and preferences
+        max_concurrency: Maximum concurrent stages (defaults to PIPELINE_CONCURRENCY)
+
+    Returns:
+        Complete TravelGuide object
+    """
+    # Each destination is geocoded by several stages; share lookups within the request
+    with geocode_scope():
+        results = await run_pipeline(build_guide_stages(request), max_concurrency)
+    return results["guide"]
+
+
+async def stream_travel_guide(
+    request: GuideRequest,
+    max_concurrency: Optional[int] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Generate a travel guide, yielding each part as soon as it is ready
+
+    Yields (event, data) pairs with JSON-compatible data:
+        ("route", {"destinations": [...]})        optimized destination order
+        ("destination", {"index": i, "location": LocationDetail})
+            index refers to the position in the request's destinations
+        ("itinerary_day", DayItinerary)
+        ("recommendations", {"category": key, "items": [Recommendation]})
+        ("route_info", {...})
+        ("complete", TravelGuide)
+    Failures are reported as a final ("error", {"detail": message}) event.
+
+    Args:
+        request: GuideRequest with destinations, days, and preferences
+        max_concurrency: Maximum concurrent stages (defaults to PIPELINE_CONCURRENCY)
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def on_partial(event: str, data: Any) -> None:
+        await queue.put((event, data))
+
+    async def on_stage_done(name: str, result: Any) -> None:
+        if name == "route":
+            await queue.put(("route", {"destinations": result}))
+        elif name.startswith("location:"):
+            index = int(name.split(":", 1)[1])
+            await queue.put(("destination", {"index": index, "location": result}))
+        elif name.startswith("recommendations:"):
+            category = name.split(":", 1)[1]
+            await queue.put(("recommendations", {"category": CATEGORY_KEYS[category], "items": result}))
+        elif name == "route_info":
+            await queue.put(("route_info", result))
+        elif name == "guide":
+            await queue.put(("complete", result))
+
+    async def run() -> None:
+        try:
+            with geocode_scope():
+                await run_pipeline(build_guide_stages(request, on_partial), max_concurrency, on_stage_done)
+        except Exception as e:
+            print(f"Error generating travel guide: {e}")
+            await queue.put(("error", {"detail": f"Failed to generate travel guide: {str(e)}"}))
+        finally:
+            await queue.put(done)
+
+    task = asyncio.ensure_future(run())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            event, data = item
+            yield event, to_jsonable(data)
+    finally:
+        # Stop generating if the client went away
+        if not task.done():
+            task.cancel()
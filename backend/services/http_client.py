@@ -0,0 +1,94 @@
+"""
+Shared HTTP client pool owned by the application
+"""
+import os
+from typing import Dict, Optional
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# One long-lived client per upstream, so keep-alive connections are reused
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+# Requests sent and connections opened per pool, to measure connection reuse
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _make_tracer(name: str):
+    """Build an httpcore trace callback that counts new connections"""
+    async def trace(event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            _stats[name]["connections_opened"] += 1
+    return trace
+
+
+def get_http_client(name: str = "default", timeout: Optional[float] = None) -> httpx.AsyncClient:
+    """
+    Get the shared client for an upstream, creating it on first use
+
+    Args:
+        name: Pool name (e.g., "llm", "unsplash")
+        timeout: Default timeout for the pool (defaults to HTTP_TIMEOUT);
+            only used when the client is created
+
+    Returns:
+        Long-lived httpx.AsyncClient
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        stats = _stats.setdefault(name, {"requests": 0, "connections_opened": 0})
+        tracer = _make_tracer(name)
+
+        async def on_request(request: httpx.Request) -> None:
+            stats["requests"] += 1
+            request.extensions["trace"] = tracer
+
+        client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(timeout or HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            event_hooks={"request": [on_request]}
+        )
+        _clients[name] = client
+    return client
+
+
+def get_http_pool_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Connection reuse per pool
+
+    Returns:
+        Dict mapping pool name to requests, connections_opened and
+        reuse_ratio (share of requests served on an existing connection)
+    """
+    report = {}
+    for name, stats in _stats.items():
+        requests = stats["requests"]
+        reused = max(requests - stats["connections_opened"], 0)
+        report[name] = {
+            **stats,
+            "reuse_ratio": round(reused / requests, 3) if requests else 0.0
+        }
+    return report
+
+
+async def close_http_clients() -> None:
+    """Close every shared client (called on application shutdown)"""
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
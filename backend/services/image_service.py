@@ -2,102 +2,191 @@
 Image service using Unsplash API for location images
 """
 import os
-import httpx
+import asyncio
 from typing import Optional, List, Dict
-from dotenv import load_dotenv
-
-load_dotenv()
+from services.http_client import get_http_client
+from services.cache_store import LRUCache, SQLiteCache, MISSING, normalize_key
+from services.metrics import track, record_cache
 
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY")
 UNSPLASH_API_URL = "https://api.unsplash.com"
+# Served when no API key is set or a search fails or finds nothing
+PLACEHOLDER_URL = "https://source.unsplash.com/800x600/"
+UNSPLASH_TIMEOUT = float(os.getenv("UNSPLASH_TIMEOUT", "10"))
+
+# Unsplash's free tier allows 50 requests/hour, so search results are cached
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", str(7 * 24 * 3600)))
+IMAGE_MEMORY_ENTRIES = int(os.getenv("IMAGE_MEMORY_ENTRIES", "2048"))
+# "destination": one search page per destination and category, shared by its recommendations
+# "place": one search per recommendation (more specific images, more requests)
+RECOMMENDATION_IMAGE_MODE = os.getenv("RECOMMENDATION_IMAGE_MODE", "destination")
+IMAGE_CONCURRENCY = int(os.getenv("IMAGE_CONCURRENCY", "4"))
+
+_memory_cache = LRUCache(max_entries=IMAGE_MEMORY_ENTRIES, ttl=IMAGE_CACHE_TTL)
+_disk_cache = SQLiteCache("images")
+
+CATEGORY_KEYWORDS = {
+    "sleep": "hotel accommodation",
+    "eat": "restaurant food",
+    "curiosity": "attraction landmark"
+}
+
+
+async def _search_unsplash(query: str, count: int) -> Optional[List[Dict[str, str]]]:
+    """
+    Search Unsplash photos, with results cached per (query, count)
+
+    Returns:
+        List of image dicts, or None if the search failed or found nothing
+    """
+    key = f"{normalize_key(query)}|{count}"
+    cached = _memory_cache.get(key)
+    if cached is MISSING:
+        cached = await _disk_cache.get_async(key)
+        if cached is not MISSING:
+            _memory_cache.set(key, cached)
+    record_cache("images", cached is not MISSING)
+    if cached is not MISSING:
+        return cached
+
+    try:
+        # Shared keep-alive pool instead of a new connection per lookup
+        client = get_http_client("unsplash", timeout=UNSPLASH_TIMEOUT)
+        async with track("unsplash", "search"):
+            response = await client.get(
+                f"{UNSPLASH_API_URL}/search/photos",
+                params={
+                    "query": query,
+                    "per_page": min(count, 10),
+                    "orientation": "landscape"
+                },
+                headers={
+                    "Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"
+                }
+            )
+    except Exception as e:
+        print(f"Error fetching images: {e}")
+        return None
+
+    if response.status_code != 200:
+        return None
+
+    try:
+        images = [{
+            "url": photo["urls"]["regular"],
+            "alt_text": photo.get("alt_description") or f"Image of {query}",
+            "photographer": photo["user"]["name"]
+        } for photo in response.json().get("results", [])]
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        # Malformed or partial response: fall back to placeholders, uncached
+        print(f"Error parsing Unsplash response: {e}")
+        return None
+
+    if not images:
+        return None
+
+    # Only real results are cached; failures fall back to placeholders
+    _memory_cache.set(key, images)
+    await _disk_cache.set_async(key, images, IMAGE_CACHE_TTL)
+    return images
 
 
 async def get_location_images(
-    location: str, 
+    location: str,
     count: int = 3
 ) -> List[Dict[str, str]]:
     """
     Fetch images for a location from Unsplash
-    
+
     Args:
         location: Location name to search for
         count: Number of images to fetch (max 10)
-        
+
     Returns:
         List of image dicts with url, alt_text, and photographer
     """
     if not UNSPLASH_ACCESS_KEY:
         # Return placeholder if no API key
         return [{
-            "url": f"https://source.unsplash.com/800x600/?{location.replace(' ', ',')}",
+            "url": f"{PLACEHOLDER_URL}?{location.replace(' ', ',')}",
             "alt_text": f"Image of {location}",
             "photographer": None
         }]
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{UNSPLASH_API_URL}/search/photos",
-                params={
-                    "query": location,
-                    "per_page": min(count, 10),
-                    "orientation": "landscape"
-                },
-                headers={
-                    "Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"
-                },
-                timeout=10.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                images = []
-                
-                for photo in data.get("results", []):
-                    images.append({
-                        "url": photo["urls"]["regular"],
-                        "alt_text": photo.get("alt_description") or f"Image of {location}",
-                        "photographer": photo["user"]["name"]
-                    })
-                
-                return images if images else _get_fallback_images(location, count)
-            else:
-                return _get_fallback_images(location, count)
-                
-    except Exception as e:
-        print(f"Error fetching images: {e}")
-        return _get_fallback_images(location, count)
+
+    images = await _search_unsplash(location, count)
+    return images if images else _get_fallback_images(location, count)
 
 
 def _get_fallback_images(location: str, count: int) -> List[Dict[str, str]]:
     """Generate fallback placeholder images"""
     search_term = location.replace(" ", ",")
     return [{
-        "url": f"https://source.unsplash.com/800x600/?{search_term},{i}",
+        "url": f"{PLACEHOLDER_URL}?{search_term},{i}",
         "alt_text": f"Image of {location}",
         "photographer": None
     } for i in range(count)]
 
 
+def is_placeholder_image(image: Dict[str, str]) -> bool:
+    """Whether an image is a placeholder rather than an Unsplash search result"""
+    return image.get("url", "").startswith(PLACEHOLDER_URL)
+
+
 async def get_recommendation_image(place_name: str, category: str) -> Optional[Dict[str, str]]:
     """
     Fetch a single image for a recommendation
-    
+
     Args:
         place_name: Name of the place
         category: Category (sleep, eat, curiosity)
-        
+
     Returns:
         Image dict or None
     """
     # Create a more specific search query
-    category_keywords = {
-        "sleep": "hotel accommodation",
-        "eat": "restaurant food",
-        "curiosity": "attraction landmark"
-    }
-    
-    search_query = f"{place_name} {category_keywords.get(category, '')}"
+    search_query = f"{place_name} {CATEGORY_KEYWORDS.get(category, '')}"
     images = await get_location_images(search_query, count=1)
-    
+
     return images[0] if images else None
+
+
+async def resolve_recommendation_images(
+    destination: str,
+    category: str,
+    place_names: List[str]
+) -> List[Optional[Dict[str, str]]]:
+    """
+    Resolve images for all recommendations of one destination and category
+
+    In "destination" mode a single search page ("{destination} hotel ...")
+    provides one image per recommendation, so N recommendations cost one
+    Unsplash request (and none once cached). In "place" mode each place
+    is searched individually, concurrently.
+
+    Args:
+        destination: Destination name
+        category: Category (sleep, eat, curiosity)
+        place_names: Recommendation names, in order
+
+    Returns:
+        One image dict (or None) per place name, in the same order
+    """
+    if not place_names:
+        return []
+
+    if RECOMMENDATION_IMAGE_MODE == "place" or not UNSPLASH_ACCESS_KEY:
+        semaphore = asyncio.Semaphore(IMAGE_CONCURRENCY)
+
+        async def resolve(name: str) -> Optional[Dict[str, str]]:
+            async with semaphore:
+                return await get_recommendation_image(name, category)
+
+        return list(await asyncio.gather(*(resolve(name) for name in place_names)))
+
+    query = f"{destination} {CATEGORY_KEYWORDS.get(category, '')}"
+    page = await _search_unsplash(query, 10)
+    if not page:
+        return [_get_fallback_images(f"{name} {CATEGORY_KEYWORDS.get(category, '')}", 1)[0]
+                for name in place_names]
+
+    return [dict(page[i % len(page)]) for i in range(len(place_names))]
@@ -1,14 +1,155 @@
 """
 Itinerary service for route optimization and travel calculations
 """
-from typing import List, Dict, Optional
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+import os
+import time
 import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import List, Dict, Optional
+from services.cache_store import LRUCache, SQLiteCache, MISSING, normalize_key
+from services.gazetteer import get_gazetteer
+from services.route_engine import RoutePlan, distance_matrix, optimize_order
+from services.metrics import track, record_cache
+
+
+# Nominatim geocoder, created on first use (see _get_geolocator)
+geolocator = None
+
+# Geocoding cache settings
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", str(30 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL = float(os.getenv("GEOCODE_NEGATIVE_TTL", str(24 * 3600)))
+GEOCODE_MEMORY_ENTRIES = int(os.getenv("GEOCODE_MEMORY_ENTRIES", "2048"))
+
+# Nominatim's usage policy allows at most one request per second (across
+# all worker processes sharing the cache database)
+NOMINATIM_MIN_INTERVAL = float(os.getenv("NOMINATIM_MIN_INTERVAL", "1.0"))
+_nominatim_lock: Optional[asyncio.Lock] = None
+_last_nominatim_call = 0.0
+
+# Longest run of days generated by a single itinerary prompt
+ITINERARY_SEGMENT_MAX_DAYS = int(os.getenv("ITINERARY_SEGMENT_MAX_DAYS", "7"))
+
+# Two cache tiers shared by all requests: in-memory LRU in front of SQLite
+_memory_cache = LRUCache(max_entries=GEOCODE_MEMORY_ENTRIES)
+_disk_cache = SQLiteCache("geocode")
+_rate_slots = SQLiteCache("rate_slots")
+
+# Per-request memo of in-flight/finished lookups, see geocode_scope()
+_request_memo: ContextVar[Optional[Dict[str, asyncio.Future]]] = ContextVar(
+    "geocode_request_memo", default=None
+)
 
 
-# Initialize geocoder
-geolocator = Nominatim(user_agent="travel_guide_app")
+def _get_geolocator():
+    global geolocator
+    if geolocator is None:
+        from geopy.geocoders import Nominatim
+        geolocator = Nominatim(user_agent="travel_guide_app")
+    return geolocator
+
+
+def warm_up() -> None:
+    """Import geopy and build the Nominatim geocoder"""
+    _get_geolocator()
+
+
+@contextmanager
+def geocode_scope():
+    """
+    Memoize geocoding for the duration of a request
+
+    Tasks started inside the scope share the memo, so concurrent lookups
+    of the same location within one request result in a single lookup.
+    """
+    token = _request_memo.set({})
+    try:
+        yield
+    finally:
+        _request_memo.reset(token)
+
+
+async def _geocode_remote(location: str) -> Optional[Dict[str, float]]:
+    """
+    Geocode a location with Nominatim
+
+    Returns None when the location is not found; raises on network errors
+    so failures are not cached as negative results.
+    """
+    global _nominatim_lock, _last_nominatim_call
+    if _nominatim_lock is None:
+        _nominatim_lock = asyncio.Lock()
+
+    async with _nominatim_lock:
+        # The slot is shared with the other worker processes; fall back to
+        # spacing this process's calls if the cache database is unavailable
+        start = await _rate_slots.reserve_slot_async("nominatim", NOMINATIM_MIN_INTERVAL)
+        if start is not None:
+            wait = start - time.time()
+        else:
+            wait = _last_nominatim_call + NOMINATIM_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            # Run in executor to avoid blocking
+            loop = asyncio.get_event_loop()
+            async with track("nominatim", "geocode"):
+                location_data = await loop.run_in_executor(
+                    None, 
+                    _get_geolocator().geocode, 
+                    location
+                )
+        finally:
+            _last_nominatim_call = time.monotonic()
+    
+    if location_data:
+        return {
+            "lat": location_data.latitude,
+            "lng": location_data.longitude
+        }
+    return None
+
+
+async def _lookup_coordinates(location: str) -> Optional[Dict[str, float]]:
+    """
+    Resolve a location through the memory and disk tiers, the offline
+    gazetteer (if configured) and finally Nominatim
+    """
+    key = normalize_key(location)
+
+    cached = _memory_cache.get(key)
+    if cached is not MISSING:
+        record_cache("geocode", True)
+        return cached
+
+    cached = await _disk_cache.get_async(key)
+    if cached is not MISSING:
+        record_cache("geocode", True)
+        _memory_cache.set(key, cached, GEOCODE_CACHE_TTL if cached else GEOCODE_NEGATIVE_TTL)
+        return cached
+    record_cache("geocode", False)
+
+    gazetteer = get_gazetteer()
+    if gazetteer:
+        coords = gazetteer.lookup(location)
+        record_cache("gazetteer", bool(coords))
+        if coords:
+            _memory_cache.set(key, coords, GEOCODE_CACHE_TTL)
+            await _disk_cache.set_async(key, coords, GEOCODE_CACHE_TTL)
+            return coords
+
+    try:
+        coords = await _geocode_remote(location)
+    except Exception as e:
+        print(f"Error geocoding {location}: {e}")
+        return None
+
+    # Locations that could not be found are cached for a shorter time
+    ttl = GEOCODE_CACHE_TTL if coords else GEOCODE_NEGATIVE_TTL
+    _memory_cache.set(key, coords, ttl)
+    await _disk_cache.set_async(key, coords, ttl)
+    return coords
 
 
 async def get_coordinates(location: str) -> Optional[Dict[str, float]]:
@@ -21,24 +162,34 @@ async def get_coordinates(location: str) -> Optional[Dict[str, float]]:
     Returns:
         Dict with 'lat' and 'lng' or None if not found
     """
-    try:
-        # Run in executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        location_data = await loop.run_in_executor(
-            None, 
-            geolocator.geocode, 
-            location
-        )
-        
-        if location_data:
-            return {
-                "lat": location_data.latitude,
-                "lng": location_data.longitude
-            }
-    except Exception as e:
-        print(f"Error geocoding {location}: {e}")
-    
-    return None
+    memo = _request_memo.get()
+    if memo is None:
+        return await _lookup_coordinates(location)
+
+    key = normalize_key(location)
+    future = memo.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_lookup_coordinates(location))
+        memo[key] = future
+    return await asyncio.shield(future)
+
+
+async def get_coordinates_many(locations: List[str]) -> Dict[str, Optional[Dict[str, float]]]:
+    """
+    Geocode several locations at once
+
+    Cache and gazetteer hits resolve immediately; only misses wait for
+    the rate-limited Nominatim calls.
+
+    Args:
+        locations: Location names
+
+    Returns:
+        Dict mapping each location to its coordinates (or None)
+    """
+    unique = list(dict.fromkeys(locations))
+    results = await asyncio.gather(*(get_coordinates(location) for location in unique))
+    return dict(zip(unique, results))
 
 
 def calculate_distance(coord1: Dict[str, float], coord2: Dict[str, float]) -> float:
@@ -54,72 +205,126 @@ def calculate_distance(coord1: Dict[str, float], coord2: Dict[str, float]) -> fl
     """
     point1 = (coord1["lat"], coord1["lng"])
     point2 = (coord2["lat"], coord2["lng"])
+    from geopy.distance import geodesic
     return geodesic(point1, point2).kilometers
 
 
+async def _located_plan(destinations: List[str]) -> RoutePlan:
+    """Geocode destinations and build the distance matrix of those found, in input order"""
+    resolved = await get_coordinates_many(destinations)
+    located = [dest for dest in dict.fromkeys(destinations) if resolved.get(dest)]
+    if len(located) < 2:
+        return RoutePlan(order=list(destinations))
+    return RoutePlan(
+        order=list(destinations),
+        matrix=distance_matrix([(resolved[d]["lat"], resolved[d]["lng"]) for d in located]),
+        index={dest: i for i, dest in enumerate(located)}
+    )
+
+
+async def plan_route(destinations: List[str]) -> RoutePlan:
+    """
+    Optimize the order of destinations to minimize travel distance
+
+    Builds the distance matrix of all geocoded destinations in one pass and
+    improves a nearest-neighbor tour with 2-opt/Or-opt (see route_engine).
+    The first destination stays first; destinations that can't be geocoded
+    are visited last, in their original order.
+
+    Args:
+        destinations: List of destination names
+
+    Returns:
+        RoutePlan with the optimized order and the distance matrix,
+        which calculate_route_info can reuse
+    """
+    plan = await _located_plan(destinations)
+    if plan.matrix is None or len(destinations) <= 2:
+        return plan
+
+    # The matrix has one row per distinct name; repeated stops are put back
+    # into the optimized tour afterwards
+    located = list(plan.index)
+    tour = [located[i] for i in optimize_order(plan.matrix)]
+    repeats = [dest for i, dest in enumerate(destinations) if dest in plan.index and dest in destinations[:i]]
+
+    # A repeated final stop (a round trip back to the start, say) stays last
+    last = destinations[-1] if destinations[-1] in repeats else None
+    if last is not None:
+        repeats.remove(last)
+        if tour[-1] == last:
+            # Its other visit was optimized to the end: place it again
+            tour.pop()
+            repeats.insert(0, last)
+        tour.append(last)
+    for dest in repeats:
+        _insert_stop(tour, dest, plan, keep_last=last is not None)
+    if last is not None:
+        tour.pop()
+
+    head = [] if destinations[0] in plan.index else [destinations[0]]
+    unlocated = [dest for dest in destinations[len(head):] if dest not in plan.index]
+    order = head + tour + unlocated + ([last] if last is not None else [])
+    if sorted(order) != sorted(destinations) or _adjacent_repeats(order) > _adjacent_repeats(destinations):
+        # Never drop, invent or bunch up stops; the input order is always valid
+        print(f"Route optimization changed the stops of {destinations}; keeping the input order")
+        order = list(destinations)
+    plan.order = order
+    return plan
+
+
+def _adjacent_repeats(order: List[str]) -> int:
+    """Number of stops that follow a stop of the same name"""
+    return sum(1 for before, after in zip(order, order[1:]) if before == after)
+
+
+def _insert_stop(tour: List[str], dest: str, plan: RoutePlan, keep_last: bool = False) -> None:
+    """
+    Insert another visit to `dest` where it adds the least distance, never
+    before the first stop (nor after the last with `keep_last`) and, unless
+    there is no other place, not next to a visit to the same stop
+    """
+    positions = range(1, len(tour) if keep_last else len(tour) + 1)
+    best_position, best_cost, best_adjacent = len(tour), None, True
+    for position in positions:
+        before = tour[position - 1]
+        after = tour[position] if position < len(tour) else None
+        cost = plan.distance(before, dest)
+        if after is not None:
+            cost += plan.distance(dest, after) - plan.distance(before, after)
+        adjacent = dest in (before, after)
+        if best_cost is None or (adjacent, cost) < (best_adjacent, best_cost):
+            best_position, best_cost, best_adjacent = position, cost, adjacent
+    tour.insert(best_position, dest)
+
+
 async def optimize_route(destinations: List[str]) -> List[str]:
     """
     Optimize the order of destinations to minimize travel distance
-    Uses a simple nearest-neighbor algorithm
-    
+
     Args:
         destinations: List of destination names
-        
+
     Returns:
         Optimized list of destination names
     """
     if len(destinations) <= 2:
         return destinations
-    
-    # Get coordinates for all destinations
-    coords = {}
-    for dest in destinations:
-        coord = await get_coordinates(dest)
-        if coord:
-            coords[dest] = coord
-    
-    if len(coords) < 2:
-        return destinations
-    
-    # Nearest neighbor algorithm
-    optimized = [destinations[0]]
-    remaining = set(destinations[1:])
-    
-    while remaining:
-        current = optimized[-1]
-        if current not in coords:
-            # If we can't geocode current, just add next remaining
-            optimized.append(remaining.pop())
-            continue
-            
-        # Find nearest destination
-        nearest = None
-        min_distance = float('inf')
-        
-        for dest in remaining:
-            if dest in coords:
-                dist = calculate_distance(coords[current], coords[dest])
-                if dist < min_distance:
-                    min_distance = dist
-                    nearest = dest
-        
-        if nearest:
-            optimized.append(nearest)
-            remaining.remove(nearest)
-        else:
-            # If no geocoded destination found, just add any
-            optimized.append(remaining.pop())
-    
-    return optimized
+    return (await plan_route(destinations)).order
 
 
-async def calculate_route_info(destinations: List[str]) -> Dict:
+async def calculate_route_info(
+    destinations: List[str],
+    plan: Optional[RoutePlan] = None
+) -> Dict:
     """
     Calculate total distance and estimated travel times
-    
+
     Args:
         destinations: Ordered list of destinations
-        
+        plan: RoutePlan from plan_route, whose distance matrix is reused
+            instead of geocoding the destinations again
+
     Returns:
         Dict with route information
     """
@@ -128,40 +333,53 @@ async def calculate_route_info(destinations: List[str]) -> Dict:
             "total_distance_km": 0,
             "segments": []
         }
-    
-    coords = {}
-    for dest in destinations:
-        coord = await get_coordinates(dest)
-        if coord:
-            coords[dest] = coord
-    
+
+    if plan is None:
+        plan = await _located_plan(destinations)
+
     segments = []
     total_distance = 0
-    
-    for i in range(len(destinations) - 1):
-        from_dest = destinations[i]
-        to_dest = destinations[i + 1]
-        
-        if from_dest in coords and to_dest in coords:
-            distance = calculate_distance(coords[from_dest], coords[to_dest])
-            # Rough estimate: 60 km/h average travel speed
-            travel_hours = distance / 60
-            
-            segments.append({
-                "from": from_dest,
-                "to": to_dest,
-                "distance_km": round(distance, 1),
-                "estimated_hours": round(travel_hours, 1)
-            })
-            
-            total_distance += distance
-    
+
+    for from_dest, to_dest in zip(destinations, destinations[1:]):
+        distance = plan.distance(from_dest, to_dest)
+        if distance is None:
+            continue
+        # Rough estimate: 60 km/h average travel speed
+        travel_hours = distance / 60
+
+        segments.append({
+            "from": from_dest,
+            "to": to_dest,
+            "distance_km": round(distance, 1),
+            "estimated_hours": round(travel_hours, 1)
+        })
+
+        total_distance += distance
+
     return {
         "total_distance_km": round(total_distance, 1),
         "segments": segments
     }
 
 
+def allocate_days(num_destinations: int, total_days: int) -> List[int]:
+    """
+    Split a trip's days over destinations in route order; the first
+    destinations get the remainder days
+
+    Args:
+        num_destinations: Number of stops on the route
+        total_days: Total trip duration in days
+
+    Returns:
+        Days per stop, by position (repeated destinations count separately)
+    """
+    if num_destinations == 0:
+        return []
+    days_per_dest, extra_days = divmod(total_days, num_destinations)
+    return [days_per_dest + (1 if i < extra_days else 0) for i in range(num_destinations)]
+
+
 def calculate_days_per_destination(
     destinations: List[str], 
     total_days: int
@@ -176,18 +394,60 @@ def calculate_days_per_destination(
     Returns:
         Dict mapping destination to number of days
     """
-    num_destinations = len(destinations)
-    
-    if num_destinations == 0:
-        return {}
-    
-    # Base allocation
-    days_per_dest = total_days // num_destinations
-    extra_days = total_days % num_destinations
-    
-    allocation = {}
-    for i, dest in enumerate(destinations):
-        # Give extra days to first destinations
-        allocation[dest] = days_per_dest + (1 if i < extra_days else 0)
-    
+    allocation: Dict[str, int] = {}
+    for dest, days in zip(destinations, allocate_days(len(destinations), total_days)):
+        allocation[dest] = allocation.get(dest, 0) + days
     return allocation
+
+
+@dataclass
+class ItinerarySegment:
+    """Consecutive days of a trip that are generated with one prompt"""
+    destinations: List[str]
+    start_day: int
+    days: int
+    # Position among the segments covering the same stay (long stays are split)
+    part: int = 1
+    parts: int = 1
+    stay_days: int = 0
+
+    @property
+    def end_day(self) -> int:
+        return self.start_day + self.days - 1
+
+
+def plan_itinerary_segments(
+    destinations: List[str],
+    total_days: int,
+    max_days: Optional[int] = None
+) -> List[ItinerarySegment]:
+    """
+    Split a trip into itinerary segments: one per destination, with stays
+    longer than `max_days` split into near-equal parts (weeks by default)
+
+    Destinations left without a full day (more stops than days) are visited
+    within the previous segment.
+
+    Args:
+        destinations: Destinations in route order
+        total_days: Total trip duration in days
+        max_days: Longest segment (defaults to ITINERARY_SEGMENT_MAX_DAYS)
+
+    Returns:
+        Segments in day order, numbered from day 1
+    """
+    max_days = max(1, max_days or ITINERARY_SEGMENT_MAX_DAYS)
+    segments: List[ItinerarySegment] = []
+    day = 1
+    for dest, days in zip(destinations, allocate_days(len(destinations), total_days)):
+        if days == 0:
+            if segments:
+                segments[-1].destinations.append(dest)
+            continue
+        parts = -(-days // max_days)
+        base, extra = divmod(days, parts)
+        for part in range(parts):
+            part_days = base + (1 if part < extra else 0)
+            segments.append(ItinerarySegment([dest], day, part_days, part + 1, parts, days))
+            day += part_days
+    return segments
@@ -0,0 +1,227 @@
+"""
+Background guide generation jobs
+
+Guides can take longer to generate than a proxy will keep a request open,
+so clients can submit a job, get its id immediately and poll for the
+result. Jobs run on a bounded pool of worker tasks; a request identical to
+one that is already queued or running attaches to that job.
+
+Job state is also written to the cache database, so any worker process can
+answer a poll for a job another process is running, and each canonical
+request is claimed there, so identical requests reaching different worker
+processes attach to one job.
+"""
+import os
+import time
+import uuid
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from models.schemas import GuideRequest, TravelGuide
+from services.guide_service import build_travel_guide, canonical_request_key, is_degraded_guide
+from services.guide_cache import get_cached_guide, cache_guide
+from services.cache_store import SQLiteCache, MISSING
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+# Finished jobs are kept this long (seconds) for clients to fetch the result
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+# A queued or running job not finished after this long (seconds) is presumed
+# lost with its worker process, and an identical request starts a new one
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "600"))
+
+
+class JobQueueFull(Exception):
+    """Raised when no more jobs can be queued"""
+
+
+@dataclass
+class Job:
+    """A guide generation job"""
+    id: str
+    key: str
+    request: GuideRequest
+    status: str = "queued"  # 'queued', 'running', 'completed', 'failed'
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[TravelGuide] = None
+    error: Optional[str] = None
+
+
+_jobs: Dict[str, Job] = {}
+# Canonical request key -> id of the queued or running job for it
+_active: Dict[str, str] = {}
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+# Job state visible to every worker process
+_shared = SQLiteCache("jobs")
+# Canonical request key -> id of the job generating it, across processes
+_claims = SQLiteCache("job_claims")
+
+
+async def _publish(job: Job) -> None:
+    """Write a job's current state to the shared store"""
+    await _shared.set_async(job.id, {
+        "key": job.key,
+        "request": job.request.model_dump(mode="json"),
+        "status": job.status,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result": job.result.model_dump(mode="json") if job.result is not None else None,
+        "error": job.error
+    }, JOB_RESULT_TTL)
+
+
+def _job_from_record(job_id: str, record: Dict[str, Any]) -> Job:
+    return Job(
+        id=job_id,
+        key=record["key"],
+        request=GuideRequest(**record["request"]),
+        status=record["status"],
+        created_at=record["created_at"],
+        started_at=record["started_at"],
+        finished_at=record["finished_at"],
+        result=TravelGuide(**record["result"]) if record["result"] is not None else None,
+        error=record["error"]
+    )
+
+
+async def _worker() -> None:
+    while True:
+        job = await _queue.get()
+        job.status = "running"
+        job.started_at = time.time()
+        await _publish(job)
+        try:
+            cached = await get_cached_guide(job.key)
+            if cached is not None:
+                job.result = TravelGuide(**cached.data)
+            else:
+                job.result = await build_travel_guide(job.request)
+                if not await is_degraded_guide(job.request, job.result.model_dump(mode="json")):
+                    await cache_guide(job.key, job.result)
+            job.status = "completed"
+        except Exception as e:
+            print(f"Error generating travel guide (job {job.id}): {e}")
+            job.error = f"Failed to generate travel guide: {str(e)}"
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            await _publish(job)
+            _active.pop(job.key, None)
+            await _release_claim(job)
+            _queue.task_done()
+
+
+def start_job_workers(count: Optional[int] = None) -> None:
+    """Start the worker pool (no-op if it is already running)"""
+    global _queue
+    if _workers:
+        return
+    _queue = asyncio.Queue(maxsize=JOB_QUEUE_SIZE)
+    for _ in range(count or JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop_job_workers() -> None:
+    """Cancel the worker pool (called on application shutdown)"""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+def _purge_finished() -> None:
+    cutoff = time.time() - JOB_RESULT_TTL
+    for job_id in [job_id for job_id, job in _jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]:
+        del _jobs[job_id]
+
+
+def _is_pending(job: Job) -> bool:
+    """Whether a job is queued or running, and recent enough to still finish"""
+    since = job.started_at or job.created_at
+    return job.status in ("queued", "running") and time.time() - since < JOB_STALE_AFTER
+
+
+async def _claimed_job(key: str, job_id: str) -> Optional[Job]:
+    """
+    Claim a canonical request for a new job
+
+    Returns:
+        None if the claim was taken, else the pending job (possibly in
+        another process) that holds it
+    """
+    while not await _claims.add_async(key, job_id, JOB_STALE_AFTER):
+        holder = await _claims.get_async(key)
+        if holder is MISSING:
+            # Released in the meantime; try again
+            continue
+        job = await get_job(holder)
+        if job is not None and _is_pending(job):
+            return job
+        # The holder finished or was lost without releasing its claim
+        await _claims.delete_async(key)
+    return None
+
+
+async def _release_claim(job: Job) -> None:
+    """Drop a finished job's claim, unless another job has taken it over"""
+    if await _claims.get_async(job.key) == job.id:
+        await _claims.delete_async(job.key)
+
+
+async def submit_job(request: GuideRequest) -> Tuple[Job, bool]:
+    """
+    Queue a guide request, or attach to an identical queued/running one
+
+    Args:
+        request: GuideRequest with destinations, days, and preferences
+
+    Returns:
+        (job, created) where created is False if an existing job was reused
+
+    Raises:
+        JobQueueFull: If the queue is at JOB_QUEUE_SIZE
+    """
+    start_job_workers()
+    _purge_finished()
+
+    key = canonical_request_key(request)
+    existing = _active.get(key)
+    if existing is not None:
+        return _jobs[existing], False
+
+    job = Job(id=uuid.uuid4().hex, key=key, request=request)
+    if _queue.full():
+        raise JobQueueFull(f"Job queue is full ({JOB_QUEUE_SIZE} jobs)")
+    # Published before claiming, so a process that finds the claim can read the job
+    await _publish(job)
+    # Another worker process may already be generating this guide
+    existing_job = await _claimed_job(key, job.id)
+    if existing_job is not None:
+        await _shared.delete_async(job.id)
+        return existing_job, False
+
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        await _release_claim(job)
+        await _shared.delete_async(job.id)
+        raise JobQueueFull(f"Job queue is full ({JOB_QUEUE_SIZE} jobs)")
+    _jobs[job.id] = job
+    _active[key] = job.id
+    return job, True
+
+
+async def get_job(job_id: str) -> Optional[Job]:
+    """Look up a job by id, in this process or another (None if unknown or expired)"""
+    _purge_finished()
+    job = _jobs.get(job_id)
+    if job is None:
+        record = await _shared.get_async(job_id)
+        if record is not MISSING:
+            job = _job_from_record(job_id, record)
+    return job
@@ -0,0 +1,117 @@
+"""
+Incremental JSON parser for streamed LLM output
+"""
+import json
+from typing import Any, List
+
+
+class JSONArrayStreamParser:
+    """
+    Extract the elements of a top-level JSON array while it is still streaming
+
+    Feed text chunks as they arrive; `feed` returns every element whose
+    closing brace/bracket has been received. Markdown code fences and any
+    text before the opening bracket are ignored. If the model returns an
+    object instead of an array, the first array value inside it is used
+    (e.g. {"days": [...]}).
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0          # nesting depth, 1 = inside the target array
+        self._started = False
+        self._finished = False
+        self._in_string = False
+        self._escape = False
+        self._element_start = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the closing bracket of the array has been seen"""
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        Add a chunk of text
+
+        Returns:
+            Elements completed by this chunk, in order
+        """
+        self._buffer += chunk
+        elements = []
+        buffer = self._buffer
+
+        while self._pos < len(buffer) and not self._finished:
+            ch = buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                self._pos += 1
+                continue
+
+            if not self._started:
+                if ch == '"':
+                    self._in_string = True
+                elif ch == "[":
+                    self._started = True
+                    self._depth = 1
+                self._pos += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._element_start is None:
+                    self._element_start = self._pos
+            elif ch in "{[":
+                if self._depth == 1 and self._element_start is None:
+                    self._element_start = self._pos
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finished = True
+                elif self._depth == 1 and self._element_start is not None:
+                    element = self._parse(buffer[self._element_start:self._pos + 1])
+                    if element is not None:
+                        elements.append(element)
+                    self._element_start = None
+            elif ch == "," and self._depth == 1 and self._element_start is not None:
+                # End of a scalar element (e.g. a string in an array of strings)
+                element = self._parse(buffer[self._element_start:self._pos])
+                if element is not None:
+                    elements.append(element)
+                self._element_start = None
+            elif self._depth == 1 and self._element_start is None and not ch.isspace() and ch != ",":
+                self._element_start = self._pos
+            self._pos += 1
+
+        # Scalar element closed by the final bracket
+        if self._finished and self._element_start is not None:
+            element = self._parse(buffer[self._element_start:self._pos - 1])
+            if element is not None:
+                elements.append(element)
+            self._element_start = None
+
+        # Drop consumed text to keep the buffer small
+        keep_from = self._element_start if self._element_start is not None else self._pos
+        self._buffer = buffer[keep_from:]
+        self._pos -= keep_from
+        if self._element_start is not None:
+            self._element_start = 0
+        return elements
+
+    @staticmethod
+    def _parse(text: str) -> Any:
+        text = text.strip()
+        if not text:
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
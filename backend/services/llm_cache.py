@@ -0,0 +1,218 @@
+"""
+LLM response cache with single-flight de-duplication of identical prompts,
+within a process and across worker processes
+"""
+import os
+import uuid
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from services.cache_store import LRUCache, SQLiteCache, MISSING, normalize_key
+from services.metrics import record_cache
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+# With several worker processes, only the one holding a prompt's lease calls
+# the provider; the others wait for its cached result. The lease is renewed
+# while the call runs, so it only expires when its holder died. Its TTL
+# defaults to the combined provider deadlines (set by the caller).
+LLM_SHARED_FLIGHT = os.getenv("LLM_SHARED_FLIGHT", "true").lower() == "true"
+LLM_LEASE_TTL = float(os.getenv("LLM_LEASE_TTL", "0")) or None
+# Waiting processes check for the result after LLM_LEASE_POLL_INTERVAL,
+# backing off up to LLM_LEASE_POLL_MAX_INTERVAL between checks
+LLM_LEASE_POLL_INTERVAL = float(os.getenv("LLM_LEASE_POLL_INTERVAL", "0.25"))
+LLM_LEASE_POLL_MAX_INTERVAL = float(os.getenv("LLM_LEASE_POLL_MAX_INTERVAL", "2"))
+
+_memory_cache = LRUCache(max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL)
+_disk_cache = SQLiteCache("llm_responses")
+_leases = SQLiteCache("llm_leases")
+
+# Calls currently running, by prompt key
+_inflight: Dict[str, asyncio.Future] = {}
+# Streams currently running, by prompt key
+_inflight_streams: Dict[str, "_StreamFlight"] = {}
+
+
+def prompt_key(prompt: str) -> str:
+    """Hash of the normalized prompt (case and whitespace insensitive)"""
+    return hashlib.sha256(normalize_key(prompt).encode("utf-8")).hexdigest()
+
+
+def response_key(provider: str, model: str, prompt: str) -> str:
+    """Cache key for a provider/model/prompt combination"""
+    return f"{provider}:{model}:{prompt_key(prompt)}"
+
+
+async def get_cached_response(provider: str, model: str, prompt: str, count: bool = True) -> Optional[str]:
+    """
+    Look up a cached completion
+
+    Args:
+        count: Whether to count the lookup in the cache hit/miss metrics
+
+    Returns:
+        The cached text, or None on a miss (or when caching is disabled)
+    """
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    key = response_key(provider, model, prompt)
+    cached = _memory_cache.get(key)
+    if cached is MISSING:
+        cached = await _disk_cache.get_async(key)
+        if cached is not MISSING:
+            _memory_cache.set(key, cached)
+    if count:
+        record_cache("llm", cached is not MISSING)
+    return cached if cached is not MISSING else None
+
+
+async def store_response(provider: str, model: str, prompt: str, text: str) -> None:
+    """Cache a completion in both tiers"""
+    if not LLM_CACHE_ENABLED:
+        return
+
+    key = response_key(provider, model, prompt)
+    _memory_cache.set(key, text)
+    await _disk_cache.set_async(key, text, LLM_CACHE_TTL)
+
+
+async def single_flight(key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run `call` once for all concurrent callers using the same key
+
+    Callers arriving while the call is running wait for its result (or
+    exception) instead of starting their own.
+    """
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(call())
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shield so one cancelled caller does not cancel the call for the others
+    return await asyncio.shield(future)
+
+
+class _StreamFlight:
+    """One upstream stream, buffered for every consumer"""
+
+    def __init__(self, stream: AsyncIterator[str]):
+        self.chunks: List[str] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.consumers = 0
+        self._updated = asyncio.Event()
+        # A task, so a consumer that stops early does not stop it for the others
+        self.task = asyncio.ensure_future(self._produce(stream))
+
+    async def _produce(self, stream: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in stream:
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = RuntimeError("Stream cancelled")
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self) -> None:
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def follow(self) -> AsyncIterator[str]:
+        """The chunks produced so far, then the live stream"""
+        position = 0
+        while True:
+            updated = self._updated
+            while position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await updated.wait()
+
+
+async def single_flight_stream(key: str, stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+    """
+    Stream `stream()` once for all concurrent consumers using the same key
+
+    Consumers joining late first get the chunks already received, then
+    follow the live stream; all of them see the same error, if any.
+    """
+    flight = _inflight_streams.get(key)
+    if flight is None:
+        flight = _inflight_streams[key] = _StreamFlight(stream())
+        flight.task.add_done_callback(
+            lambda _: _inflight_streams.pop(key, None) if _inflight_streams.get(key) is flight else None
+        )
+    flight.consumers += 1
+    try:
+        async for chunk in flight.follow():
+            yield chunk
+    finally:
+        flight.consumers -= 1
+        if flight.consumers == 0 and not flight.done:
+            # Nobody is listening any more: stop the upstream stream
+            if _inflight_streams.get(key) is flight:
+                del _inflight_streams[key]
+            flight.task.cancel()
+
+
+async def shared_flight(
+    key: str,
+    lookup: Callable[[], Awaitable[Optional[Any]]],
+    call: Callable[[], Awaitable[Any]],
+    ttl: float
+) -> Any:
+    """
+    Run `call` in one worker process at a time per key
+
+    The lease lives in the shared cache database and is renewed every third
+    of its TTL while `call` runs. Processes that cannot get it poll `lookup`
+    (the shared cache), less often the longer they wait, until the holder's
+    result appears, or take over once the lease is released or expires.
+
+    Args:
+        key: Prompt key
+        lookup: Returns the cached result, or None
+        call: Computes (and caches) the result
+        ttl: Lease TTL, the longest `call` can take (LLM_LEASE_TTL overrides it)
+    """
+    if not (LLM_SHARED_FLIGHT and LLM_CACHE_ENABLED):
+        return await call()
+
+    ttl = LLM_LEASE_TTL or ttl
+    holder = f"{os.getpid()}:{uuid.uuid4().hex}"
+    interval = LLM_LEASE_POLL_INTERVAL
+    while not await _leases.add_async(key, holder, ttl):
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, LLM_LEASE_POLL_MAX_INTERVAL)
+        cached = await lookup()
+        if cached is not None:
+            return cached
+
+    async def renew() -> None:
+        while True:
+            await asyncio.sleep(ttl / 3)
+            if not await _leases.renew_async(key, holder, ttl):
+                print(f"LLM lease {key[:12]} was lost; another worker may repeat the call")
+                return
+
+    renewer = asyncio.ensure_future(renew())
+    try:
+        # The previous holder may have finished between our lookup and add
+        cached = await lookup()
+        if cached is not None:
+            return cached
+        return await call()
+    finally:
+        renewer.cancel()
+        await asyncio.gather(renewer, return_exceptions=True)
+        await _leases.delete_async(key)
@@ -0,0 +1,207 @@
+"""
+Asynchronous LLM provider clients (OpenRouter and Google Gemini)
+
+The provider SDKs take over a second to import, so they are loaded when a
+client is first needed (or by warm_up() during application startup).
+"""
+import os
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional
+from services.http_client import get_http_client
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Configuration
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "anthropic/claude-3.5-sonnet")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro")
+OPENROUTER_TIMEOUT = float(os.getenv("OPENROUTER_TIMEOUT", "60"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+
+SYSTEM_PROMPT = "You are a helpful travel assistant that outputs valid JSON only."
+
+_openrouter_client: Optional["AsyncOpenAI"] = None
+_openrouter_http_client = None
+_gemini_model = None
+
+# Token usage per provider since start (or the last reset)
+_token_usage: Dict[str, Dict[str, int]] = {}
+
+
+def openrouter_available() -> bool:
+    """Whether OpenRouter is configured"""
+    return bool(OPENROUTER_API_KEY)
+
+
+def gemini_available() -> bool:
+    """Whether Google Gemini is configured"""
+    return bool(GOOGLE_API_KEY)
+
+
+def _record_usage(provider: str, prompt_tokens: int, completion_tokens: int) -> None:
+    usage = _token_usage.setdefault(
+        provider, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    )
+    usage["calls"] += 1
+    usage["prompt_tokens"] += prompt_tokens or 0
+    usage["completion_tokens"] += completion_tokens or 0
+
+
+def get_token_usage() -> Dict[str, Dict[str, int]]:
+    """
+    Token usage per provider
+
+    Returns:
+        Dict mapping provider to calls, prompt_tokens and completion_tokens
+    """
+    return {provider: dict(usage) for provider, usage in _token_usage.items()}
+
+
+def reset_token_usage() -> None:
+    """Reset the token usage counters"""
+    _token_usage.clear()
+
+
+def _get_openrouter_client() -> "AsyncOpenAI":
+    """Get the OpenRouter client bound to the shared keep-alive pool"""
+    global _openrouter_client, _openrouter_http_client
+    http_client = get_http_client("llm")
+    # Rebuild if the shared pool was closed and recreated
+    if _openrouter_client is None or _openrouter_http_client is not http_client:
+        from openai import AsyncOpenAI
+        _openrouter_http_client = http_client
+        _openrouter_client = AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=OPENROUTER_API_KEY,
+            http_client=http_client,
+            timeout=OPENROUTER_TIMEOUT,
+        )
+    return _openrouter_client
+
+
+def _get_gemini_model():
+    """Get the Gemini model handle"""
+    global _gemini_model
+    if _gemini_model is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GOOGLE_API_KEY)
+        _gemini_model = genai.GenerativeModel(GEMINI_MODEL)
+    return _gemini_model
+
+
+def warm_up() -> None:
+    """Import the SDKs of the configured providers and build their clients"""
+    if openrouter_available():
+        _get_openrouter_client()
+    if gemini_available():
+        _get_gemini_model()
+
+
+async def call_openrouter(prompt: str, timeout: Optional[float] = None) -> str:
+    """
+    Run a chat completion on OpenRouter without blocking the event loop
+
+    Args:
+        prompt: User prompt
+        timeout: Per-call timeout in seconds (defaults to OPENROUTER_TIMEOUT)
+
+    Returns:
+        Completion text
+    """
+    timeout = timeout or OPENROUTER_TIMEOUT
+    response = await _get_openrouter_client().chat.completions.create(
+        model=OPENROUTER_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        timeout=timeout
+    )
+    if response.usage:
+        _record_usage("openrouter", response.usage.prompt_tokens, response.usage.completion_tokens)
+    return response.choices[0].message.content
+
+
+async def call_gemini(prompt: str, timeout: Optional[float] = None) -> str:
+    """
+    Generate content with Gemini without blocking the event loop
+
+    Args:
+        prompt: User prompt
+        timeout: Per-call timeout in seconds (defaults to GEMINI_TIMEOUT)
+
+    Returns:
+        Completion text
+    """
+    timeout = timeout or GEMINI_TIMEOUT
+    response = await asyncio.wait_for(
+        _get_gemini_model().generate_content_async(
+            prompt,
+            request_options={"timeout": timeout}
+        ),
+        timeout=timeout
+    )
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        _record_usage("gemini", usage.prompt_token_count, usage.candidates_token_count)
+    return response.text
+
+
+async def stream_openrouter(prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+    """
+    Stream a chat completion from OpenRouter
+
+    Args:
+        prompt: User prompt
+        timeout: Per-call timeout in seconds (defaults to OPENROUTER_TIMEOUT)
+
+    Yields:
+        Text deltas as they arrive
+    """
+    timeout = timeout or OPENROUTER_TIMEOUT
+    stream = await _get_openrouter_client().chat.completions.create(
+        model=OPENROUTER_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        stream=True,
+        stream_options={"include_usage": True},
+        timeout=timeout
+    )
+    async for chunk in stream:
+        if chunk.usage:
+            _record_usage("openrouter", chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def stream_gemini(prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+    """
+    Stream generated content from Gemini
+
+    Args:
+        prompt: User prompt
+        timeout: Per-call timeout in seconds (defaults to GEMINI_TIMEOUT)
+
+    Yields:
+        Text chunks as they arrive
+    """
+    timeout = timeout or GEMINI_TIMEOUT
+    response = await asyncio.wait_for(
+        _get_gemini_model().generate_content_async(
+            prompt,
+            stream=True,
+            request_options={"timeout": timeout}
+        ),
+        timeout=timeout
+    )
+    usage = None
+    async for chunk in response:
+        usage = getattr(chunk, "usage_metadata", None) or usage
+        if chunk.text:
+            yield chunk.text
+    if usage:
+        _record_usage("gemini", usage.prompt_token_count, usage.candidates_token_count)
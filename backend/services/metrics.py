@@ -0,0 +1,243 @@
+"""
+Latency, error and cache metrics, exported for Prometheus and summarized
+per response in a Server-Timing header
+
+Works without prometheus-client installed: metrics become no-ops and only
+Server-Timing is reported. With several worker processes, set
+PROMETHEUS_MULTIPROC_DIR so /metrics aggregates all of them.
+"""
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List, Optional
+
+try:
+    from prometheus_client import (
+        Counter, Gauge, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _NoopMetric:
+    """Stand-in for prometheus metrics when the client is not installed"""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+
+# Upstream calls take from ~50 ms (cached Unsplash) to over a minute (Apify runs)
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+if PROMETHEUS_AVAILABLE:
+    EXTERNAL_CALL_SECONDS = Histogram(
+        "travel_guide_external_call_seconds",
+        "Latency of calls to external services",
+        ["service", "operation"],
+        buckets=_LATENCY_BUCKETS
+    )
+    EXTERNAL_CALL_ERRORS = Counter(
+        "travel_guide_external_call_errors_total",
+        "Failed calls to external services",
+        ["service", "operation", "error"]
+    )
+    EXTERNAL_CALLS_IN_FLIGHT = Gauge(
+        "travel_guide_external_calls_in_flight",
+        "Calls to external services currently waiting for a response",
+        ["service"],
+        multiprocess_mode="livesum"
+    )
+    STAGE_SECONDS = Histogram(
+        "travel_guide_stage_seconds",
+        "Run time of guide pipeline stages (per-destination stages grouped)",
+        ["stage"],
+        buckets=_LATENCY_BUCKETS
+    )
+    PIPELINES_IN_FLIGHT = Gauge(
+        "travel_guide_pipelines_in_flight",
+        "Guide pipelines currently running",
+        multiprocess_mode="livesum"
+    )
+    CACHE_LOOKUPS = Counter(
+        "travel_guide_cache_lookups_total",
+        "Cache lookups by cache and result (hit or miss)",
+        ["cache", "result"]
+    )
+    HTTP_REQUEST_SECONDS = Histogram(
+        "travel_guide_http_request_seconds",
+        "API request latency",
+        ["method", "route", "status"],
+        buckets=_LATENCY_BUCKETS
+    )
+    HEDGED_CALLS = Counter(
+        "travel_guide_hedged_calls_total",
+        "Hedge calls to a secondary provider, launched and won",
+        ["provider", "outcome"]
+    )
+    CIRCUIT_STATE = Gauge(
+        "travel_guide_circuit_state",
+        "Provider circuit breaker state (0 closed, 1 half open, 2 open; worst worker)",
+        ["provider"],
+        multiprocess_mode="livemax"
+    )
+else:
+    EXTERNAL_CALL_SECONDS = EXTERNAL_CALL_ERRORS = EXTERNAL_CALLS_IN_FLIGHT = _NoopMetric()
+    STAGE_SECONDS = PIPELINES_IN_FLIGHT = CACHE_LOOKUPS = HTTP_REQUEST_SECONDS = _NoopMetric()
+    HEDGED_CALLS = CIRCUIT_STATE = _NoopMetric()
+
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+# Time spent per service during the current request, for Server-Timing
+_request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def _add_timing(name: str, seconds: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.setdefault(name, []).append(seconds)
+
+
+@asynccontextmanager
+async def track(service: str, operation: str) -> AsyncIterator[None]:
+    """
+    Measure a call to an external service
+
+    Records latency, in-flight calls and errors (cancellations excluded),
+    and adds the time to the current request's Server-Timing.
+
+    Args:
+        service: e.g. 'openrouter', 'gemini', 'unsplash', 'nominatim', 'apify'
+        operation: e.g. 'complete', 'stream', 'search'
+    """
+    EXTERNAL_CALLS_IN_FLIGHT.labels(service).inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        EXTERNAL_CALL_ERRORS.labels(service, operation, type(e).__name__).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        EXTERNAL_CALLS_IN_FLIGHT.labels(service).dec()
+        EXTERNAL_CALL_SECONDS.labels(service, operation).observe(elapsed)
+        _add_timing(service, elapsed)
+
+
+def stage_group(name: str) -> str:
+    """Stage name without its destination index ('details:2' -> 'details')"""
+    prefix, _, suffix = name.partition(":")
+    return prefix if suffix.isdigit() else name
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    """Record the run time of a pipeline stage"""
+    STAGE_SECONDS.labels(stage_group(name)).observe(seconds)
+
+
+@asynccontextmanager
+async def track_pipeline() -> AsyncIterator[None]:
+    """Count a running guide pipeline and add its duration to Server-Timing"""
+    PIPELINES_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PIPELINES_IN_FLIGHT.dec()
+        _add_timing("pipeline", time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup ('llm', 'geocode', 'images', 'places', 'guide')"""
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_hedge(provider: str, outcome: str) -> None:
+    """Count a hedge call ('launched' or 'won')"""
+    HEDGED_CALLS.labels(provider, outcome).inc()
+
+
+def set_circuit_state(provider: str, state: str) -> None:
+    """Publish a provider's circuit breaker state"""
+    CIRCUIT_STATE.labels(provider).set(_CIRCUIT_STATES[state])
+
+
+def export_metrics() -> bytes:
+    """Metrics in the Prometheus text format"""
+    if not PROMETHEUS_AVAILABLE:
+        return b""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def _server_timing(timings: Dict[str, List[float]], total: float) -> str:
+    entries = [
+        f'{name};dur={sum(values) * 1000:.1f};desc="{len(values)} call{"s" if len(values) != 1 else ""}"'
+        for name, values in timings.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency and adding a Server-Timing
+    header (time per external service, the pipeline and the request total)
+
+    Event streams are skipped: their headers go out before the work is done.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, List[float]] = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                content_type = dict(headers).get(b"content-type", b"")
+                if not content_type.startswith(b"text/event-stream"):
+                    value = _server_timing(timings, time.perf_counter() - start)
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope.get("method", ""),
+                getattr(route, "path", "unmatched"),
+                str(status)
+            ).observe(time.perf_counter() - start)
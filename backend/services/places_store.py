@@ -0,0 +1,68 @@
+"""
+Local store of Google Maps places, so repeat guides don't re-run the Apify scraper
+"""
+import os
+import time
+from typing import Dict, List, Optional
+from services.cache_store import SQLiteCache, MISSING, normalize_key
+from services.metrics import record_cache
+
+# Entries younger than PLACES_FRESH_TTL are served as-is; older ones are
+# still served but refreshed in the background. After PLACES_MAX_AGE they
+# are treated as missing.
+PLACES_FRESH_TTL = float(os.getenv("PLACES_FRESH_TTL", str(7 * 24 * 3600)))
+PLACES_MAX_AGE = float(os.getenv("PLACES_MAX_AGE", str(90 * 24 * 3600)))
+
+_store = SQLiteCache("places")
+
+
+def _key(destination: str, category: str) -> str:
+    return f"{normalize_key(destination)}|{category}"
+
+
+async def lookup_places(destination: str, category: str) -> Optional[Dict]:
+    """
+    Look up stored places for a destination and category
+
+    Args:
+        destination: Destination name
+        category: 'sleep', 'eat', or 'curiosity'
+
+    Returns:
+        Dict with 'places' (normalized place details), 'max_results'
+        (the limit they were scraped with), 'fetched_at' (Unix time) and
+        'stale' (True if a refresh is due), or None
+    """
+    entry = await _store.get_entry_async(_key(destination, category))
+    record_cache("places", entry is not MISSING)
+    if entry is MISSING:
+        return None
+    payload, fetched_at = entry
+    return {
+        "places": payload["places"],
+        "max_results": payload["max_results"],
+        "fetched_at": fetched_at,
+        "stale": time.time() - fetched_at > PLACES_FRESH_TTL
+    }
+
+
+async def save_places(
+    destination: str,
+    category: str,
+    places: List[Dict],
+    max_results: int
+) -> None:
+    """
+    Store normalized place details for a destination and category
+
+    Args:
+        destination: Destination name
+        category: 'sleep', 'eat', or 'curiosity'
+        places: Place details as returned by the apify_service transforms
+        max_results: Limit the places were scraped with
+    """
+    await _store.set_async(
+        _key(destination, category),
+        {"places": places, "max_results": max_results},
+        PLACES_MAX_AGE
+    )
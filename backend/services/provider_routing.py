@@ -0,0 +1,133 @@
+"""
+Latency-aware ordering of LLM providers
+
+Keeps an exponentially weighted moving average (EWMA) of latency and error
+rate per (provider, model, prompt type) and orders providers by expected
+cost: latency * (1 + LLM_ROUTING_ERROR_PENALTY * error rate) / weight.
+"""
+import os
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+# Weight of the newest observation in the moving averages
+LLM_ROUTING_ALPHA = float(os.getenv("LLM_ROUTING_ALPHA", "0.2"))
+# How strongly errors count against a provider (1.0 = a 100% error rate doubles its cost)
+LLM_ROUTING_ERROR_PENALTY = float(os.getenv("LLM_ROUTING_ERROR_PENALTY", "2.0"))
+# Share of calls sent to a random other provider so its stats stay current
+LLM_ROUTING_EXPLORE = float(os.getenv("LLM_ROUTING_EXPLORE", "0.05"))
+# Relative preference per provider, e.g. "openrouter=1.0,gemini=0.5" (default 1.0)
+LLM_PROVIDER_WEIGHTS = os.getenv("LLM_PROVIDER_WEIGHTS", "")
+
+T = TypeVar("T")
+
+
+def _parse_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() and weight.strip():
+            try:
+                weights[name.strip()] = float(weight)
+            except ValueError:
+                print(f"Ignoring invalid LLM_PROVIDER_WEIGHTS entry: {item}")
+    return weights
+
+
+_weights = _parse_weights(LLM_PROVIDER_WEIGHTS)
+
+
+class ProviderStats:
+    """EWMA latency and error rate of one provider, model and prompt type"""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.successes = 0
+
+    def _update_latency(self, seconds: float) -> None:
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += LLM_ROUTING_ALPHA * (seconds - self.latency)
+
+    def record_success(self, seconds: float) -> None:
+        self._update_latency(seconds)
+        self.error_rate *= 1 - LLM_ROUTING_ALPHA
+        self.samples += 1
+        self.successes += 1
+
+    def record_failure(self, seconds: float) -> None:
+        """
+        A call that failed after `seconds` (the deadline for a timeout)
+
+        A slow failure raises the latency estimate, so a provider that starts
+        timing out stops looking fast; a quick error says nothing about how
+        long a success takes and only counts as an error.
+        """
+        if self.latency is None or seconds > self.latency:
+            self._update_latency(seconds)
+        self.error_rate += LLM_ROUTING_ALPHA * (1 - self.error_rate)
+        self.samples += 1
+
+    def record_abandoned(self, seconds: float) -> None:
+        """A call cancelled after `seconds` (lost a hedge): it took at least that long"""
+        if self.latency is None or seconds > self.latency:
+            self._update_latency(seconds)
+
+    def cost(self, weight: float) -> Optional[float]:
+        if self.latency is None:
+            return None
+        return self.latency * (1 + LLM_ROUTING_ERROR_PENALTY * self.error_rate) / weight
+
+
+_stats: Dict[Tuple[str, str, str], ProviderStats] = {}
+
+
+def get_stats(provider: str, model: str, prompt_type: str) -> ProviderStats:
+    """Shared stats for a provider, model and prompt type"""
+    key = (provider, model, prompt_type)
+    stats = _stats.get(key)
+    if stats is None:
+        stats = _stats[key] = ProviderStats()
+    return stats
+
+
+def order_providers(providers: Sequence[T], prompt_type: str) -> List[T]:
+    """
+    Order providers by expected cost for a prompt type, cheapest first
+
+    Providers without observations yet keep their configured position
+    ahead of measured ones, so each gets tried; providers that have only
+    failed go last. Ties keep configured order.
+
+    Args:
+        providers: Tuples starting with (name, model, ...) in configured order
+        prompt_type: e.g. 'details', 'itinerary', 'recommendations'
+    """
+    def sort_key(item: Tuple[int, Any]) -> Tuple[int, float, int]:
+        position, provider = item
+        name, model = provider[0], provider[1]
+        stats = get_stats(name, model, prompt_type)
+        cost = stats.cost(_weights.get(name, 1.0))
+        if cost is None:
+            return (0, 0.0, position)
+        return (2 if stats.samples and not stats.successes else 1, cost, position)
+
+    ordered = [provider for _, provider in sorted(enumerate(providers), key=sort_key)]
+    if len(ordered) > 1 and random.random() < LLM_ROUTING_EXPLORE:
+        i = random.randrange(1, len(ordered))
+        ordered[0], ordered[i] = ordered[i], ordered[0]
+    return ordered
+
+
+def get_routing_stats() -> Dict[str, Dict[str, Any]]:
+    """Moving averages per prompt type and provider/model"""
+    result: Dict[str, Dict[str, Any]] = {}
+    for (provider, model, prompt_type), stats in _stats.items():
+        result.setdefault(prompt_type, {})[f"{provider}/{model}"] = {
+            "latency": None if stats.latency is None else round(stats.latency, 3),
+            "error_rate": round(stats.error_rate, 3),
+            "samples": stats.samples
+        }
+    return result
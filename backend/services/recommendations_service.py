@@ -1,141 +1,176 @@
 """
 Recommendations service - orchestrates Apify (real data) and AI services
 """
-from typing import List, Dict
-from services.apify_service import (
-    get_attractions,
-    get_restaurants,
-    get_accommodations,
-    APIFY_ENABLED
-)
+import asyncio
+from typing import List, Dict, Optional
+from services.apify_service import get_places_for_trip, APIFY_ENABLED
 from services.ai_service import generate_recommendations as ai_generate_recommendations
-from services.image_service import get_recommendation_image
+from services.image_service import resolve_recommendation_images
 from models.schemas import Recommendation, ImageInfo
 
+# Recommendation category -> key in the TravelGuide recommendations dict
+CATEGORY_KEYS = {
+    "sleep": "sleep",
+    "eat": "eat",
+    "curiosity": "curiosities"
+}
+
+
+def _place_image(place: Dict) -> Optional[ImageInfo]:
+    """Build the ImageInfo for an Apify place, if it has a photo"""
+    if not place.get("image_url"):
+        return None
+    return ImageInfo(
+        url=place["image_url"],
+        alt_text=f"Photo of {place['name']}",
+        photographer=None
+    )
+
+
+def _apify_recommendations(destination: str, category: str, places: List[Dict]) -> List[Recommendation]:
+    """Recommendations for one destination and category from Google Maps data"""
+    recommendations = []
+
+    if category == "sleep":
+        # Real accommodations
+        for place in places:
+            recommendations.append(Recommendation(
+                name=place["name"],
+                description=place.get("description") or f"Rated {place.get('rating', 'N/A')} stars with {place.get('reviews_count', 0)} reviews",
+                category="sleep",
+                price_level=place.get("price_level"),
+                why_recommended=f"Highly rated on Google Maps ({place.get('rating', 0)}/5 from {place.get('reviews_count', 0)} reviews)",
+                image=_place_image(place)
+            ))
+
+    elif category == "eat":
+        # Real restaurants
+        for place in places:
+            recommendations.append(Recommendation(
+                name=place["name"],
+                description=place.get("description") or f"{place.get('cuisine', 'Restaurant')} - Rated {place.get('rating', 'N/A')} stars",
+                category="eat",
+                price_level=place.get("price_level"),
+                why_recommended=f"Top-rated {place.get('cuisine', 'dining')} ({place.get('rating', 0)}/5 from {place.get('reviews_count', 0)} reviews)",
+                image=_place_image(place)
+            ))
+
+    else:
+        # Real attractions for curiosities
+        for place in places:
+            recommendations.append(Recommendation(
+                name=place["name"],
+                description=place.get("description") or f"Popular {place.get('category', 'attraction')} in {destination}",
+                category="curiosity",
+                price_level=place.get("price_level"),
+                why_recommended=f"Must-see attraction ({place.get('rating', 0)}/5 from {place.get('reviews_count', 0)} reviews)",
+                image=_place_image(place)
+            ))
+
+    return recommendations
+
+
+async def _ai_recommendations(destination: str, category: str) -> List[Recommendation]:
+    """Recommendations for one destination and category generated by AI"""
+    recs = await ai_generate_recommendations(destination, category)
+
+    # Resolve all images for this destination and category in one batch
+    images = await resolve_recommendation_images(
+        destination,
+        category,
+        [rec_data.get("name", destination) for rec_data in recs]
+    )
+
+    # Convert to Recommendation objects
+    recommendations = []
+    for rec_data, image_data in zip(recs, images):
+        image = None
+        if image_data:
+            image = ImageInfo(
+                url=image_data["url"],
+                alt_text=image_data["alt_text"],
+                photographer=image_data.get("photographer")
+            )
+
+        recommendations.append(Recommendation(
+            name=rec_data.get("name", ""),
+            description=rec_data.get("description", ""),
+            category=category,
+            price_level=rec_data.get("price_level"),
+            why_recommended=rec_data.get("why_recommended", ""),
+            image=image
+        ))
+
+    return recommendations
+
+
+async def generate_category_recommendations(
+    destinations: List[str],
+    category: str,
+    places: Optional[Dict[str, Dict[str, List[Dict]]]] = None
+) -> List[Recommendation]:
+    """
+    Generate recommendations of one category across all destinations
+    Uses Apify for real Google Maps data when available, falls back to AI
+
+    Args:
+        destinations: List of destination names
+        category: 'sleep', 'eat', or 'curiosity'
+        places: Places already fetched with get_places_for_trip; when
+            omitted (and Apify is enabled) they are fetched here
+
+    Returns:
+        Recommendations in destination order
+    """
+    if APIFY_ENABLED:
+        # Use real Google Maps data via Apify
+        if places is None:
+            print(f"Fetching real {category} data from Google Maps for {', '.join(destinations)}")
+            places = await get_places_for_trip(destinations, max_results=3, categories=[category])
+        return [
+            rec
+            for destination in destinations
+            for rec in _apify_recommendations(
+                destination, category, places.get(destination, {}).get(category, [])
+            )
+        ]
+
+    # Fallback to AI-generated recommendations
+    print(f"Using AI-generated {category} recommendations (Apify not available)")
+    per_destination = await asyncio.gather(
+        *(_ai_recommendations(destination, category) for destination in destinations)
+    )
+    return [rec for recs in per_destination for rec in recs]
+
+
+async def fetch_trip_places(destinations: List[str]) -> Optional[Dict[str, Dict[str, List[Dict]]]]:
+    """
+    Fetch Google Maps places for the whole trip in one Apify run
+
+    Returns:
+        Places by destination and category, or None if Apify is not enabled
+    """
+    if not APIFY_ENABLED:
+        return None
+    print(f"Fetching real data from Google Maps for {', '.join(destinations)}")
+    return await get_places_for_trip(destinations, max_results=3)
+
 
 async def generate_all_recommendations(
     destinations: List[str]
 ) -> Dict[str, List[Recommendation]]:
     """
     Generate recommendations for all categories across all destinations
-    Uses Apify for real Google Maps data when available, falls back to AI
-    
+
     Args:
         destinations: List of destination names
-        
+
     Returns:
         Dict with 'sleep', 'eat', and 'curiosities' keys
     """
-    all_recommendations = {
-        "sleep": [],
-        "eat": [],
-        "curiosities": []
-    }
-    
-    # Generate recommendations for each destination
-    for destination in destinations:
-        if APIFY_ENABLED:
-            # Use real Google Maps data via Apify
-            print(f"Fetching real data from Google Maps for {destination}")
-            
-            # Get real accommodations
-            sleep_places = await get_accommodations(destination, max_results=3)
-            for place in sleep_places:
-                image = None
-                if place.get("image_url"):
-                    image = ImageInfo(
-                        url=place["image_url"],
-                        alt_text=f"Photo of {place['name']}",
-                        photographer=None
-                    )
-                
-                recommendation = Recommendation(
-                    name=place["name"],
-                    description=place.get("description") or f"Rated {place.get('rating', 'N/A')} stars with {place.get('reviews_count', 0)} reviews",
-                    category="sleep",
-                    price_level=place.get("price_level"),
-                    why_recommended=f"Highly rated on Google Maps ({place.get('rating', 0)}/5 from {place.get('reviews_count', 0)} reviews)",
-                    image=image
-                )
-                all_recommendations["sleep"].append(recommendation)
-            
-            # Get real restaurants
-            eat_places = await get_restaurants(destination, max_results=3)
-            for place in eat_places:
-                image = None
-                if place.get("image_url"):
-                    image = ImageInfo(
-                        url=place["image_url"],
-                        alt_text=f"Photo of {place['name']}",
-                        photographer=None
-                    )
-                
-                recommendation = Recommendation(
-                    name=place["name"],
-                    description=place.get("description") or f"{place.get('cuisine', 'Restaurant')} - Rated {place.get('rating', 'N/A')} stars",
-                    category="eat",
-                    price_level=place.get("price_level"),
-                    why_recommended=f"Top-rated {place.get('cuisine', 'dining')} ({place.get('rating', 0)}/5 from {place.get('reviews_count', 0)} reviews)",
-                    image=image
-                )
-                all_recommendations["eat"].append(recommendation)
-            
-            # Get real attractions for curiosities
-            attraction_places = await get_attractions(destination, max_results=3)
-            for place in attraction_places:
-                image = None
-                if place.get("image_url"):
-                    image = ImageInfo(
-                        url=place["image_url"],
-                        alt_text=f"Photo of {place['name']}",
-                        photographer=None
-                    )
-                
-                recommendation = Recommendation(
-                    name=place["name"],
-                    description=place.get("description") or f"Popular {place.get('category', 'attraction')} in {destination}",
-                    category="curiosity",
-                    price_level=place.get("price_level"),
-                    why_recommended=f"Must-see attraction ({place.get('rating', 0)}/5 from {place.get('reviews_count', 0)} reviews)",
-                    image=image
-                )
-                all_recommendations["curiosities"].append(recommendation)
-        else:
-            # Fallback to AI-generated recommendations
-            print(f"Using AI-generated recommendations for {destination} (Apify not available)")
-            
-            for category in ["sleep", "eat", "curiosity"]:
-                recs = await ai_generate_recommendations(destination, category)
-                
-                # Convert to Recommendation objects and add images
-                for rec_data in recs:
-                    # Get image for this recommendation
-                    image_data = await get_recommendation_image(
-                        rec_data.get("name", destination),
-                        category
-                    )
-                    
-                    image = None
-                    if image_data:
-                        image = ImageInfo(
-                            url=image_data["url"],
-                            alt_text=image_data["alt_text"],
-                            photographer=image_data.get("photographer")
-                        )
-                    
-                    recommendation = Recommendation(
-                        name=rec_data.get("name", ""),
-                        description=rec_data.get("description", ""),
-                        category=category,
-                        price_level=rec_data.get("price_level"),
-                        why_recommended=rec_data.get("why_recommended", ""),
-                        image=image
-                    )
-                    
-                    # Add to appropriate category
-                    if category == "curiosity":
-                        all_recommendations["curiosities"].append(recommendation)
-                    else:
-                        all_recommendations[category].append(recommendation)
-    
-    return all_recommendations
+    places = await fetch_trip_places(destinations)
+    categories = list(CATEGORY_KEYS)
+    results = await asyncio.gather(
+        *(generate_category_recommendations(destinations, category, places) for category in categories)
+    )
+    return {CATEGORY_KEYS[category]: recs for category, recs in zip(categories, results)}
@@ -0,0 +1,244 @@
+"""
+Deadlines, circuit breakers and hedged requests for upstream providers
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from services.metrics import record_hedge, set_circuit_state
+
+# A provider is skipped after this many consecutive failures, then retried
+# with a single trial call once CIRCUIT_RESET_TIMEOUT seconds have passed
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+# Hedging: if the primary hasn't answered after its HEDGE_PERCENTILE latency,
+# the next provider is started too and the first answer wins
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "90"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "1.0"))
+# Used until HEDGE_MIN_SAMPLES latencies have been observed
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "10"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed: calls allowed. open: calls rejected until the reset timeout has
+    passed. half_open: a single trial call is allowed; its outcome closes
+    or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = CIRCUIT_RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            print(f"Circuit {self.name}: {self.state} -> {state}")
+        self.state = state
+        set_circuit_state(self.name, state)
+
+    def allow(self) -> bool:
+        """Whether a call may be made now (claims the trial call when half open)"""
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._set_state("half_open")
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_in_flight = False
+        self._set_state("closed")
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state("open")
+
+    def release(self) -> None:
+        """Give back a trial call that ended without an outcome (cancelled)"""
+        self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of observed latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class ProviderGuard:
+    """Deadline, circuit breaker and latency history of one provider"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(name)
+        self.latency: Dict[str, LatencyTracker] = {}
+
+    async def run(self, operation: str, func: Callable[[], Awaitable[Any]], deadline: float) -> Any:
+        """
+        Call the provider through its circuit breaker, within a deadline
+
+        Args:
+            operation: Latency history key (e.g. 'complete', 'first_chunk')
+            func: Coroutine factory making the call
+            deadline: Seconds before the call is abandoned
+
+        Raises:
+            CircuitOpenError: If the circuit is open (nothing is called)
+            asyncio.TimeoutError: If the deadline passes
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(func(), deadline)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        self.latency.setdefault(operation, LatencyTracker()).record(time.monotonic() - start)
+        return result
+
+    def hedge_delay(self, operation: str) -> Optional[float]:
+        """Seconds to wait for this provider before hedging (None = never)"""
+        if not HEDGING_ENABLED:
+            return None
+        tracker = self.latency.get(operation)
+        if tracker is None or len(tracker) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, tracker.percentile(HEDGE_PERCENTILE))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "latency_p50": {op: t.percentile(50) for op, t in self.latency.items()},
+            "latency_p90": {op: t.percentile(90) for op, t in self.latency.items()}
+        }
+
+
+_guards: Dict[str, ProviderGuard] = {}
+
+
+def get_guard(name: str) -> ProviderGuard:
+    """Shared guard for a provider, created on first use"""
+    guard = _guards.get(name)
+    if guard is None:
+        guard = _guards[name] = ProviderGuard(name)
+    return guard
+
+
+def get_provider_health() -> Dict[str, Dict[str, Any]]:
+    """Circuit state and latency percentiles per provider"""
+    return {name: guard.stats() for name, guard in _guards.items()}
+
+
+@dataclass
+class Attempt:
+    """One way of getting a result, e.g. a call to one provider"""
+    name: str
+    run: Callable[[], Awaitable[Any]]
+
+
+async def hedged_call(
+    attempts: List[Attempt],
+    hedge_delay: Optional[float],
+    discard: Optional[Callable[[Any], Awaitable[None]]] = None
+) -> Tuple[str, Any]:
+    """
+    Run attempts in order until one succeeds, hedging slow ones
+
+    The next attempt starts as soon as the current one fails, or after
+    `hedge_delay` seconds if it is still running (None disables hedging).
+    The first success wins; attempts still running are cancelled.
+
+    Args:
+        attempts: Attempts in preference order
+        hedge_delay: Seconds to wait before starting a hedge
+        discard: Awaited with the results of other attempts that also
+            succeeded (e.g. to close an open stream)
+
+    Returns:
+        (name of the winning attempt, its result)
+
+    Raises:
+        The last attempt's exception if every attempt fails
+    """
+    queue = list(attempts)
+    pending: Dict[asyncio.Future, Tuple[str, bool]] = {}
+    error: Optional[BaseException] = None
+
+    def launch(hedge: bool) -> None:
+        attempt = queue.pop(0)
+        if hedge:
+            record_hedge(attempt.name, "launched")
+        pending[asyncio.ensure_future(attempt.run())] = (attempt.name, hedge)
+
+    launch(hedge=False)
+    try:
+        while pending:
+            timeout = hedge_delay if queue and hedge_delay is not None else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch(hedge=True)
+                continue
+
+            winner = None
+            for task in done:
+                name, hedge = pending.pop(task)
+                if task.exception() is not None:
+                    error = task.exception()
+                elif winner is None:
+                    winner = (name, task.result())
+                    if hedge:
+                        record_hedge(name, "won")
+                elif discard is not None:
+                    await discard(task.result())
+            if winner is not None:
+                return winner
+            if queue:
+                launch(hedge=False)
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            if discard is not None:
+                for result in results:
+                    if not isinstance(result, BaseException):
+                        await discard(result)
@@ -0,0 +1,209 @@
+"""
+Route engine: distance matrices and tour optimization for multi-stop trips
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Sequence, Tuple
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# "haversine" (vectorized, within ~0.5% of geodesic) or "geodesic" (exact
+# ellipsoidal distances via geopy, much slower for large trips)
+ROUTE_DISTANCE_MODE = os.getenv("ROUTE_DISTANCE_MODE", "haversine")
+# Time budget for improving the nearest-neighbor tour
+ROUTE_OPTIMIZE_BUDGET_MS = float(os.getenv("ROUTE_OPTIMIZE_BUDGET_MS", "50"))
+
+# Improvements smaller than this (km) are ignored, to avoid float ping-pong
+_EPSILON = 1e-9
+
+
+@dataclass
+class RoutePlan:
+    """Optimized stop order plus the distance matrix it was computed from"""
+    order: List[str]
+    matrix: Optional[np.ndarray] = None
+    index: Dict[str, int] = field(default_factory=dict)
+
+    def distance(self, from_dest: str, to_dest: str) -> Optional[float]:
+        """Distance in km between two geocoded stops, or None"""
+        if self.matrix is None or from_dest not in self.index or to_dest not in self.index:
+            return None
+        return float(self.matrix[self.index[from_dest], self.index[to_dest]])
+
+
+def distance_matrix(
+    points: Sequence[Tuple[float, float]],
+    mode: Optional[str] = None
+) -> np.ndarray:
+    """
+    Pairwise distances between points in kilometers
+
+    Args:
+        points: (lat, lng) pairs
+        mode: "haversine" or "geodesic" (defaults to ROUTE_DISTANCE_MODE)
+
+    Returns:
+        Symmetric (n, n) array of distances
+    """
+    coords = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(coords)
+
+    if (mode or ROUTE_DISTANCE_MODE) == "geodesic":
+        from geopy.distance import geodesic
+
+        matrix = np.zeros((n, n))
+        for i in range(n):
+            for j in range(i + 1, n):
+                matrix[i, j] = matrix[j, i] = geodesic(coords[i], coords[j]).kilometers
+        return matrix
+
+    lat = np.radians(coords[:, 0])
+    lng = np.radians(coords[:, 1])
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def path_length(matrix: np.ndarray, order: Sequence[int]) -> float:
+    """Total length of an open path visiting `order`"""
+    order = np.asarray(order)
+    if len(order) < 2:
+        return 0.0
+    return float(matrix[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbor(matrix: np.ndarray, start: int = 0) -> List[int]:
+    """Greedy open path from `start`, always moving to the closest unvisited stop"""
+    n = len(matrix)
+    visited = np.zeros(n, dtype=bool)
+    order = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, matrix[order[-1]])
+        nearest = int(np.argmin(row))
+        order.append(nearest)
+        visited[nearest] = True
+    return order
+
+
+def two_opt(matrix: np.ndarray, order: List[int], deadline: float) -> Tuple[List[int], bool]:
+    """
+    Reverse path segments while that shortens the path (first stop fixed)
+
+    Returns:
+        (order, improved)
+    """
+    route = np.asarray(order)
+    n = len(route)
+    improved = False
+    changed = True
+    while changed and time.perf_counter() < deadline:
+        changed = False
+        for i in range(1, n - 1):
+            # Reverse route[i..j] for every j > i at once:
+            # edges (a, b) and (c, e) become (a, c) and (b, e)
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:]
+            e = np.append(route[i + 2:], -1)
+            has_next = e >= 0
+            e_safe = np.where(has_next, e, 0)
+            delta = (matrix[a, c] - matrix[a, b]
+                     + np.where(has_next, matrix[b, e_safe] - matrix[c, e_safe], 0.0))
+            k = int(np.argmin(delta))
+            if delta[k] < -_EPSILON:
+                j = i + 1 + k
+                route[i:j + 1] = route[i:j + 1][::-1].copy()
+                changed = improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return route.tolist(), improved
+
+
+def or_opt(
+    matrix: np.ndarray,
+    order: List[int],
+    deadline: float,
+    max_segment: int = 3
+) -> Tuple[List[int], bool]:
+    """
+    Move runs of 1..max_segment stops (optionally reversed) to the cheapest
+    other position in the path (first stop fixed)
+
+    Returns:
+        (order, improved)
+    """
+    route = list(order)
+    n = len(route)
+    improved = False
+    changed = True
+    while changed and time.perf_counter() < deadline:
+        changed = False
+        for length in range(1, max_segment + 1):
+            for i in range(1, n - length + 1):
+                segment = route[i:i + length]
+                first, last = segment[0], segment[-1]
+                prev = route[i - 1]
+                nxt = route[i + length] if i + length < n else None
+
+                removal_gain = matrix[prev, first]
+                if nxt is not None:
+                    removal_gain += matrix[last, nxt] - matrix[prev, nxt]
+
+                rest = np.asarray(route[:i] + route[i + length:])
+                u, v = rest[:-1], rest[1:]
+                # Insert between u and v, forward or reversed, or append at the end
+                forward = np.append(matrix[u, first] + matrix[last, v] - matrix[u, v], matrix[rest[-1], first])
+                backward = np.append(matrix[u, last] + matrix[first, v] - matrix[u, v], matrix[rest[-1], last])
+                # Reinserting where the segment came from is not a move
+                forward[i - 1] = np.inf
+                backward[i - 1] = np.inf if length == 1 else backward[i - 1]
+
+                k_fwd, k_bwd = int(np.argmin(forward)), int(np.argmin(backward))
+                reverse = backward[k_bwd] < forward[k_fwd]
+                k, cost = (k_bwd, backward[k_bwd]) if reverse else (k_fwd, forward[k_fwd])
+                if cost < removal_gain - _EPSILON:
+                    rest = rest.tolist()
+                    moved = segment[::-1] if reverse else segment
+                    route = rest[:k + 1] + moved + rest[k + 1:]
+                    changed = improved = True
+                if time.perf_counter() >= deadline:
+                    return route, improved
+    return route, improved
+
+
+def optimize_order(
+    matrix: np.ndarray,
+    start: int = 0,
+    budget_ms: Optional[float] = None
+) -> List[int]:
+    """
+    Short open path through every stop, starting at `start`
+
+    Builds a nearest-neighbor tour, then alternates 2-opt and Or-opt until
+    neither improves it or the time budget runs out.
+
+    Args:
+        matrix: (n, n) distance matrix
+        start: Index of the fixed first stop
+        budget_ms: Improvement time budget (defaults to ROUTE_OPTIMIZE_BUDGET_MS)
+
+    Returns:
+        Stop indices in visiting order
+    """
+    n = len(matrix)
+    if n <= 2:
+        return [start] + [i for i in range(n) if i != start]
+
+    budget = ROUTE_OPTIMIZE_BUDGET_MS if budget_ms is None else budget_ms
+    deadline = time.perf_counter() + budget / 1000
+
+    order = nearest_neighbor(matrix, start)
+    while time.perf_counter() < deadline:
+        order, improved_2opt = two_opt(matrix, order, deadline)
+        order, improved_oropt = or_opt(matrix, order, deadline)
+        if not (improved_2opt or improved_oropt):
+            break
+    return order
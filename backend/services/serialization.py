@@ -0,0 +1,128 @@
+"""
+Fast response serialization for travel guides
+
+TravelGuide objects are built from already-validated models, so responses
+are dumped once with Pydantic's compiled serializer and encoded with orjson
+(or msgpack, when the client asks for it) instead of going through
+FastAPI's response_model re-validation and the stdlib JSON encoder.
+"""
+import json
+from typing import Any, Mapping, Optional
+from fastapi import Response
+from starlette.background import BackgroundTask
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def to_jsonable(data: Any) -> Any:
+    """
+    Convert a model (or a list/dict of models) to JSON-compatible data
+
+    Args:
+        data: Pydantic model, or plain data possibly containing models
+
+    Returns:
+        Dicts, lists and scalars only
+    """
+    if isinstance(data, BaseModel):
+        return data.model_dump(mode="json")
+    if isinstance(data, dict):
+        return {key: to_jsonable(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [to_jsonable(value) for value in data]
+    return data
+
+
+def _default(value: Any) -> Any:
+    """Encoder hook for models nested in plain data"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps_json(data: Any) -> bytes:
+    """Encode data (models allowed anywhere) as JSON, with orjson if installed"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def dumps_msgpack(data: Any) -> bytes:
+    """Encode data (models allowed anywhere) as msgpack"""
+    return msgpack.packb(data, use_bin_type=True, default=_default)
+
+
+def dumps_json_str(data: Any) -> str:
+    """dumps_json as text (e.g. for Server-Sent Events)"""
+    return dumps_json(data).decode("utf-8")
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """Whether an Accept header asks for msgpack (and msgpack is installed)"""
+    if msgpack is None or not accept:
+        return False
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+class GuideResponse(Response):
+    """
+    JSON response for data that is already validated
+
+    Content is encoded with orjson without re-validation; pass
+    `use_msgpack=True` to send application/msgpack instead.
+    """
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+        use_msgpack: bool = False
+    ):
+        self._msgpack = use_msgpack
+        if use_msgpack:
+            media_type = MSGPACK_MEDIA_TYPES[0]
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        if self._msgpack:
+            return dumps_msgpack(content)
+        return dumps_json(content)
+
+
+def guide_response(data: Any, accept: Optional[str] = None, etag: Optional[str] = None) -> GuideResponse:
+    """
+    Build the response for a guide, negotiating JSON or msgpack
+
+    Args:
+        data: TravelGuide or its JSON-compatible dict
+        accept: Request Accept header
+        etag: ETag of the guide; the msgpack representation gets its own tag
+
+    Returns:
+        GuideResponse
+    """
+    use_msgpack = wants_msgpack(accept)
+    headers = {"Vary": "Accept"}
+    if etag is not None:
+        headers["ETag"] = representation_etag(etag, use_msgpack)
+    return GuideResponse(data, use_msgpack=use_msgpack, headers=headers)
+
+
+def representation_etag(etag: str, use_msgpack: bool) -> str:
+    """ETag of the JSON or msgpack representation of a guide"""
+    return f'{etag[:-1]}-msgpack"' if use_msgpack else etag
@@ -0,0 +1,93 @@
+"""
+Startup warm-up of lazily initialized providers
+
+Provider SDKs (openai, google.generativeai, apify_client, geopy) are not
+imported until first use, so the app starts serving quickly. Warm-up loads
+them and builds the clients from the FastAPI lifespan, by default in a
+background thread while requests are already being served.
+"""
+import os
+import time
+import asyncio
+import importlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from services import apify_service, itinerary_service, llm_providers
+from services.gazetteer import get_gazetteer
+
+# "background": warm up after startup without delaying it; "blocking": finish
+# warm-up before accepting requests; "off": initialize on first use only
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background").lower()
+
+# Slow-importing SDKs behind the lazily created clients
+PROVIDER_SDKS = ["openai", "google.generativeai", "apify_client", "geopy.geocoders"]
+
+_WARMERS: List[Tuple[str, Callable[[], Any]]] = [
+    ("llm_providers", llm_providers.warm_up),
+    ("apify", apify_service.warm_up),
+    ("geocoder", itinerary_service.warm_up),
+    ("gazetteer", get_gazetteer),
+]
+
+_status: Dict[str, Any] = {"state": "pending", "seconds": {}}
+
+
+def preload_sdks() -> None:
+    """
+    Import the provider SDKs without building clients
+
+    For a pre-forking server (gunicorn preload): workers then fork with the
+    modules loaded, and no connections or event-loop state cross the fork.
+    """
+    for module in PROVIDER_SDKS:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"Could not preload {module}: {e}")
+
+
+def run_warmers() -> Dict[str, float]:
+    """
+    Initialize each provider, logging (not raising) failures
+
+    Returns:
+        Seconds spent per provider
+    """
+    timings = {}
+    for name, warm in _WARMERS:
+        start = time.perf_counter()
+        try:
+            warm()
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+        timings[name] = round(time.perf_counter() - start, 3)
+    return timings
+
+
+async def warm_up_services() -> None:
+    """Run the warmers in a thread so the event loop keeps serving"""
+    _status["state"] = "running"
+    loop = asyncio.get_running_loop()
+    _status["seconds"] = await loop.run_in_executor(None, run_warmers)
+    _status["state"] = "done"
+    print(f"Warm-up finished in {sum(_status['seconds'].values()):.2f}s: {_status['seconds']}")
+
+
+async def start_warm_up() -> Optional[asyncio.Task]:
+    """
+    Warm up according to WARMUP_MODE (called from the application lifespan)
+
+    Returns:
+        The background task in "background" mode, else None
+    """
+    if WARMUP_MODE == "off":
+        _status["state"] = "off"
+        return None
+    if WARMUP_MODE == "blocking":
+        await warm_up_services()
+        return None
+    return asyncio.create_task(warm_up_services())
+
+
+def get_warm_up_status() -> Dict[str, Any]:
+    """Warm-up state ('pending', 'running', 'done' or 'off') and seconds per provider"""
+    return dict(_status)
@@ -0,0 +1,324 @@
+"""
+Script to generate many travel guides offline from a JSONL file.
+
+Each input line is a GuideRequest (`destinations`, `days`, `preferences`)
+with an optional `id`; lines without one are identified by line number.
+Guides are built in-process with the same pipeline as
+/api/generate-guide and appended to the output JSONL as they complete:
+    {"id": ..., "request": {...}, "guide": {...TravelGuide...}}
+
+Work shared between guides is done once for the whole batch:
+- places: one Apify run per --places-batch destinations, before any guide
+- details, images and coordinates: computed once per destination within a
+  worker process (concurrent guides wait for the same lookup) and then
+  served from the caches by each guide's pipeline
+With --processes > 1, guides are split between processes by destination,
+so guides sharing one run in the same process; the processes share the
+SQLite cache, and identical LLM prompts run once across them.
+
+The output file is the checkpoint: guides already in it are skipped when
+the script runs again, and failed ones are logged to <output>.errors.jsonl
+and retried.
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import queue
+import asyncio
+import argparse
+import multiprocessing
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BACKEND_DIR = os.path.join(PROJECT_DIR, "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+
+# Before importing the services, which read their configuration on import
+load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+
+from pydantic import ValidationError  # noqa: E402
+from models.schemas import GuideRequest  # noqa: E402
+from services.apify_service import APIFY_ENABLED  # noqa: E402
+from services.ai_service import generate_location_details  # noqa: E402
+from services.cache_store import normalize_key  # noqa: E402
+from services.guide_service import build_travel_guide  # noqa: E402
+from services.image_service import get_location_images  # noqa: E402
+from services.itinerary_service import get_coordinates  # noqa: E402
+from services.recommendations_service import fetch_trip_places  # noqa: E402
+from services.serialization import dumps_json  # noqa: E402
+
+# (record id, GuideRequest fields)
+Record = Tuple[str, Dict[str, Any]]
+# (status, record id, output line or error message, seconds)
+Result = Tuple[str, str, bytes, float]
+
+
+def read_requests(path: str) -> Tuple[List[Record], List[str]]:
+    """
+    Parse and validate the input
+
+    Returns:
+        Valid records in file order, and one message per invalid line
+    """
+    records, errors, seen = [], [], set()
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                record_id = str(data.pop("id", number))
+                request = GuideRequest.model_validate(data)
+            except (json.JSONDecodeError, ValidationError, AttributeError) as e:
+                errors.append(f"line {number}: {' '.join(str(e).split())}")
+                continue
+            if record_id in seen:
+                errors.append(f"line {number}: duplicate id {record_id}")
+                continue
+            seen.add(record_id)
+            records.append((record_id, request.model_dump(exclude_none=True)))
+    return records, errors
+
+
+def load_completed(path: str) -> set:
+    """
+    Ids already in the output file
+
+    A run killed mid-write can leave a partial last line; it is cut off so
+    new results are appended on a line of their own.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    completed = set()
+    for line in data[:end].splitlines():
+        try:
+            completed.add(json.loads(line)["id"])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return completed
+
+
+def shard(request: Dict[str, Any], processes: int) -> int:
+    """Process for a request: guides sharing their first destination (alphabetically) share one"""
+    key = min(normalize_key(destination) for destination in request["destinations"])
+    return zlib.crc32(key.encode("utf-8")) % processes
+
+
+async def prefetch_places(destinations: List[str], batch_size: int) -> None:
+    """Scrape Google Maps places for all destinations, batch_size per Apify run"""
+    if not APIFY_ENABLED:
+        return
+    batches = [destinations[i:i + batch_size] for i in range(0, len(destinations), batch_size)]
+    print(f"Fetching places for {len(destinations)} destinations in {len(batches)} Apify runs")
+    # Apify runs are slow to start but light on the client; two at a time keeps the account's memory limit
+    semaphore = asyncio.Semaphore(2)
+
+    async def fetch(batch: List[str]) -> None:
+        async with semaphore:
+            try:
+                await fetch_trip_places(batch)
+            except Exception as e:
+                # The guides fetch what is missing themselves
+                print(f"Places prefetch failed for {', '.join(batch)}: {e}")
+
+    await asyncio.gather(*(fetch(batch) for batch in batches))
+
+
+async def generate_guides(
+    records: List[Record],
+    concurrency: int,
+    emit: Callable[[Result], Awaitable[None]]
+) -> None:
+    """
+    Build the guides with `concurrency` workers, emitting each result as it completes
+    """
+    shared: Dict[str, asyncio.Future] = {}
+
+    async def lookup(destination: str) -> None:
+        # The guide pipeline makes these calls with the same arguments, so
+        # once this is done its stages are cache hits
+        try:
+            await asyncio.gather(
+                generate_location_details(destination),
+                get_location_images(destination, count=4),
+                get_coordinates(destination)
+            )
+        except Exception as e:
+            # Best effort: each guide's pipeline retries what is not cached
+            print(f"Lookup of {destination} failed: {e}")
+
+    def prepare(destination: str) -> asyncio.Future:
+        key = normalize_key(destination)
+        future = shared.get(key)
+        if future is None:
+            future = shared[key] = asyncio.ensure_future(lookup(destination))
+        return future
+
+    pending: asyncio.Queue = asyncio.Queue()
+    for record in records:
+        pending.put_nowait(record)
+
+    async def worker() -> None:
+        while True:
+            try:
+                record_id, data = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                request = GuideRequest.model_validate(data)
+                await asyncio.gather(*(prepare(d) for d in request.destinations))
+                guide = await build_travel_guide(request)
+                line = dumps_json({"id": record_id, "request": data, "guide": guide})
+                result = ("done", record_id, line, time.perf_counter() - start)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}".encode("utf-8")
+                result = ("failed", record_id, error, time.perf_counter() - start)
+            await emit(result)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+def _process_main(records: List[Record], concurrency: int, results) -> None:
+    """Entry point of a worker process: results go to the parent, which writes them"""
+    async def emit(result: Result) -> None:
+        results.put(result)
+
+    try:
+        asyncio.run(generate_guides(records, concurrency, emit))
+    finally:
+        results.put(None)
+
+
+class Writer:
+    """Appends results to the output and error files, flushing each line"""
+
+    def __init__(self, output: str, total: int):
+        self.output = open(output, "ab")
+        self.errors = open(f"{output}.errors.jsonl", "a", encoding="utf-8")
+        self.total = total
+        self.counts = {"done": 0, "failed": 0}
+
+    def write(self, result: Result) -> None:
+        status, record_id, payload, seconds = result
+        if status == "done":
+            self.output.write(payload + b"\n")
+            # Flushed per guide so a crash loses at most the guides in progress
+            self.output.flush()
+        else:
+            self.errors.write(json.dumps({
+                "id": record_id,
+                "error": payload.decode("utf-8"),
+                "at": time.strftime("%Y-%m-%dT%H:%M:%S")
+            }) + "\n")
+            self.errors.flush()
+        self.counts[status] += 1
+        finished = self.counts["done"] + self.counts["failed"]
+        print(f"[{finished}/{self.total}] {status:<6} {record_id} ({seconds:.1f}s)"
+              f"{': ' + payload.decode('utf-8') if status == 'failed' else ''}")
+
+    def close(self) -> None:
+        self.output.close()
+        self.errors.close()
+
+
+def run_in_processes(records: List[Record], args, writer: Writer) -> None:
+    shards: List[List[Record]] = [[] for _ in range(args.processes)]
+    for record in records:
+        shards[shard(record[1], args.processes)].append(record)
+
+    # Spawn: workers must not inherit the parent's event loop, clients or connections
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = [
+        context.Process(target=_process_main, args=(records, args.concurrency, results), daemon=True)
+        for records in shards if records
+    ]
+    for worker in workers:
+        worker.start()
+
+    running = len(workers)
+    while running:
+        try:
+            result = results.get(timeout=1)
+        except queue.Empty:
+            # A worker killed without its end marker (its remaining guides run next time)
+            if not any(worker.is_alive() for worker in workers):
+                break
+            continue
+        if result is None:
+            running -= 1
+        else:
+            writer.write(result)
+    for worker in workers:
+        worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate travel guides from a JSONL file of GuideRequests")
+    parser.add_argument("input", help="JSONL file, one GuideRequest per line (optional 'id')")
+    parser.add_argument("output", help="JSONL file the guides are appended to (also the checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Guides generated at once per process")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes")
+    parser.add_argument("--places-batch", type=int, default=10, help="Destinations per Apify run")
+    parser.add_argument("--limit", type=int, help="Generate at most this many guides in this run")
+    args = parser.parse_args()
+
+    records, invalid = read_requests(args.input)
+    for message in invalid:
+        print(f"Skipping invalid request, {message}")
+
+    completed = load_completed(args.output)
+    pending = [record for record in records if record[0] not in completed]
+    if args.limit is not None:
+        pending = pending[:args.limit]
+    print(f"{len(records)} requests: {len(records) - len(pending)} already generated or beyond --limit, "
+          f"{len(pending)} to generate")
+    if not pending:
+        return 1 if invalid else 0
+
+    destinations: Dict[str, str] = {}
+    for _, request in pending:
+        for destination in request["destinations"]:
+            destinations.setdefault(normalize_key(destination), destination)
+
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    writer = Writer(args.output, len(pending))
+    try:
+        if args.processes > 1:
+            asyncio.run(prefetch_places(list(destinations.values()), args.places_batch))
+            run_in_processes(pending, args, writer)
+        else:
+            async def emit(result: Result) -> None:
+                writer.write(result)
+
+            async def run() -> None:
+                await prefetch_places(list(destinations.values()), args.places_batch)
+                await generate_guides(pending, args.concurrency, emit)
+
+            asyncio.run(run())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    done, failed = writer.counts["done"], writer.counts["failed"]
+    print(f"\n{done} guides generated, {failed} failed in {elapsed:.1f}s "
+          f"({done / elapsed * 60:.1f} guides/minute, {len(destinations)} distinct destinations)")
+    if failed or done + failed < len(pending):
+        print("Run the same command again to retry the remaining requests")
+        return 1
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
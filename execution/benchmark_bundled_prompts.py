@@ -0,0 +1,115 @@
+"""
+Script to compare bundled vs per-category LLM prompts for destination content.
+
+For each destination it generates details plus sleep/eat/curiosity
+recommendations the way a guide does (concurrently), once with the
+per-category prompts and once with AI_BUNDLED_MODE, and reports latency,
+number of LLM calls and token usage. Uses the real providers configured in
+backend/.env, so it costs tokens. The LLM response cache is disabled.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+
+from services import ai_service, llm_cache  # noqa: E402
+from services.llm_providers import get_token_usage, reset_token_usage  # noqa: E402
+
+DEFAULT_DESTINATIONS = ["Rome, Italy", "Paris, France", "Kyoto, Japan"]
+DEFAULT_OUTPUT = os.path.join(".tmp", "benchmarks", "bundled_prompts.json")
+
+
+async def run_destination(destination):
+    """Generate details and all recommendation categories like the guide pipeline"""
+    await asyncio.gather(
+        ai_service.generate_location_details(destination),
+        *(ai_service.generate_recommendations(destination, category)
+          for category in ai_service.CATEGORY_PROMPTS)
+    )
+
+
+def total_usage():
+    usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    for provider_usage in get_token_usage().values():
+        for key in usage:
+            usage[key] += provider_usage[key]
+    return usage
+
+
+async def benchmark(destinations, repeat):
+    results = []
+    for mode in ["per_category", "bundled"]:
+        ai_service.AI_BUNDLED_MODE = mode == "bundled"
+        for destination in destinations:
+            for _ in range(repeat):
+                ai_service._bundle_cache.clear()
+                reset_token_usage()
+                start = time.perf_counter()
+                await run_destination(destination)
+                elapsed = time.perf_counter() - start
+                results.append({
+                    "mode": mode,
+                    "destination": destination,
+                    "seconds": round(elapsed, 3),
+                    **total_usage()
+                })
+                print(f"{mode:>12}  {destination:<25} {elapsed:6.2f}s  {results[-1]['calls']} calls  "
+                      f"{results[-1]['prompt_tokens']}+{results[-1]['completion_tokens']} tokens")
+    return results
+
+
+def summarize(results):
+    summary = {}
+    for mode in ["per_category", "bundled"]:
+        rows = [r for r in results if r["mode"] == mode]
+        if not rows:
+            continue
+        summary[mode] = {
+            "avg_seconds": round(sum(r["seconds"] for r in rows) / len(rows), 3),
+            "avg_calls": round(sum(r["calls"] for r in rows) / len(rows), 2),
+            "avg_prompt_tokens": round(sum(r["prompt_tokens"] for r in rows) / len(rows), 1),
+            "avg_completion_tokens": round(sum(r["completion_tokens"] for r in rows) / len(rows), 1),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bundled vs per-category prompts")
+    parser.add_argument("destinations", nargs="*", default=DEFAULT_DESTINATIONS)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per destination and mode")
+    parser.add_argument("--out", default=DEFAULT_OUTPUT, help=f"JSON report path (default: {DEFAULT_OUTPUT})")
+    args = parser.parse_args()
+
+    if not (ai_service.openrouter_available() or ai_service.gemini_available()):
+        print("Error: no LLM provider configured (OPENROUTER_API_KEY or GOOGLE_API_KEY).")
+        return 1
+
+    # Measure real provider calls, not cache hits
+    llm_cache.LLM_CACHE_ENABLED = False
+
+    results = asyncio.run(benchmark(args.destinations, args.repeat))
+    summary = summarize(results)
+
+    print("\nSummary (per destination):")
+    for mode, stats in summary.items():
+        print(f"  {mode:>12}: {stats['avg_seconds']:.2f}s, {stats['avg_calls']} calls, "
+              f"{stats['avg_prompt_tokens']:.0f} prompt + {stats['avg_completion_tokens']:.0f} completion tokens")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump({"results": results, "summary": summary}, f, indent=2)
+    print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
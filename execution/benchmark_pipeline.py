@@ -0,0 +1,536 @@
+"""
+Script to benchmark the guide pipeline end to end without external services.
+
+OpenRouter/Gemini, Unsplash, Nominatim and Apify are replaced by
+deterministic fakes with configurable latency, patched in at the provider
+layer so the caches, throttles and pipeline scheduling above them run as
+in production:
+- LLM: call_/stream_openrouter and call_/stream_gemini (content shaped
+  after the prompt, latency = time to first token + tokens / rate)
+- Unsplash: the shared HTTP client gets a mock transport
+- Nominatim: the geopy geocoder (the request throttle still applies)
+- Apify: run_places_search (only with --apify)
+
+Scenarios:
+- stages: end-to-end and per-stage latency of a reference guide
+- throughput: guides/second and latency percentiles at several concurrency levels
+- scaling: latency by number of destinations and by number of days
+
+All latencies are multiplied by --time-scale so a run takes seconds, not
+minutes. Reports go to .tmp/benchmarks/pipeline/ and are compared with the
+previous report that used the same configuration.
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime
+from types import SimpleNamespace
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BACKEND_DIR = os.path.join(PROJECT_DIR, "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+# Hermetic: fresh cache database, no offline gazetteer
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="benchmark_pipeline_")
+os.environ.pop("GAZETTEER_PATH", None)
+
+import httpx  # noqa: E402
+from models.schemas import GuideRequest  # noqa: E402
+from services import (  # noqa: E402
+    guide_service,
+    itinerary_service,
+    image_service,
+    apify_service,
+    llm_cache,
+    llm_providers,
+    http_client,
+    gazetteer
+)
+from services.pipeline import Stage, run_pipeline  # noqa: E402
+
+REPORT_DIR = os.path.join(".tmp", "benchmarks", "pipeline")
+DEFAULT_CITIES = ["Benchburg", "Testova", "Mockville", "Stubhaven", "Fakeport",
+                  "Dummyton", "Samplesk", "Probeton", "Trialmont", "Pilotberg"]
+
+
+# --- Fakes -------------------------------------------------------------------
+
+class Fakes:
+    """Fake upstream services sharing one latency configuration and counters"""
+
+    def __init__(self, args):
+        self.scale = args.time_scale
+        self.llm_ttft = args.llm_ttft
+        self.llm_tokens_per_sec = args.llm_tokens_per_sec
+        self.unsplash_latency = args.unsplash_latency
+        self.geocode_latency = args.geocode_latency
+        self.apify_latency = args.apify_latency
+        self.jitter = args.jitter
+        self.calls = {}
+
+    def count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def delay(self, seconds, seed):
+        """Scaled latency with deterministic jitter"""
+        if self.jitter:
+            rng = random.Random(zlib.crc32(seed.encode("utf-8")))
+            seconds *= 1 + self.jitter * (2 * rng.random() - 1)
+        return max(seconds, 0) * self.scale
+
+    # LLM
+
+    def llm_text(self, prompt):
+        """Plausible JSON for each prompt the services send"""
+        subject = re.search(r" (?:about|in) (.+?)(?: in JSON format| as a single JSON object)?\.\n", prompt)
+        place = subject.group(1) if subject else "the destination"
+
+        def recs(category):
+            return [{
+                "name": f"{category.title()} spot {i} in {place}",
+                "description": f"A well loved {category} place in {place}, popular with locals and visitors.",
+                "category": category,
+                "price_level": "$" * (1 + i % 3),
+                "why_recommended": "Consistently great reviews and a central location."
+            } for i in range(5)]
+
+        def details():
+            return {
+                "name": place,
+                "description": f"{place} is a charming destination with history, food and views. " * 2,
+                "highlights": [f"Highlight {i} of {place}" for i in range(5)],
+                "best_time_to_visit": "Spring and autumn",
+                "local_tip": "Start early to avoid the crowds."
+            }
+
+        itinerary = re.search(r"Create a (\d+)-day travel itinerary for (.+?)(?: with preferences: .*?)?\.\n", prompt)
+        if itinerary:
+            days, stops = int(itinerary.group(1)), itinerary.group(2).split(", ")
+            return json.dumps([{
+                "day_number": day + 1,
+                "title": f"Day {day + 1} in {stops[day * len(stops) // days]}",
+                "location": stops[day * len(stops) // days],
+                "activities": [{
+                    "time": slot,
+                    "activity": f"{slot} walk",
+                    "description": "Explore the neighbourhood and its main sights.",
+                    "duration": "2 hours"
+                } for slot in ["Morning", "Afternoon", "Evening"]]
+            } for day in range(days)])
+        if "as a single JSON object" in prompt:
+            return json.dumps({**details(), "recommendations": {c: recs(c) for c in ["sleep", "eat", "curiosity"]}})
+        if prompt.startswith("Recommend"):
+            category = re.search(r'category: "(\w+)"', prompt)
+            return json.dumps(recs(category.group(1) if category else "curiosity"))
+        if "facts or curiosities" in prompt:
+            return json.dumps([f"Fact {i} about {place}." for i in range(5)])
+        return json.dumps(details())
+
+    def make_llm(self, provider):
+        async def call(prompt, timeout=None):
+            self.count(provider)
+            text = self.llm_text(prompt)
+            tokens = len(text) / 4
+            await asyncio.sleep(self.delay(self.llm_ttft + tokens / self.llm_tokens_per_sec, prompt))
+            llm_providers._record_usage(provider, len(prompt) // 4, int(tokens))
+            return text
+
+        async def stream(prompt, timeout=None):
+            self.count(provider)
+            text = self.llm_text(prompt)
+            await asyncio.sleep(self.delay(self.llm_ttft, prompt))
+            for start in range(0, len(text), 64):
+                chunk = text[start:start + 64]
+                await asyncio.sleep(self.delay(len(chunk) / 4 / self.llm_tokens_per_sec, prompt))
+                yield chunk
+            llm_providers._record_usage(provider, len(prompt) // 4, len(text) // 4)
+
+        return call, stream
+
+    # Unsplash
+
+    def make_http_client(self):
+        clients = {}
+
+        async def handler(request):
+            self.count("unsplash")
+            query = request.url.params.get("query", "")
+            await asyncio.sleep(self.delay(self.unsplash_latency, query))
+            count = int(request.url.params.get("per_page", "1"))
+            return httpx.Response(200, json={"results": [{
+                "urls": {"regular": f"https://images.example/{zlib.crc32(query.encode())}/{i}.jpg"},
+                "alt_description": f"Photo of {query}",
+                "user": {"name": "Bench Photographer"}
+            } for i in range(count)]})
+
+        def get_client(name="default", timeout=None):
+            if name not in clients:
+                clients[name] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            return clients[name]
+
+        return get_client
+
+    # Nominatim
+
+    def make_geocoder(self):
+        fakes = self
+
+        class FakeGeocoder:
+            def geocode(self, location, *args, **kwargs):
+                fakes.count("nominatim")
+                time.sleep(fakes.delay(fakes.geocode_latency, location))
+                h = zlib.crc32(location.encode("utf-8"))
+                return SimpleNamespace(latitude=35 + (h % 2000) / 100, longitude=-5 + (h // 2000 % 3000) / 100)
+
+        return FakeGeocoder()
+
+    # Apify
+
+    def make_places_search(self):
+        async def run_places_search(queries, max_results=10):
+            self.count("apify")
+            await asyncio.sleep(self.delay(self.apify_latency, "|".join(queries)))
+            return {query: [{
+                "title": f"{query.title()} #{i}",
+                "searchString": query,
+                "totalScore": 4.3 + (i % 5) / 10,
+                "reviewsCount": 100 * (i + 1),
+                "address": "1 Benchmark Street",
+                "categoryName": "Place",
+                "imageUrl": f"https://images.example/places/{zlib.crc32(query.encode())}/{i}.jpg",
+                "location": {"lat": 45.0, "lng": 9.0}
+            } for i in range(max_results)] for query in queries}
+
+        return run_places_search
+
+
+def patch_everywhere(original, replacement):
+    """Replace a function in every backend module that imported it"""
+    for name, module in list(sys.modules.items()):
+        if name == "services" or name.startswith("services.") or name.startswith("routes."):
+            for attr, value in list(vars(module).items()):
+                if value is original:
+                    setattr(module, attr, replacement)
+
+
+def install_fakes(fakes, args):
+    for provider, call, stream, available in [
+        ("openrouter", llm_providers.call_openrouter, llm_providers.stream_openrouter, llm_providers.openrouter_available),
+        ("gemini", llm_providers.call_gemini, llm_providers.stream_gemini, llm_providers.gemini_available),
+    ]:
+        fake_call, fake_stream = fakes.make_llm(provider)
+        patch_everywhere(call, fake_call)
+        patch_everywhere(stream, fake_stream)
+        patch_everywhere(available, lambda provider=provider: provider in args.providers)
+
+    patch_everywhere(http_client.get_http_client, fakes.make_http_client())
+    image_service.UNSPLASH_ACCESS_KEY = "benchmark"
+
+    itinerary_service.geolocator = fakes.make_geocoder()
+    itinerary_service.NOMINATIM_MIN_INTERVAL = args.nominatim_interval * args.time_scale
+    patch_everywhere(gazetteer.get_gazetteer, lambda: None)
+
+    patch_everywhere(apify_service.run_places_search, fakes.make_places_search())
+    for name, module in list(sys.modules.items()):
+        if name.startswith("services.") and hasattr(module, "APIFY_ENABLED"):
+            module.APIFY_ENABLED = args.apify
+
+    # Every guide should reach the (fake) providers unless --warm is given
+    llm_cache.LLM_CACHE_ENABLED = args.warm
+
+
+# --- Measurement -------------------------------------------------------------
+
+class Runner:
+    def __init__(self, args, fakes):
+        self.args = args
+        self.fakes = fakes
+        self.counter = 0
+
+    def request(self, destinations, days):
+        """Guide request; cold runs use names no cache has seen"""
+        self.counter += 1
+        suffix = "" if self.args.warm else f" R{self.counter}"
+        names = [f"{DEFAULT_CITIES[i % len(DEFAULT_CITIES)]} {i}{suffix}" for i in range(destinations)]
+        return GuideRequest(destinations=names, days=days)
+
+    async def run_guide(self, request):
+        """Run one guide; returns (seconds, [(stage, start, end)])"""
+        timings = []
+        stages = []
+        for stage in guide_service.build_guide_stages(request):
+            async def timed(*deps, _func=stage.func, _name=stage.name):
+                start = time.perf_counter()
+                try:
+                    return await _func(*deps)
+                finally:
+                    timings.append((_name, start, time.perf_counter()))
+            stages.append(Stage(stage.name, timed, stage.deps))
+
+        start = time.perf_counter()
+        with itinerary_service.geocode_scope():
+            await run_pipeline(stages, self.args.max_concurrency)
+        elapsed = time.perf_counter() - start
+        return elapsed, [(name, s - start, e - start) for name, s, e in timings]
+
+
+def stage_group(name):
+    prefix, _, suffix = name.partition(":")
+    return prefix if suffix.isdigit() else name
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+async def scenario_stages(runner, args):
+    totals, durations, finished = [], {}, {}
+    for _ in range(args.repeat):
+        elapsed, timings = await runner.run_guide(runner.request(args.destinations, args.days))
+        totals.append(elapsed)
+        for name, start, end in timings:
+            durations.setdefault(stage_group(name), []).append(end - start)
+            finished.setdefault(stage_group(name), []).append(end)
+    return {
+        "destinations": args.destinations,
+        "days": args.days,
+        "end_to_end_ms": ms(statistics.median(totals)),
+        "stages": {
+            group: {
+                "median_ms": ms(statistics.median(durations[group])),
+                "max_ms": ms(max(durations[group])),
+                "finished_at_ms": ms(statistics.median(finished[group]))
+            }
+            for group in sorted(durations, key=lambda g: statistics.median(finished[g]))
+        }
+    }
+
+
+async def scenario_throughput(runner, args):
+    results = {}
+    for level in args.concurrency:
+        requests = [runner.request(args.destinations, args.days) for _ in range(max(args.requests, level))]
+        semaphore = asyncio.Semaphore(level)
+
+        async def run(request):
+            async with semaphore:
+                return (await runner.run_guide(request))[0]
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(run(r) for r in requests))
+        wall = time.perf_counter() - start
+        results[str(level)] = {
+            "guides": len(requests),
+            "guides_per_sec": round(len(requests) / wall, 3),
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95))
+        }
+    return results
+
+
+async def scenario_scaling(runner, args):
+    async def median_latency(destinations, days):
+        samples = [(await runner.run_guide(runner.request(destinations, days)))[0] for _ in range(args.repeat)]
+        return ms(statistics.median(samples))
+
+    return {
+        "by_destinations": {str(n): await median_latency(n, args.days) for n in args.scale_destinations},
+        "by_days": {str(d): await median_latency(args.destinations, d) for d in args.scale_days}
+    }
+
+
+async def check_repeated_stops(runner):
+    """
+    Guides visiting a destination more than once keep every visit (route,
+    details, itinerary), a repeated final stop stays last, and the route
+    does not put two visits to the same stop next to each other
+    """
+    a, b, c, d = runner.request(4, 6).destinations
+    for stops in ([a, b, a, c], [a, b, a], [a, b, c, a, d, a]):
+        request = GuideRequest(destinations=stops, days=len(stops) * 2)
+        with itinerary_service.geocode_scope():
+            results = await run_pipeline(guide_service.build_guide_stages(request), runner.args.max_concurrency)
+        route, guide = results["route"], results["guide"]
+        if sorted(route) != sorted(stops) or len(guide.destinations) != len(stops):
+            raise RuntimeError(f"Repeated stop lost: {stops} -> route {route}, "
+                               f"{len(guide.destinations)} locations")
+        if stops[-1] in stops[:-1] and route[-1] != stops[-1]:
+            raise RuntimeError(f"Repeated final stop moved: {stops} -> route {route}")
+        if any(before == after for before, after in zip(route, route[1:])):
+            raise RuntimeError(f"Adjacent duplicate stops: {stops} -> route {route}")
+
+
+SCENARIOS = {
+    "stages": scenario_stages,
+    "throughput": scenario_throughput,
+    "scaling": scenario_scaling
+}
+
+
+# --- Reports -----------------------------------------------------------------
+
+def git_revision():
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=PROJECT_DIR, capture_output=True, text=True).stdout.strip()
+
+    try:
+        commit = git("rev-parse", "--short", "HEAD")
+        dirty = bool(git("status", "--porcelain", "backend"))
+        return {"commit": commit or None, "dirty": dirty}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+def find_baseline(config, current_path):
+    """Most recent earlier report with the same configuration"""
+    if not os.path.isdir(REPORT_DIR):
+        return None
+    for filename in sorted(os.listdir(REPORT_DIR), reverse=True):
+        path = os.path.join(REPORT_DIR, filename)
+        if path == current_path or not filename.endswith(".json"):
+            continue
+        with open(path) as f:
+            report = json.load(f)
+        if report.get("config") == config:
+            return path
+    return None
+
+
+def flatten(results, prefix=""):
+    """Dotted metric name -> number, for comparing reports"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline):
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    print(f"\nCompared with {baseline['git'].get('commit')} ({baseline['timestamp']}):")
+    for name in sorted(new):
+        if name not in old or not old[name] or not name.endswith(("_ms", "_per_sec")) and "by_" not in name:
+            continue
+        # Sub-millisecond stages are noise
+        if not name.endswith("_per_sec") and max(old[name], new[name]) < 1.0:
+            continue
+        change = (new[name] - old[name]) / old[name] * 100
+        if abs(change) >= 5:
+            better = change < 0 if not name.endswith("_per_sec") else change > 0
+            print(f"  {name:<55} {old[name]:>10} -> {new[name]:>10}  {change:+6.1f}%  {'better' if better else 'WORSE'}")
+
+
+def print_results(results):
+    if "stages" in results:
+        stages = results["stages"]
+        print(f"\nStages ({stages['destinations']} destinations, {stages['days']} days): "
+              f"end to end {stages['end_to_end_ms']} ms")
+        for group, stats in stages["stages"].items():
+            print(f"  {group:<28} median {stats['median_ms']:>9} ms  max {stats['max_ms']:>9} ms  "
+                  f"done at {stats['finished_at_ms']:>9} ms")
+    if "throughput" in results:
+        print("\nThroughput:")
+        for level, stats in results["throughput"].items():
+            print(f"  concurrency {level:>3}: {stats['guides_per_sec']:>7} guides/s  "
+                  f"p50 {stats['p50_ms']:>9} ms  p95 {stats['p95_ms']:>9} ms")
+    if "scaling" in results:
+        print("\nScaling (median end to end):")
+        for axis, series in results["scaling"].items():
+            print(f"  {axis}: " + ", ".join(f"{k} -> {v} ms" for k, v in series.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hermetic guide pipeline benchmark")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--destinations", type=int, default=3, help="Destinations in the reference guide")
+    parser.add_argument("--days", type=int, default=7, help="Days in the reference guide")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=16, help="Guides per throughput level")
+    parser.add_argument("--scale-destinations", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--scale-days", type=int, nargs="+", default=[3, 7, 14, 30])
+    parser.add_argument("--max-concurrency", type=int, default=None, help="Pipeline stage concurrency")
+    parser.add_argument("--providers", nargs="+", default=["openrouter", "gemini"],
+                        choices=["openrouter", "gemini"], help="LLM providers reported as configured")
+    parser.add_argument("--apify", action="store_true", help="Use (fake) Apify for recommendations")
+    parser.add_argument("--warm", action="store_true", help="Reuse destination names so caches are hit")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="Multiplier for every fake latency")
+    parser.add_argument("--llm-ttft", type=float, default=1.5, help="Seconds to first token")
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=60.0)
+    parser.add_argument("--unsplash-latency", type=float, default=0.3)
+    parser.add_argument("--geocode-latency", type=float, default=0.4)
+    parser.add_argument("--nominatim-interval", type=float, default=itinerary_service.NOMINATIM_MIN_INTERVAL)
+    parser.add_argument("--apify-latency", type=float, default=40.0)
+    parser.add_argument("--jitter", type=float, default=0.0, help="Relative latency jitter (deterministic)")
+    parser.add_argument("--baseline", help="Report to compare with (default: previous report with the same config)")
+    parser.add_argument("--verbose", action="store_true", help="Show service log output")
+    args = parser.parse_args()
+
+    config = {k: v for k, v in vars(args).items() if k not in ("baseline", "verbose")}
+    fakes = Fakes(args)
+    install_fakes(fakes, args)
+    runner = Runner(args, fakes)
+
+    async def run_all():
+        await check_repeated_stops(runner)
+        results = {}
+        for name in args.scenarios:
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = await SCENARIOS[name](runner, args)
+        return results
+
+    log = io.StringIO()
+    if args.verbose:
+        results = asyncio.run(run_all())
+    else:
+        with redirect_stdout(log):
+            results = asyncio.run(run_all())
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    git = git_revision()
+    report = {
+        "timestamp": timestamp,
+        "git": git,
+        "config": config,
+        "upstream_calls": fakes.calls,
+        "token_usage": llm_providers.get_token_usage(),
+        "results": results
+    }
+
+    print_results(results)
+    print(f"\nUpstream calls: {fakes.calls}")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = os.path.join(REPORT_DIR, f"{timestamp}_{git['commit'] or 'nogit'}{'-dirty' if git['dirty'] else ''}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {path}")
+
+    baseline_path = args.baseline or find_baseline(config, path)
+    if baseline_path:
+        with open(baseline_path) as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Script to measure TravelGuide response serialization cost.
+
+Builds a large synthetic guide (default: 30 days, 10 destinations) and
+times each way the API can turn it into a response body:
+- response_model: what FastAPI does for a returned model with
+  response_model=TravelGuide (re-validate, jsonable_encoder, stdlib json)
+- dump_orjson: one model_dump plus orjson (the /api/generate-guide path)
+- dump_msgpack: one model_dump plus msgpack (Accept: application/msgpack)
+- cache_hit: decompress a cached guide plus orjson
+No network or API keys needed.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from models.schemas import (  # noqa: E402
+    TravelGuide, LocationDetail, DayItinerary, DayActivity, Recommendation, ImageInfo
+)
+from services import serialization  # noqa: E402
+from services.guide_cache import encode_guide, decode_guide  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(".tmp", "benchmarks", "serialization.json")
+
+
+def image(seed):
+    return ImageInfo(
+        url=f"https://images.unsplash.com/photo-{seed}?ixlib=rb-4.0.3&w=1080",
+        alt_text=f"Scenic view number {seed}",
+        photographer="Jane Doe"
+    )
+
+
+def build_guide(days, destinations):
+    """Synthetic guide shaped like a real one"""
+    names = [f"Destination {i}, Country" for i in range(destinations)]
+    locations = [
+        LocationDetail(
+            name=name,
+            description="A historic city with a lively old town and great food. " * 4,
+            highlights=[f"Highlight {j} of {name}" for j in range(5)],
+            main_image=image(i * 10),
+            additional_images=[image(i * 10 + j) for j in range(1, 4)],
+            coordinates={"lat": 40.0 + i, "lng": 10.0 + i}
+        )
+        for i, name in enumerate(names)
+    ]
+    itinerary = [
+        DayItinerary(
+            day_number=day + 1,
+            title=f"Exploring {names[day % destinations]}",
+            location=names[day % destinations],
+            activities=[
+                DayActivity(
+                    time=slot,
+                    activity=f"{slot} activity",
+                    description="Walk through the neighbourhood and visit the main sights. " * 2,
+                    location=names[day % destinations],
+                    duration="2-3 hours"
+                )
+                for slot in ["Morning", "Afternoon", "Evening", "Night"]
+            ]
+        )
+        for day in range(days)
+    ]
+    recommendations = {
+        key: [
+            Recommendation(
+                name=f"{key.title()} place {j} in {name}",
+                description="Well reviewed and centrally located. " * 3,
+                category=category,
+                price_level="$$",
+                why_recommended="Rated 4.6/5 from 1,234 reviews on Google Maps.",
+                image=image(j)
+            )
+            for name in names
+            for j in range(5)
+        ]
+        for category, key in [("sleep", "sleep"), ("eat", "eat"), ("curiosity", "curiosities")]
+    }
+    route_info = {
+        "total_distance_km": 1234.5,
+        "segments": [
+            {"from": a, "to": b, "distance_km": 123.4, "estimated_hours": 2.1}
+            for a, b in zip(names, names[1:])
+        ]
+    }
+    return TravelGuide(
+        destinations=locations,
+        itinerary=itinerary,
+        recommendations=recommendations,
+        route_info=route_info,
+        total_days=days
+    )
+
+
+def response_model_path(guide):
+    validated = TravelGuide.model_validate(guide.model_dump())
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def time_it(func, iterations):
+    """Microseconds per call (all samples)"""
+    func()  # warm up
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TravelGuide serialization")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--destinations", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--out", default=DEFAULT_OUTPUT, help=f"JSON report path (default: {DEFAULT_OUTPUT})")
+    args = parser.parse_args()
+
+    guide = build_guide(args.days, args.destinations)
+    blob = encode_guide(guide.model_dump(mode="json"))
+
+    paths = {
+        "response_model": lambda: response_model_path(guide),
+        "dump_orjson": lambda: serialization.dumps_json(guide.model_dump(mode="json")),
+        "cache_hit": lambda: serialization.dumps_json(decode_guide(blob)),
+    }
+    if serialization.msgpack is not None:
+        paths["dump_msgpack"] = lambda: serialization.dumps_msgpack(guide.model_dump(mode="json"))
+
+    print(f"Guide: {args.days} days, {args.destinations} destinations, "
+          f"orjson={'yes' if serialization.orjson else 'no'}, "
+          f"msgpack={'yes' if serialization.msgpack else 'no'}")
+    results = {}
+    for name, func in paths.items():
+        samples = time_it(func, args.iterations)
+        results[name] = {
+            "median_us": round(statistics.median(samples), 1),
+            "min_us": round(min(samples), 1),
+            "bytes": len(func())
+        }
+        print(f"  {name:>15}: median {results[name]['median_us']:>9.1f} us, "
+              f"min {results[name]['min_us']:>9.1f} us, {results[name]['bytes']:>7} bytes")
+    results["cache_blob_bytes"] = len(blob)
+    print(f"  cached (compressed) size: {len(blob)} bytes")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump({"days": args.days, "destinations": args.destinations, "results": results}, f, indent=2)
+    print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Script to measure backend cold-start cost.
+
+Each run starts a fresh Python process that imports the app (`main`) with
+-X importtime and then runs the provider warm-up, so it reports:
+- import_ms: wall time of `import main` (time until the app can serve)
+- modules: cumulative import time of the slowest modules, including the
+  SDKs loaded by warm-up (median of runs)
+- warm_up_ms: time to load each provider SDK and build its client
+Dummy API keys are set so every provider is warmed; nothing is called over
+the network. Reports go to .tmp/benchmarks/startup/ and are compared with
+the previous report.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BACKEND_DIR = os.path.join(PROJECT_DIR, "backend")
+REPORT_DIR = os.path.join(".tmp", "benchmarks", "startup")
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - start
+from services.warmup import run_warmers
+print(json.dumps({"import_seconds": import_seconds, "warm_up": run_warmers()}))
+"""
+
+DUMMY_ENV = {
+    "OPENROUTER_API_KEY": "benchmark",
+    "GOOGLE_API_KEY": "benchmark",
+    "APIFY_API_TOKEN": "benchmark",
+    "WARMUP_MODE": "off",
+}
+
+
+def run_once(cache_dir):
+    """One cold start: (import seconds, {module: cumulative us}, {provider: warm-up seconds})"""
+    env = {**os.environ, **DUMMY_ENV, "CACHE_DIR": cache_dir}
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{proc.stderr[-2000:]}")
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result["import_seconds"], modules, result["warm_up"]
+
+
+def git_revision():
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=PROJECT_DIR, capture_output=True, text=True).stdout.strip()
+
+    try:
+        commit = git("rev-parse", "--short", "HEAD")
+        dirty = bool(git("status", "--porcelain", "backend"))
+        return {"commit": commit or None, "dirty": dirty}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+def previous_report(current_path):
+    if not os.path.isdir(REPORT_DIR):
+        return None
+    for filename in sorted(os.listdir(REPORT_DIR), reverse=True):
+        path = os.path.join(REPORT_DIR, filename)
+        if path != current_path and filename.endswith(".json"):
+            return path
+    return None
+
+
+def compare(current, baseline):
+    print(f"\nCompared with {baseline['git'].get('commit')} ({baseline['timestamp']}):")
+    rows = [("import_ms", baseline["import_ms"], current["import_ms"])]
+    rows += [(f"warm_up_ms.{name}", baseline["warm_up_ms"].get(name), value)
+             for name, value in current["warm_up_ms"].items()]
+    rows += [(f"modules.{name}", baseline["modules"].get(name), value)
+             for name, value in current["modules"].items()]
+    for name, old, new in rows:
+        # Changes under 10% or 5 ms are noise between runs
+        if not old or abs(new - old) < 5:
+            continue
+        change = (new - old) / old * 100
+        if abs(change) >= 10:
+            print(f"  {name:<45} {old:>9} -> {new:>9} ms  {change:+6.1f}%  {'better' if change < 0 else 'WORSE'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend cold start")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to measure")
+    parser.add_argument("--top", type=int, default=20, help="Slowest modules to report")
+    parser.add_argument("--budget-ms", type=float, help="Exit with status 1 if import_ms exceeds this")
+    parser.add_argument("--baseline", help="Report to compare with (default: previous report)")
+    args = parser.parse_args()
+
+    cache_dir = os.path.join(PROJECT_DIR, ".tmp", "benchmarks", "startup_cache")
+    # First run only compiles bytecode, so it is not measured
+    run_once(cache_dir)
+    runs = [run_once(cache_dir) for _ in range(args.runs)]
+
+    import_ms = round(statistics.median(r[0] for r in runs) * 1000, 1)
+    names = set().union(*(r[1] for r in runs))
+    module_ms = {
+        name: round(statistics.median(r[1].get(name, 0) for r in runs) / 1000, 1)
+        for name in names
+    }
+    top = dict(sorted(module_ms.items(), key=lambda item: -item[1])[:args.top])
+    warm_up_ms = {
+        name: round(statistics.median(r[2][name] for r in runs) * 1000, 1)
+        for name in runs[0][2]
+    }
+
+    print(f"import main: median {import_ms} ms over {args.runs} runs")
+    print("\nSlowest imports (cumulative):")
+    for name, value in top.items():
+        print(f"  {name:<45} {value:>9} ms")
+    print("\nWarm-up:")
+    for name, value in warm_up_ms.items():
+        print(f"  {name:<45} {value:>9} ms")
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    git = git_revision()
+    report = {
+        "timestamp": timestamp,
+        "git": git,
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms": import_ms,
+        "warm_up_ms": warm_up_ms,
+        "modules": top
+    }
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = os.path.join(REPORT_DIR, f"{timestamp}_{git['commit'] or 'nogit'}{'-dirty' if git['dirty'] else ''}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {path}")
+
+    baseline_path = args.baseline or previous_report(path)
+    if baseline_path:
+        with open(baseline_path) as f:
+            compare(report, json.load(f))
+
+    if args.budget_ms is not None and import_ms > args.budget_ms:
+        print(f"\nimport main took {import_ms} ms, over the {args.budget_ms} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
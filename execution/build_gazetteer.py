@@ -0,0 +1,56 @@
+"""
+Script to build the offline gazetteer index used for geocoding.
+
+Download a GeoNames dump first, e.g.:
+    https://download.geonames.org/export/dump/cities15000.zip (unzip to cities15000.txt)
+    https://download.geonames.org/export/dump/countryInfo.txt
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from services.gazetteer import build_index, Gazetteer  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(".tmp", "gazetteer.idx")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer index")
+    parser.add_argument("cities", help="GeoNames places file (e.g. cities15000.txt)")
+    parser.add_argument("--countries", help="GeoNames countryInfo.txt for 'City, Country' matching")
+    parser.add_argument("--out", default=DEFAULT_OUTPUT, help=f"Output index path (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--alternate-names", action="store_true", help="Also index alternate names")
+    parser.add_argument("--min-population", type=int, default=0, help="Skip smaller places")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.cities):
+        print(f"Error: {args.cities} not found.")
+        return 1
+
+    start = time.perf_counter()
+    count = build_index(
+        args.cities,
+        args.out,
+        countries_path=args.countries,
+        include_alternate_names=args.alternate_names,
+        min_population=args.min_population
+    )
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(args.out) / (1024 * 1024)
+    print(f"Wrote {count} names to {args.out} ({size_mb:.1f} MB) in {elapsed:.1f}s")
+
+    # Quick sanity check
+    gazetteer = Gazetteer(args.out)
+    for query in ["Rome, Italy", "Paris"]:
+        print(f"  {query}: {gazetteer.lookup(query)}")
+    gazetteer.close()
+
+    print(f"Set GAZETTEER_PATH={os.path.abspath(args.out)} in backend/.env to enable it.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
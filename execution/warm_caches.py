@@ -0,0 +1,301 @@
+"""
+Script to pre-compute the cached data of popular destinations.
+
+For each destination it runs the same service calls the guide pipeline
+makes, with the same arguments, so their results land in the persistent
+cache (CACHE_DIR) under the keys real requests will look up:
+- details: generate_location_details (LLM response cache)
+- coords: get_coordinates (geocode cache; Nominatim is throttled host-wide)
+- images: get_location_images (Unsplash image cache)
+- places: fetch_trip_places, several destinations per Apify run (place store;
+  only when APIFY_API_TOKEN is set)
+- recommendations: generate_category_recommendations per category (LLM and
+  image caches; only without Apify, which serves them from the places)
+
+Tasks run with bounded concurrency, and LLM and Unsplash calls are paced by
+per-provider rate limits. Each completed (destination, task) is appended to
+a checkpoint file, so an interrupted run resumes where it stopped.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BACKEND_DIR = os.path.join(PROJECT_DIR, "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+
+# Before importing the services, which read their configuration on import
+load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+
+from services import image_service  # noqa: E402
+from services.cache_store import normalize_key  # noqa: E402
+from services.ai_service import (  # noqa: E402
+    generate_location_details,
+    is_fallback_location_details,
+    is_fallback_recommendations
+)
+from services.image_service import get_location_images, is_placeholder_image  # noqa: E402
+from services.itinerary_service import get_coordinates  # noqa: E402
+from services.apify_service import APIFY_ENABLED, CATEGORY_QUERIES  # noqa: E402
+from services.places_store import lookup_places  # noqa: E402
+from services.recommendations_service import (  # noqa: E402
+    CATEGORY_KEYS,
+    generate_category_recommendations,
+    fetch_trip_places
+)
+
+CHECKPOINT_PATH = os.path.join(".tmp", "warm_caches", "checkpoint.jsonl")
+TASKS = ["details", "coords", "images", "places", "recommendations"]
+# Recommendations per category requested from the LLM (one image search each in "place" mode)
+RECOMMENDATIONS_PER_CATEGORY = 5
+
+
+class RateLimit:
+    """Token bucket: `rate` calls per second with bursts of up to `burst` calls"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, count: float) -> None:
+        # Waiters queue on the lock, so a large request is not starved by small ones
+        async with self.lock:
+            count = min(count, self.burst)
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= count:
+                    self.tokens -= count
+                    return
+                await asyncio.sleep((count - self.tokens) / self.rate)
+
+
+@dataclass
+class Task:
+    """
+    One unit of warming work
+
+    `cost` is its worst-case number of calls per rate-limited provider;
+    `run` returns None on success or the reason the result was not cached.
+    """
+    name: str
+    destinations: List[str]
+    cost: Dict[str, int]
+    run: Callable[[], Awaitable[Optional[str]]]
+
+
+async def warm_details(destination: str) -> Optional[str]:
+    details = await generate_location_details(destination)
+    # The fallback is returned (and not cached) when every provider failed
+    if is_fallback_location_details(destination, details):
+        return "fallback details (LLM providers unavailable)"
+    return None
+
+
+async def warm_coords(destination: str) -> Optional[str]:
+    # "Not found" is cached too (for GEOCODE_NEGATIVE_TTL), lookup errors are not
+    if await get_coordinates(destination) is None:
+        return "not found or geocoder unavailable"
+    return None
+
+
+async def warm_images(destination: str) -> Optional[str]:
+    if not image_service.UNSPLASH_ACCESS_KEY:
+        return "UNSPLASH_ACCESS_KEY is not set"
+    images = await get_location_images(destination, count=4)
+    if not images or any(is_placeholder_image(image) for image in images):
+        return "placeholder images (Unsplash unavailable or rate limited)"
+    return None
+
+
+async def warm_places(destinations: List[str]) -> Optional[str]:
+    await fetch_trip_places(destinations)
+    # Failed scrapes return empty lists without storing anything; the retry
+    # only scrapes the pairs still missing
+    missing = [
+        f"{destination}/{category}"
+        for destination in destinations
+        for category in CATEGORY_QUERIES
+        if await lookup_places(destination, category) is None
+    ]
+    if missing:
+        return f"places not stored for {', '.join(missing)} (Apify run failed)"
+    return None
+
+
+async def warm_recommendations(destination: str, category: str) -> Optional[str]:
+    recs = await generate_category_recommendations([destination], category)
+    if is_fallback_recommendations(destination, category, [rec.model_dump() for rec in recs]):
+        return "fallback recommendations (LLM providers unavailable)"
+    return None
+
+
+def build_tasks(destinations: List[str], tasks: List[str], places_batch: int) -> List[Task]:
+    """All tasks for the destinations, in the order the guide pipeline needs them"""
+    image_searches = 1 if image_service.RECOMMENDATION_IMAGE_MODE == "destination" else RECOMMENDATIONS_PER_CATEGORY
+    result = []
+    for destination in destinations:
+        if "details" in tasks:
+            result.append(Task("details", [destination], {"llm": 1}, lambda d=destination: warm_details(d)))
+        if "coords" in tasks:
+            result.append(Task("coords", [destination], {}, lambda d=destination: warm_coords(d)))
+        if "images" in tasks:
+            result.append(Task("images", [destination], {"unsplash": 1}, lambda d=destination: warm_images(d)))
+        if "recommendations" in tasks and not APIFY_ENABLED:
+            for category in CATEGORY_KEYS:
+                result.append(Task(
+                    f"recommendations:{category}",
+                    [destination],
+                    {"llm": 1, "unsplash": image_searches},
+                    lambda d=destination, c=category: warm_recommendations(d, c)
+                ))
+    if "places" in tasks and APIFY_ENABLED:
+        # One Apify actor run scrapes a whole batch of destinations
+        for i in range(0, len(destinations), places_batch):
+            batch = destinations[i:i + places_batch]
+            result.append(Task("places", batch, {}, lambda b=batch: warm_places(b)))
+    return result
+
+
+def read_destinations(args) -> List[str]:
+    destinations = list(args.destinations)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    destinations.append(line)
+    # Same place written differently is the same cache entry
+    unique = {}
+    for destination in destinations:
+        unique.setdefault(normalize_key(destination), destination)
+    return list(unique.values())
+
+
+def load_checkpoint(path: str) -> set:
+    """(normalized destination, task) pairs completed by previous runs"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves a partial last line
+                continue
+            if entry.get("status") == "done":
+                done.add((normalize_key(entry["destination"]), entry["task"]))
+    return done
+
+
+async def warm(tasks: List[Task], args) -> Dict[str, Dict[str, int]]:
+    limits = {
+        "llm": RateLimit(args.llm_per_minute / 60, max(1.0, args.llm_per_minute / 60 * 5)),
+        "unsplash": RateLimit(args.unsplash_per_hour / 3600, max(float(RECOMMENDATIONS_PER_CATEGORY), args.unsplash_per_hour / 60))
+    }
+    semaphore = asyncio.Semaphore(args.concurrency)
+    summary: Dict[str, Dict[str, int]] = {}
+    os.makedirs(os.path.dirname(os.path.abspath(args.checkpoint)), exist_ok=True)
+
+    with open(args.checkpoint, "a", encoding="utf-8") as checkpoint:
+        async def run(task: Task) -> None:
+            async with semaphore:
+                for provider, count in task.cost.items():
+                    if count:
+                        await limits[provider].acquire(count)
+                start = time.perf_counter()
+                try:
+                    error = await task.run()
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                seconds = round(time.perf_counter() - start, 2)
+
+            status = "failed" if error else "done"
+            counts = summary.setdefault(task.name, {"done": 0, "failed": 0})
+            counts[status] += len(task.destinations)
+            for destination in task.destinations:
+                entry = {
+                    "destination": destination,
+                    "task": task.name,
+                    "status": status,
+                    "seconds": seconds,
+                    "at": datetime.now().isoformat(timespec="seconds")
+                }
+                if error:
+                    entry["error"] = error
+                checkpoint.write(json.dumps(entry) + "\n")
+            # Flushed per task so a crash loses at most the tasks still running
+            checkpoint.flush()
+            label = ", ".join(task.destinations)
+            print(f"{status:<6} {task.name:<26} {label} ({seconds}s){f': {error}' if error else ''}")
+
+        await asyncio.gather(*(run(task) for task in tasks))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-compute cached data for popular destinations")
+    parser.add_argument("destinations", nargs="*", help="Destination names")
+    parser.add_argument("--file", help="File with one destination per line (# starts a comment)")
+    parser.add_argument("--tasks", default=",".join(TASKS), help=f"Comma-separated subset of {', '.join(TASKS)}")
+    parser.add_argument("--concurrency", type=int, default=4, help="Tasks running at once")
+    parser.add_argument("--llm-per-minute", type=float, default=30, help="LLM calls per minute")
+    parser.add_argument("--unsplash-per-hour", type=float, default=50, help="Unsplash searches per hour")
+    parser.add_argument("--places-batch", type=int, default=10, help="Destinations per Apify run")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="Progress file used to resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore (and clear) the checkpoint")
+    args = parser.parse_args()
+
+    tasks = [task.strip() for task in args.tasks.split(",") if task.strip()]
+    unknown = set(tasks) - set(TASKS)
+    if unknown:
+        parser.error(f"Unknown tasks: {', '.join(sorted(unknown))}")
+    destinations = read_destinations(args)
+    if not destinations:
+        parser.error("No destinations given")
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    done = load_checkpoint(args.checkpoint)
+
+    all_tasks = build_tasks(destinations, tasks, args.places_batch)
+    pending = []
+    for task in all_tasks:
+        remaining = [d for d in task.destinations if (normalize_key(d), task.name) not in done]
+        if len(remaining) == len(task.destinations):
+            pending.append(task)
+        elif remaining:
+            # Part of a places batch finished before: scrape only the rest
+            pending.append(Task(task.name, remaining, task.cost, lambda b=remaining: warm_places(b)))
+
+    if "images" in tasks and not image_service.UNSPLASH_ACCESS_KEY:
+        print("UNSPLASH_ACCESS_KEY is not set: image tasks will fail")
+    skipped = len(all_tasks) - len(pending)
+    print(f"Warming {len(destinations)} destinations: {len(pending)} tasks to run, {skipped} already done")
+    if not pending:
+        return 0
+
+    start = time.perf_counter()
+    summary = asyncio.run(warm(pending, args))
+    print(f"\nFinished in {time.perf_counter() - start:.1f}s (checkpoint: {args.checkpoint})")
+    for name, counts in sorted(summary.items()):
+        print(f"  {name:<26} {counts['done']:>5} done  {counts['failed']:>5} failed")
+    # Failed tasks are retried by running the same command again
+    return 1 if any(counts["failed"] for counts in summary.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
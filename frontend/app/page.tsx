@@ -6,7 +6,48 @@ import DestinationInput from '@/components/DestinationInput';
 import LocationCard from '@/components/LocationCard';
 import ItineraryDisplay from '@/components/ItineraryDisplay';
 import RecommendationSection from '@/components/RecommendationSection';
-import { generateTravelGuide, TravelGuide } from '@/lib/api';
+import { streamTravelGuide, GuideStreamEvent, LocationDetail, TravelGuide } from '@/lib/api';
+
+/**
+ * Map the route's destination names back to indices of the requested list,
+ * so repeated names keep their own card (as the backend orders them)
+ */
+function routeIndices(requested: string[], route: string[]): number[] {
+    const used = new Set<number>();
+    const indices: number[] = [];
+    for (const name of route) {
+        const index = requested.findIndex((dest, i) => dest === name && !used.has(i));
+        if (index !== -1) {
+            used.add(index);
+            indices.push(index);
+        }
+    }
+    return indices;
+}
+
+/**
+ * Merge one streamed event into the partial guide
+ */
+function applyGuideEvent(guide: TravelGuide, event: GuideStreamEvent): TravelGuide {
+    switch (event.event) {
+        case 'itinerary_day':
+            return {
+                ...guide,
+                itinerary: [...guide.itinerary, event.data].sort((a, b) => a.day_number - b.day_number),
+            };
+        case 'recommendations':
+            return {
+                ...guide,
+                recommendations: { ...guide.recommendations, [event.data.category]: event.data.items },
+            };
+        case 'route_info':
+            return { ...guide, route_info: event.data };
+        case 'complete':
+            return event.data;
+        default:
+            return guide;
+    }
+}
 
 export default function Home() {
     const [guide, setGuide] = useState<TravelGuide | null>(null);
@@ -18,19 +59,53 @@ export default function Home() {
         setError(null);
         setGuide(null);
 
+        // Partial guide, filled in as the backend streams each part
+        let scrolled = false;
+        setGuide({
+            destinations: [],
+            itinerary: [],
+            recommendations: { sleep: [], eat: [], curiosities: [] },
+            total_days: days || destinations.length * 3,
+        });
+
+        // Destination cards by requested index; they finish in any order and
+        // are shown in route order (request order until the route arrives)
+        const cards: (LocationDetail | undefined)[] = [];
+        let order = destinations.map((_, i) => i);
+
+        const handleEvent = (event: GuideStreamEvent) => {
+            if (event.event === 'route' || event.event === 'destination') {
+                if (event.event === 'route') {
+                    order = routeIndices(destinations, event.data.destinations);
+                } else {
+                    cards[event.data.index] = event.data.location;
+                }
+                const placed = order
+                    .map((i) => cards[i])
+                    .filter((location): location is LocationDetail => location !== undefined);
+                setGuide((current) => (current ? { ...current, destinations: placed } : current));
+            } else {
+                setGuide((current) => (current ? applyGuideEvent(current, event) : current));
+            }
+
+            if (!scrolled) {
+                scrolled = true;
+                // Scroll to results after a brief delay
+                setTimeout(() => {
+                    document.getElementById('results')?.scrollIntoView({ behavior: 'smooth' });
+                }, 300);
+            }
+        };
+
         try {
-            const result = await generateTravelGuide({
+            const result = await streamTravelGuide({
                 destinations,
                 days,
                 preferences,
-            });
+            }, handleEvent);
             setGuide(result);
-
-            // Scroll to results after a brief delay
-            setTimeout(() => {
-                document.getElementById('results')?.scrollIntoView({ behavior: 'smooth' });
-            }, 300);
         } catch (err) {
+            setGuide(null);
             setError(err instanceof Error ? err.message : 'Failed to generate travel guide');
             console.error('Error generating guide:', err);
         } finally {
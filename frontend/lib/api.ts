@@ -95,6 +95,76 @@ export async function generateTravelGuide(
     return response.json();
 }
 
+export type GuideStreamEvent =
+    | { event: 'route'; data: { destinations: string[] } }
+    | { event: 'destination'; data: { index: number; location: LocationDetail } }
+    | { event: 'itinerary_day'; data: DayItinerary }
+    | { event: 'recommendations'; data: { category: keyof TravelGuide['recommendations']; items: Recommendation[] } }
+    | { event: 'route_info'; data: NonNullable<TravelGuide['route_info']> }
+    | { event: 'complete'; data: TravelGuide }
+    | { event: 'error'; data: { detail: string } };
+
+/**
+ * Generate a travel guide progressively (Server-Sent Events).
+ * Calls onEvent for every part of the guide as soon as the backend has it
+ * and resolves with the complete guide.
+ */
+export async function streamTravelGuide(
+    request: GuideRequest,
+    onEvent: (event: GuideStreamEvent) => void
+): Promise<TravelGuide> {
+    const response = await fetch(`${API_BASE_URL}/api/generate-guide/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            Accept: 'text/event-stream',
+        },
+        body: JSON.stringify(request),
+    });
+
+    if (!response.ok || !response.body) {
+        const error = await response.json().catch(() => ({}));
+        throw new Error(error.detail || 'Failed to generate travel guide');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary = buffer.indexOf('\n\n');
+        while (boundary !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            boundary = buffer.indexOf('\n\n');
+
+            let eventName = 'message';
+            const dataLines: string[] = [];
+            for (const line of raw.split('\n')) {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+            }
+            if (dataLines.length === 0) continue;
+
+            const event = { event: eventName, data: JSON.parse(dataLines.join('\n')) } as GuideStreamEvent;
+            if (event.event === 'error') {
+                throw new Error(event.data.detail || 'Failed to generate travel guide');
+            }
+            onEvent(event);
+            if (event.event === 'complete') {
+                return event.data;
+            }
+        }
+    }
+
+    throw new Error('Connection closed before the travel guide was complete');
+}
+
 /**
  * Health check
  */